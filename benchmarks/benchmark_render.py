@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+############################################################
+### Benchmark of graph rendering: file size and savefig time
+### of the default (vector) and the fast render mode for a
+### synthetic experiment with many planners.
+###
+###   ./benchmarks/benchmark_render.py --planners 25 --resolution 200
+############################################################
+import argparse
+import copy
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ompl_benchmark_plotter import add_plot_arguments
+from src.database_to_graph import *
+
+def get_synthetic_data(planners, resolution, seed=0):
+  ## Planner curves with the structure of extracted database statistics
+  rng = np.random.default_rng(seed)
+  data = get_data_from_config({'max_cost': 0, 'min_cost': 0, 'fontsize': 0, 'linewidth': 0,
+    'label_fontsize': 0, 'verbosity': 0, 'remove_ylabel': False, 'planner_colors': None})
+  data["info"]["experiment"] = "synthetic"
+  data["info"]["resolution"] = resolution
+  data["info"]["min_time"] = {"success": 0.01, "optimization": 0.01}
+  data["info"]["max_time"] = {"success": 10.0, "optimization": 10.0}
+  max_cost = data["info"]["max_cost"]
+  for index in range(planners):
+    solve_index = rng.integers(0, resolution // 2)
+    success = np.minimum(100.0, np.maximum(0.0, np.arange(resolution) - solve_index).cumsum())
+    median = np.full(resolution, float(max_cost))
+    median[solve_index:] = 20.0 + 30.0 * rng.random() * np.exp(-np.linspace(0, 5, resolution - solve_index))
+    spread = rng.uniform(1.0, 5.0, resolution)
+    data["planners"]["geometric_Planner{}".format(index)] = {
+        "success": success,
+        "optimization_success": True,
+        "median": median,
+        "quantile5": np.where(median < max_cost, median - spread, max_cost),
+        "quantile95": np.where(median < max_cost, median + spread, max_cost)
+    }
+  return data
+
+def get_render_config(fast_render, formats):
+  parser = argparse.ArgumentParser()
+  add_plot_arguments(parser)
+  args = parser.parse_args(["-v", "0"])
+  args.show = None
+  args.output_file = None
+  args.jobs = 1
+  args.fast_render = fast_render
+  args.formats = formats
+  config = make_config(args)
+  config["planner_colors"] = {}
+  return config
+
+def benchmark_render(data, fast_render, formats, directory, repetitions):
+  ## Returns the best wall time of data_to_graph and the file sizes
+  name = "fast" if fast_render else "vector"
+  pdf_filepath = os.path.join(directory, name + ".pdf")
+  config = get_render_config(fast_render, formats)
+  best_time = float("inf")
+  for repetition in range(repetitions):
+    start = time.perf_counter()
+    data_to_graph(copy.deepcopy(data), pdf_filepath, os.path.join(directory, name + "_legend.pdf"), config)
+    best_time = min(best_time, time.perf_counter() - start)
+  sizes = {output_format: os.path.getsize(change_filename_extension(pdf_filepath, '.' + output_format))
+      for output_format in formats}
+  return best_time, sizes
+
+def main(arguments):
+  parser = argparse.ArgumentParser(description='Benchmark graph rendering of the default and the fast render mode.')
+  parser.add_argument('--planners', type=int, default=25, help='Number of synthetic planners. Default: 25.')
+  parser.add_argument('--resolution', type=int, default=200, help='Number of time samples per curve. Default: 200.')
+  parser.add_argument('--repetitions', type=int, default=3, help='Renders per mode, the fastest is reported. Default: 3.')
+  parser.add_argument('--formats', type=str, nargs='+', choices=['pdf', 'png', 'svg'], default=['pdf'], help='Output formats. Default: pdf.')
+  args = parser.parse_args(arguments)
+
+  data = get_synthetic_data(args.planners, args.resolution)
+  with tempfile.TemporaryDirectory() as directory:
+    print("{} planners, resolution {}".format(args.planners, args.resolution))
+    print("{:<8} {:>12} {}".format("mode", "render [s]", " ".join("{:>12}".format(f + " [kB]") for f in args.formats)))
+    for fast_render in [False, True]:
+      render_time, sizes = benchmark_render(data, fast_render, args.formats, directory, args.repetitions)
+      print("{:<8} {:>12.3f} {}".format("fast" if fast_render else "vector", render_time,
+        " ".join("{:>12.1f}".format(sizes[f] / 1024) for f in args.formats)))
+  auto_mode = "fast" if args.planners * args.resolution >= kFastRenderMinPoints else "vector"
+  print("--fast-render auto picks {} ({} of {} cost curve points)".format(auto_mode, args.planners * args.resolution,
+    kFastRenderMinPoints))
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+############################################################
+### Scaling benchmark of the stages of plot_graph_from_databases
+### on synthetic databases of increasing size. For every size,
+### the wall time and the peak (traced) memory of each stage
+### are recorded and written as JSON, such that results of
+### different versions can be compared.
+###
+###   ./benchmarks/benchmark_scaling.py -o results.json
+###   ./benchmarks/benchmark_scaling.py --sizes 10x1000x100 10x1000x1000
+############################################################
+import argparse
+import copy
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from benchmarks.generate_database import generate_database
+from benchmarks.benchmark_render import get_render_config
+from src.database_to_graph import *
+
+## planners x runs x progress rows per run
+kDefaultSizes = ["5x100x100", "5x1000x100", "5x1000x1000", "20x1000x1000"]
+
+def parse_size(size):
+  (planners, runs, progress_rows) = (int(value) for value in size.split("x"))
+  return {"planners": planners, "runs": runs, "progress_rows": progress_rows}
+
+def get_stages(database_filepath, config, directory):
+  ## (name, function) of each stage, in pipeline order. Stages share
+  ## their results through the state dictionary.
+  state = {}
+
+  def connect():
+    state["connection"] = sqlite3.connect(database_filepath)
+    state["cursor"] = state["connection"].cursor()
+    state["data"] = get_data_from_config(config)
+    state["data"]["info"]["experiment"] = "synthetic"
+    get_maxtime_from_database_or_config(state["cursor"], config, state["data"])
+    get_mintime_from_database_or_config(state["cursor"], config, state["data"])
+
+  def planners():
+    state["planners"] = get_selected_planners_from_database(state["cursor"], config)
+
+  def success():
+    times = create_time_space(state["data"])
+    for planner in state["planners"]:
+      run_times = get_run_times_from_database(state["cursor"], planner[0])
+      get_success_from_sorted_times(run_times, len(run_times), times, inclusive=False)
+
+  def cost():
+    times = create_time_space(state["data"])
+    info = state["data"]["info"]
+    chunk_size = get_progress_chunk_size(config["memory_budget"])
+    for planner in state["planners"]:
+      runs = get_run_ids_from_database(state["cursor"], planner[0])
+      get_cost_results(state["cursor"], runs, times, info["max_cost"], info["ci_left"], info["ci_right"], chunk_size)
+
+  def count_success():
+    times = create_time_space(state["data"])
+    for planner in state["planners"]:
+      runs = get_run_ids_from_database(state["cursor"], planner[0])
+      get_count_success(state["cursor"], len(runs), runs, times)
+
+  def extract():
+    get_json_from_database(state["cursor"], state["data"], config)
+    state["connection"].close()
+
+  def render():
+    pdf_filepath = os.path.join(directory, "benchmark.pdf")
+    data_to_graph(copy.deepcopy(state["data"]), pdf_filepath, change_filename_extension(pdf_filepath, "_legend.pdf"), config)
+
+  ## extract repeats success, cost and count_success as done by the
+  ## plotter (including planner output), the others isolate them
+  return [("connect", connect), ("planners", planners), ("success", success), ("cost", cost),
+      ("count_success", count_success), ("extract", extract), ("render", render)]
+
+def run_stages(database_filepath, config, directory, trace_memory):
+  results = {}
+  for (name, stage) in get_stages(database_filepath, config, directory):
+    if trace_memory:
+      tracemalloc.start()
+    start = time.perf_counter()
+    stage()
+    seconds = time.perf_counter() - start
+    if trace_memory:
+      results[name] = tracemalloc.get_traced_memory()[1]
+      tracemalloc.stop()
+    else:
+      results[name] = seconds
+  return results
+
+def benchmark_size(size, config, directory, repetitions, trace_memory):
+  database_filepath = os.path.join(directory, "synthetic_{}.db".format(size))
+  generate_database(database_filepath, **parse_size(size))
+  connection = sqlite3.connect(database_filepath)
+  progress_rows = connection.execute("SELECT COUNT(*) FROM progress").fetchone()[0]
+  connection.close()
+
+  ## Fastest of all repetitions, timed without memory tracing
+  seconds = {}
+  for repetition in range(repetitions):
+    for (name, value) in run_stages(database_filepath, config, directory, False).items():
+      seconds[name] = min(seconds.get(name, float("inf")), value)
+  result = dict(parse_size(size), size=size, database_bytes=os.path.getsize(database_filepath),
+      total_progress_rows=progress_rows, seconds=seconds)
+  if trace_memory:
+    result["peak_memory_bytes"] = run_stages(database_filepath, config, directory, True)
+  os.remove(database_filepath)
+  return result
+
+def get_version():
+  try:
+    return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+  except OSError:
+    return "unknown"
+
+def print_results(results, header=True):
+  stages = list(results[0]["seconds"].keys())
+  if header:
+    print("{:<16} {}".format("size", " ".join("{:>13}".format(stage) for stage in stages)))
+  for result in results:
+    print("{:<16} {}".format(result["size"], " ".join("{:>12.3f}s".format(result["seconds"][stage]) for stage in stages)))
+    if "peak_memory_bytes" in result:
+      print("{:<16} {}".format("  peak memory", " ".join("{:>11.1f}MB".format(result["peak_memory_bytes"][stage] / 1024**2)
+        for stage in stages)))
+
+def main(arguments):
+  parser = argparse.ArgumentParser(description='Time each stage of plotting synthetic databases of increasing size.')
+  parser.add_argument('--sizes', type=str, nargs='+', default=kDefaultSizes, help='Database sizes as PLANNERSxRUNSxPROGRESS_ROWS (progress rows per run). Default: {}.'.format(' '.join(kDefaultSizes)))
+  parser.add_argument('--repetitions', type=int, default=1, help='Timed repetitions per size, the fastest is reported. Default: 1.')
+  parser.add_argument('--memory-budget', type=float, help='Memory budget (in MB) of the progress stream, as for the plotter.')
+  parser.add_argument('--no-memory', action='store_const', const=True, help='Do not measure peak memory (saves one traced pass per size).')
+  parser.add_argument('-o', '--output-file', type=str, help='Write the results as JSON to this file.')
+  args = parser.parse_args(arguments)
+
+  config = get_render_config(False, ['pdf'])
+  config["memory_budget"] = args.memory_budget * 1024 * 1024 if args.memory_budget else None
+
+  results = []
+  with tempfile.TemporaryDirectory() as directory:
+    for size in args.sizes:
+      results.append(benchmark_size(size, config, directory, args.repetitions, not args.no_memory))
+      print_results(results[-1:], header=len(results) == 1)
+
+  if args.output_file:
+    report = {
+        "version": get_version(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "memory_budget": config["memory_budget"],
+        "results": results
+    }
+    write_json_atomic(args.output_file, report, indent=2)
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main(sys.argv[1:]))
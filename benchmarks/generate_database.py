@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+############################################################
+### Generator of synthetic OMPL benchmark databases with
+### the schema written by ompl::tools::Benchmark (experiments,
+### plannerConfigs, enums, runs and progress tables), for
+### scaling tests and benchmarks.
+###
+###   ./benchmarks/generate_database.py large.db --planners 10 --runs 1000 --progress-rows 500
+############################################################
+import argparse
+import os
+import sqlite3
+import sys
+import numpy as np
+
+kSchema = """
+CREATE TABLE experiments
+        (id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR(512),
+        totaltime REAL, timelimit REAL, memorylimit REAL, runcount INTEGER,
+        version VARCHAR(128), hostname VARCHAR(1024), cpuinfo TEXT,
+        date DATETIME, seed VARCHAR(24), setup TEXT);
+CREATE TABLE plannerConfigs
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name VARCHAR(512) NOT NULL, settings TEXT);
+CREATE TABLE enums
+        (name VARCHAR(512), value INTEGER, description TEXT,
+        PRIMARY KEY (name, value));
+CREATE TABLE runs
+        (id INTEGER PRIMARY KEY AUTOINCREMENT, experimentid INTEGER, plannerid INTEGER,
+        approximate_solution BOOLEAN, correct_solution BOOLEAN, graph_motions INTEGER,
+        graph_states INTEGER, memory REAL, solution_length REAL, solved BOOLEAN,
+        status ENUM, time REAL, best_cost REAL, iterations INTEGER,
+        FOREIGN KEY (experimentid) REFERENCES experiments(id) ON DELETE CASCADE,
+        FOREIGN KEY (plannerid) REFERENCES plannerConfigs(id) ON DELETE CASCADE);
+CREATE TABLE progress
+        (runid INTEGER, time REAL, best_cost REAL, iterations INTEGER, PRIMARY KEY (runid, time),
+        FOREIGN KEY (runid) REFERENCES runs(id) ON DELETE CASCADE);
+"""
+
+kStatusNames = ["Unknown status", "Invalid start", "Invalid goal", "Unrecognized goal type",
+    "Timeout", "Approximate solution", "Exact solution", "Crash", "Unknown status", "Unknown status"]
+kStatusTimeout = 4
+kStatusExactSolution = 6
+
+## Runs are inserted in batches to bound the memory of the generator
+kRunBatchSize = 1000
+
+def generate_planner_runs(rng, run_ids, timelimit, progress_rows, anytime, success_rate):
+  ## Runs and progress rows of one planner. Anytime planners report their
+  ## best cost progress_rows times (at uniformly random times of each run up
+  ## to the time limit, as the progress thread of OMPL does not report at
+  ## the same times in every run), starting with NULL before their first
+  ## solution.
+  runs = []
+  progress = []
+  for run_id in run_ids:
+    solved = rng.random() < success_rate
+    solution_time = min(timelimit, rng.lognormal(np.log(0.1 * timelimit), 1.0)) if solved else timelimit
+    first_cost = rng.uniform(20.0, 60.0)
+    if anytime:
+      run_time = timelimit
+      final_cost = first_cost * rng.uniform(0.4, 0.8)
+      times = np.sort(rng.uniform(0.0, timelimit, progress_rows))
+      ## Exponential convergence from the first to the final cost
+      decay = np.exp(-(times - solution_time) / (0.2 * timelimit))
+      costs = final_cost + (first_cost - final_cost) * decay
+      for (time, cost) in zip(times, costs):
+        progress.append((run_id, float(time), float(cost) if solved and time >= solution_time else None, 0))
+      best_cost = float(costs[-1]) if solved else None
+      length = float(costs[-1]) if solved else None
+    else:
+      run_time = solution_time
+      best_cost = None
+      length = first_cost if solved else None
+    status = kStatusExactSolution if solved else kStatusTimeout
+    runs.append((run_id, int(solved), int(solved), 0, 0, 0.0, length, int(solved), status, float(run_time), best_cost, 0))
+  return runs, progress
+
+def generate_database(database_filepath, planners=5, runs=100, progress_rows=100, experiments=1,
+    timelimit=10.0, anytime_fraction=0.5, seed=0):
+  ## Write a database with experiments x planners x runs runs. The first
+  ## anytime_fraction of the planners are anytime planners with
+  ## progress_rows progress entries per run.
+  if os.path.exists(database_filepath):
+    os.remove(database_filepath)
+  rng = np.random.default_rng(seed)
+  connection = sqlite3.connect(database_filepath)
+  connection.executescript(kSchema)
+  connection.executemany("INSERT INTO enums (name, value, description) VALUES ('status', ?, ?)",
+      list(enumerate(kStatusNames)))
+  anytime_planners = int(round(anytime_fraction * planners))
+  for planner in range(planners):
+    name = "geometric_Anytime{}".format(planner) if planner < anytime_planners else "geometric_Planner{}".format(planner)
+    connection.execute("INSERT INTO plannerConfigs (id, name, settings) VALUES (?, ?, ?)",
+        (planner + 1, name, "range = 0\n;"))
+
+  run_id = 1
+  for experiment in range(experiments):
+    experiment_id = experiment + 1
+    connection.execute("INSERT INTO experiments (id, name, totaltime, timelimit, memorylimit, runcount, version, hostname, cpuinfo, date, seed, setup) \
+        VALUES (?, ?, 0, ?, 4096, ?, 'OMPL 1.5.2', 'synthetic', '', 0, ?, '')",
+        (experiment_id, "synthetic{}".format(experiment) if experiments > 1 else "synthetic", timelimit, runs, str(seed)))
+    for planner in range(planners):
+      success_rate = rng.uniform(0.3, 1.0)
+      for batch_start in range(0, runs, kRunBatchSize):
+        batch_size = min(kRunBatchSize, runs - batch_start)
+        run_ids = range(run_id, run_id + batch_size)
+        run_rows, progress = generate_planner_runs(rng, run_ids, timelimit, progress_rows,
+            planner < anytime_planners, success_rate)
+        connection.executemany("INSERT INTO runs (id, approximate_solution, correct_solution, graph_motions, graph_states, \
+            memory, solution_length, solved, status, time, best_cost, iterations, experimentid, plannerid) \
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {}, {})".format(experiment_id, planner + 1), run_rows)
+        connection.executemany("INSERT INTO progress (runid, time, best_cost, iterations) VALUES (?, ?, ?, ?)", progress)
+        run_id += batch_size
+    connection.commit()
+  connection.close()
+
+def main(arguments):
+  parser = argparse.ArgumentParser(description='Write a synthetic OMPL benchmark database.')
+  parser.add_argument('database_file', type=str, help='Database (.db) file to write (overwritten if it exists).')
+  parser.add_argument('--planners', type=int, default=5, help='Number of planners. Default: 5.')
+  parser.add_argument('--runs', type=int, default=100, help='Number of runs per planner and experiment. Default: 100.')
+  parser.add_argument('--progress-rows', type=int, default=100, help='Number of progress entries per run of anytime planners. Default: 100.')
+  parser.add_argument('--experiments', type=int, default=1, help='Number of experiments. Default: 1.')
+  parser.add_argument('--timelimit', type=float, default=10.0, help='Time limit of the experiments in seconds. Default: 10.')
+  parser.add_argument('--anytime-fraction', type=float, default=0.5, help='Fraction of planners which report progress. Default: 0.5.')
+  parser.add_argument('--seed', type=int, default=0, help='Random seed. Default: 0.')
+  args = parser.parse_args(arguments)
+  generate_database(args.database_file, args.planners, args.runs, args.progress_rows, args.experiments,
+      args.timelimit, args.anytime_fraction, args.seed)
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main(sys.argv[1:]))
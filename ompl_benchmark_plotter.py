@@ -3,19 +3,44 @@ import argparse
 import os
 import re
 from src.database_to_graph import *
+from src.batch import *
+from src.summary import *
+from src.watch import *
+from src.server import *
+from src.runtime_table import *
 
 ############################################################
 ## Setup argument parser
 ############################################################
 
-def run_benchmark_plotter(input_arguments):
-  parser = argparse.ArgumentParser(description='Plotting of OMPL Benchmark Files.')
-
+def run_convert(input_arguments):
+  parser = argparse.ArgumentParser(prog='ompl_benchmark_plotter.py convert',
+      description='Write a memory-mapped columnar sidecar (<file>.db.columns) next to each database file. Subsequent plotting runs read the sidecar instead of the database as long as the database file is unchanged.')
   parser.add_argument('database_files', type=str, nargs='+', help='Database (.db) file(s)')
   parser.add_argument('-v','--verbose', type=int, choices=[0,1,2,3], default=1, help='Select verbosity level for stdout.')
   parser.add_argument('-q', '--quiet', action='store_const', const=True, help='Do not show any output. Invalidates any verbose values.')
-  parser.add_argument('-s','--show', action='store_const', const=True, help='Show output as pdf (requires xdg-open).')
-  parser.add_argument('-o','--output-file', type=str, help='Save as filename.')
+  parser.add_argument('--dtype', type=str, choices=['float32', 'float64'], default='float32', help='Precision of time and cost columns. float64 reproduces the results of the database exactly. Default: float32.')
+  args = parser.parse_args(input_arguments)
+  if args.quiet:
+    args.verbose = 0
+
+  for fname in args.database_files:
+    if not os.path.isfile(fname):
+      if args.verbose > 0:
+        print("Error: {} is not a file.".format(fname))
+      return 1
+
+  for fname in args.database_files:
+    convert_database_to_columnar(fname, args.dtype, args.verbose)
+  return 0
+
+def add_plot_arguments(parser):
+  parser.add_argument('-v','--verbose', type=int, choices=[0,1,2,3], default=1, help='Select verbosity level for stdout.')
+  parser.add_argument('-q', '--quiet', action='store_const', const=True, help='Do not show any output. Invalidates any verbose values.')
+  parser.add_argument('--data-only', action='store_const', const=True, help='Only write the extracted statistics as json file(s), without rendering graphs (matplotlib is not loaded).')
+  parser.add_argument('--intermediate', type=str, choices=['json', 'npz', 'none'], default='json', help='Format of the file with the extracted statistics written next to the graph. npz stores the curves as compact float32 arrays, none skips writing it (the graph is rendered from memory in any case). Default: json.')
+  parser.add_argument('--in-memory', type=float, help='Copy database files of at most this size (in MB) into memory before reading them, and build indexes on the copy. Database files are always opened read-only.')
+  parser.add_argument('--memory-budget', type=float, help='Stream progress entries in chunks such that reading them needs at most this much memory (in MB), independent of the size of the progress table.')
 
   #### Options for optimality graph
   graph_group = parser.add_argument_group("Cost-success graph options")
@@ -29,21 +54,31 @@ def run_benchmark_plotter(input_arguments):
   graph_group.add_argument('--only-success-graph', action='store_const', const=True, help='Plot only the success graph.')
   graph_group.add_argument('--ignore-non-optimal-planner', action='store_const', const=True, help='Do not plot non-optimal planner.')
   graph_group.add_argument('--ignore-planner', action='store', type=str, nargs='+', help='Exclude planners from graph (accepts multiple planner names)')
+  graph_group.add_argument('--include-planner', action='store', type=str, metavar='REGEX', help='Only plot planners whose name matches this regular expression (e.g. "RRT|PRM").')
   graph_group.add_argument('--legend-separate-file', action='store_const', const=True, help='Print legend as separate file.')
   graph_group.add_argument('--legend-below-figure', action='store_const', const=True, help='Print legend below graph.')
   graph_group.add_argument('--legend-none', action='store_const', const=True, help='Do not print legend.')
   graph_group.add_argument('--remove-ylabel', action='store_const', const=True, help='Do not print label on y-axis.')
   graph_group.add_argument('--title-name', action='store', type=str, help='Set title name.')
   graph_group.add_argument('--no-title', action='store_const', const=True, help='Do not set a title for this graph')
+  graph_group.add_argument('--time-grid', type=str, choices=['logspace', 'events'], default='logspace', help='Time samples of the curves. logspace evaluates all curves at resolution log-spaced times, events evaluates them at the solution and termination events (cost curves at most at 4 x --max-points quantiles of the progress times) and decimates them to --max-points points per planner, keeping the level before each kept step. Default: logspace.')
+  graph_group.add_argument('--max-points', type=int, default=200, help='Maximum number of points per planner curve with --time-grid events. Default: 200.')
+  graph_group.add_argument('--ci-method', type=str, choices=['percentile', 'bootstrap'], help='Band around the median cost: percentile shows the ci_left and ci_right percentiles of the costs of all runs, bootstrap shows a confidence interval of the median (and of the success curves) from resampled runs. Default: ci_method of config/default.json (percentile).')
+  graph_group.add_argument('--bootstrap-samples', type=int, help='Number of bootstrap resamples. Default: bootstrap_samples of config/default.json (1000).')
+  graph_group.add_argument('--bootstrap-confidence', type=float, help='Confidence level (in percent) of bootstrap intervals. Default: bootstrap_confidence of config/default.json (95).')
+  graph_group.add_argument('--bootstrap-workers', type=int, default=1, help='Number of worker processes which share the bootstrap resamples of each planner. Results do not depend on it. Default: 1.')
+  graph_group.add_argument('--fast-render', type=str, nargs='?', const='on', choices=['auto', 'on', 'off'], default='auto', help='Draw all curves of a graph as one line collection and rasterize the percentile bands. Gives much smaller files for many planners with long curves, but larger files for small graphs. auto uses it from 25 planners x 1000 cost curve points on. Default: auto (on without value).')
+  graph_group.add_argument('--raster-dpi', type=int, default=100, help='Resolution of the rasterized percentile bands of --fast-render in pdf and svg files. Default: 100.')
+  graph_group.add_argument('--formats', type=str, nargs='+', choices=['pdf', 'png', 'svg'], default=['pdf'], help='Output formats of the graph. Other formats than pdf are written next to the pdf file. Default: pdf.')
   graph_group.add_argument('--planner-color', type=str, action='append', help='Specify custom colors for planners as PlannerName=(R,G,B,A), e.g., --planner-color Planner1=(0.7,0.1,0.7,1.0)')
 
-  args = parser.parse_args(input_arguments)
-  if args.quiet:
-    args.verbose = 0
+  #### Options for caching extracted statistics
+  cache_group = parser.add_argument_group("Result cache options")
+  cache_group.add_argument('--cache-dir', type=str, help='Cache extracted planner statistics in this directory. Reruns which only change styling options skip reading the database files.')
+  cache_group.add_argument('--cache-size', type=float, default=512, help='Maximum size of the cache directory in MB (least recently used entries are evicted). Default: 512.')
 
-  ############################################################
-  ## Parse custom planner colors
-  ############################################################
+def parse_planner_colors(args):
+  ## Returns None if a color specification is invalid
   planner_colors = {}
   if args.planner_color:
     for color_spec in args.planner_color:
@@ -56,11 +91,231 @@ def run_benchmark_plotter(input_arguments):
         else:
           if args.verbose > 0:
             print(f"Error: RGBA values for {planner_name} must be between 0 and 1.")
-          return 1
+          return None
       else:
         if args.verbose > 0:
           print(f"Error: Invalid color format for {color_spec}. Expected PlannerName=(R,G,B,A).")
-        return 1
+        return None
+  return planner_colors
+
+def run_batch(input_arguments):
+  parser = argparse.ArgumentParser(prog='ompl_benchmark_plotter.py batch',
+      description='Plot all database files found in directories or glob patterns. Database files are grouped by experiment name and one graph is rendered per experiment by a pool of worker processes.')
+  parser.add_argument('inputs', type=str, nargs='+', help='Directories (searched recursively) or glob patterns of database (.db) files')
+  parser.add_argument('--output-dir', type=str, help='Write all graphs into this directory (default: next to the first database file of each experiment).')
+  parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of render worker processes. Default: number of cores.')
+  parser.add_argument('--manifest', type=str, help='Write a JSON manifest of all rendered graphs to this file.')
+  add_plot_arguments(parser)
+  args = parser.parse_args(input_arguments)
+  if args.quiet:
+    args.verbose = 0
+
+  planner_colors = parse_planner_colors(args)
+  if planner_colors is None:
+    return 1
+
+  database_filepaths = find_database_files(args.inputs)
+  if len(database_filepaths) == 0:
+    if args.verbose > 0:
+      print("Error: No database files found in {}.".format(args.inputs))
+    return 1
+
+  args.show = None
+  args.output_file = None
+  args.jobs = 1
+  plot_config = make_config(args)
+  plot_config["planner_colors"] = planner_colors
+  ## Per-graph output is summarized in the manifest instead
+  plot_config["verbosity"] = 0
+
+  groups = group_databases_by_experiment(database_filepaths)
+  if args.verbose > 0:
+    print("Plot {} experiments from {} files with {} workers.".format(len(groups), len(database_filepaths), args.workers))
+
+  manifest = plot_batch(groups, plot_config, args.output_dir, args.workers)
+  if args.verbose > 0:
+    print_manifest(manifest)
+  if args.manifest:
+    write_json_atomic(args.manifest, manifest)
+  return 0 if all(entry["status"] == "ok" for entry in manifest) else 1
+
+def run_summarize(input_arguments):
+  parser = argparse.ArgumentParser(prog='ompl_benchmark_plotter.py summarize',
+      description='Write a compact mergeable summary (per planner success counts and cost histograms on a fixed time grid) of database files. Summaries of different shards are combined and plotted with the reduce command.')
+  parser.add_argument('database_files', type=str, nargs='+', help='Database (.db) file(s)')
+  parser.add_argument('-o','--output-file', type=str, required=True, help='Summary (.npz) file to write.')
+  parser.add_argument('--bins', type=int, default=1000, help='Number of cost histogram bins between 0 and max cost. Cost quantiles of the reduced graph are accurate up to max cost / bins. Default: 1000.')
+  add_plot_arguments(parser)
+  args = parser.parse_args(input_arguments)
+  if args.quiet:
+    args.verbose = 0
+
+  for fname in args.database_files:
+    if not os.path.isfile(fname):
+      if args.verbose > 0:
+        print("Error: {} is not a file.".format(fname))
+      return 1
+
+  args.show = None
+  args.jobs = 1
+  plot_config = make_config(args)
+  plot_config["planner_colors"] = {}
+  summarize_databases(args.database_files, args.output_file, plot_config, args.bins)
+  return 0
+
+def run_reduce(input_arguments):
+  parser = argparse.ArgumentParser(prog='ompl_benchmark_plotter.py reduce',
+      description='Merge summary files written by the summarize command and plot the combined graph.')
+  parser.add_argument('summary_files', type=str, nargs='+', help='Summary (.npz) file(s)')
+  parser.add_argument('-s','--show', action='store_const', const=True, help='Show output as pdf (requires xdg-open).')
+  parser.add_argument('-o','--output-file', type=str, help='Save as filename.')
+  add_plot_arguments(parser)
+  args = parser.parse_args(input_arguments)
+  if args.quiet:
+    args.verbose = 0
+
+  planner_colors = parse_planner_colors(args)
+  if planner_colors is None:
+    return 1
+
+  for fname in args.summary_files:
+    if not os.path.isfile(fname):
+      if args.verbose > 0:
+        print("Error: {} is not a file.".format(fname))
+      return 1
+
+  args.jobs = 1
+  plot_config = make_config(args)
+  plot_config["planner_colors"] = planner_colors
+  plot_graph_from_summaries(args.summary_files, plot_config)
+  return 0
+
+def get_serve_request_config(default_args, arguments):
+  ## Plot config of the plot arguments of a serve request, on top of the
+  ## defaults given to the serve command
+  request_parser = argparse.ArgumentParser(prog='ompl_benchmark_plotter.py serve request')
+  add_plot_arguments(request_parser)
+  request_parser.set_defaults(**vars(default_args))
+  try:
+    request_args = request_parser.parse_args(arguments)
+  except SystemExit:
+    raise ValueError("Invalid plot arguments {}.".format(arguments))
+  planner_colors = parse_planner_colors(request_args)
+  if planner_colors is None:
+    raise ValueError("Invalid planner colors {}.".format(request_args.planner_color))
+  if request_args.include_planner is not None:
+    try:
+      re.compile(request_args.include_planner)
+    except re.error as error:
+      raise ValueError("--include-planner {} is not a regular expression ({}).".format(request_args.include_planner, error))
+  request_args.show = None
+  request_args.output_file = None
+  request_args.jobs = 1
+  plot_config = make_config(request_args)
+  plot_config["planner_colors"] = planner_colors
+  ## Results are cached in memory, output is the response
+  plot_config["cache_dir"] = None
+  plot_config["verbosity"] = 0
+  return plot_config
+
+def run_serve(input_arguments):
+  parser = argparse.ArgumentParser(prog='ompl_benchmark_plotter.py serve',
+      description='Serve graphs (pdf, png, svg) and extracted statistics (json) of database files over HTTP. Extracted statistics and rendered graphs are kept in an in-memory cache of at most --cache-size MB, keyed by the fingerprints of the database files, such that repeated requests are answered without reading the databases. The plot options given here are the defaults of all requests.')
+  parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on. Default: 127.0.0.1 (local connections only).')
+  parser.add_argument('--port', type=int, default=8765, help='Port to listen on. Default: 8765.')
+  add_plot_arguments(parser)
+  args = parser.parse_args(input_arguments)
+  if args.quiet:
+    args.verbose = 0
+
+  if parse_planner_colors(args) is None:
+    return 1
+
+  get_config = lambda arguments: get_serve_request_config(args, arguments)
+  serve_plots(PlotServer(get_config, int(args.cache_size * 1024 * 1024), args.verbose), args.host, args.port)
+  return 0
+
+def run_table(input_arguments):
+  parser = argparse.ArgumentParser(prog='ompl_benchmark_plotter.py table',
+      description='Write a LaTeX table (and pdf, if pdflatex is installed) of the mean and standard deviation of the run time of each planner on each experiment. The statistics of each database file are computed with one grouped query, experiments with the same name are pooled across files. Optimizing planners are listed with the time of their first solution.')
+  parser.add_argument('database_files', type=str, nargs='+', help='Database (.db) file(s)')
+  parser.add_argument('-s','--show', action='store_const', const=True, help='Show output as pdf (requires xdg-open).')
+  parser.add_argument('-o','--output-file', type=str, help='Save as filename (.tex).')
+  parser.add_argument('-v','--verbose', type=int, choices=[0,1,2,3], default=1, help='Select verbosity level for stdout.')
+  parser.add_argument('-q', '--quiet', action='store_const', const=True, help='Do not show any output. Invalidates any verbose values.')
+  parser.add_argument('-j','--jobs', type=int, default=1, help='Number of worker processes used to read multiple database files in parallel.')
+  parser.add_argument('-r','--reverse', action='store_const', const=True, help='One row per experiment and one column per planner.')
+  parser.add_argument('--hide-variance', action='store_const', const=True, help='Do not show the standard deviation of the run times.')
+  parser.add_argument('--decimals', type=int, default=2, help='Number of decimals of the run times. Default: 2.')
+  parser.add_argument('-i','--ignore-ending-name', action='store_const', const=True, help='Pool experiments whose names differ only after the last underscore.')
+  parser.add_argument('--include-planner', type=str, help='Only list planners whose name matches this regular expression.')
+  parser.add_argument('--ignore-planner', type=str, nargs='+', help='Names of planners which are not listed.')
+  args = parser.parse_args(input_arguments)
+  if args.quiet:
+    args.verbose = 0
+
+  for fname in args.database_files:
+    if not os.path.isfile(fname):
+      if args.verbose > 0:
+        print("Error: {} is not a file.".format(fname))
+      return 1
+  if args.include_planner is not None:
+    try:
+      re.compile(args.include_planner)
+    except re.error as error:
+      if args.verbose > 0:
+        print("Error: --include-planner {} is not a regular expression ({}).".format(args.include_planner, error))
+      return 1
+
+  table_config = {
+      'verbosity': args.verbose,
+      'show': args.show,
+      'output_file': args.output_file,
+      'jobs': args.jobs,
+      'reverse': args.reverse,
+      'hide_variance': args.hide_variance,
+      'decimals': args.decimals,
+      'ignore_ending_name': args.ignore_ending_name,
+      'include_planner': args.include_planner,
+      'ignore_planner': args.ignore_planner
+  }
+  create_runtime_table_from_databases(args.database_files, table_config)
+  return 0
+
+subcommands = {
+    'convert': run_convert,
+    'batch': run_batch,
+    'summarize': run_summarize,
+    'reduce': run_reduce,
+    'serve': run_serve,
+    'table': run_table
+}
+
+def run_benchmark_plotter(input_arguments):
+  if len(input_arguments) > 0 and input_arguments[0] in subcommands:
+    return subcommands[input_arguments[0]](input_arguments[1:])
+
+  parser = argparse.ArgumentParser(description='Plotting of OMPL Benchmark Files.')
+
+  parser.add_argument('database_files', type=str, nargs='+', help='Database (.db) file(s)')
+  parser.add_argument('-s','--show', action='store_const', const=True, help='Show output as pdf (requires xdg-open).')
+  parser.add_argument('-o','--output-file', type=str, help='Save as filename.')
+  parser.add_argument('-j','--jobs', type=int, default=1, help='Number of worker processes used to read multiple database files in parallel.')
+  parser.add_argument('--profile', action='store_const', const=True, help='Print the time, number of SQL queries and fetched rows of each stage and planner (database files are then read serially).')
+  parser.add_argument('--profile-output', type=str, help='Write the profile as json to this file (implies profiling).')
+  parser.add_argument('--watch', type=float, nargs='?', const=5.0, metavar='SECONDS', help='Poll the database files every SECONDS seconds (default: 5) while a benchmark is still writing them, read only new runs and progress entries and re-render the graphs whenever they changed. Stop with Ctrl-C.')
+  add_plot_arguments(parser)
+
+  args = parser.parse_args(input_arguments)
+  if args.quiet:
+    args.verbose = 0
+
+  ############################################################
+  ## Parse custom planner colors
+  ############################################################
+  planner_colors = parse_planner_colors(args)
+  if planner_colors is None:
+    return 1
 
   ############################################################
   ## Sanity checks
@@ -71,6 +326,23 @@ def run_benchmark_plotter(input_arguments):
       print("Error: Cannot run with --show option if xdg-open is not installed.")
       return 1
 
+  if args.data_only and args.intermediate == 'none':
+    if args.verbose > 0:
+      print("Error: Cannot run with --data-only and --intermediate none.")
+    return 1
+
+  if args.watch is not None and args.time_grid == 'events':
+    if args.verbose > 0:
+      print("Error: Cannot run with --watch and --time-grid events.")
+    return 1
+
+  if args.include_planner is not None:
+    try:
+      re.compile(args.include_planner)
+    except re.error as error:
+      print("Error: --include-planner {} is not a regular expression ({}).".format(args.include_planner, error))
+      return 1
+
   for fname in args.database_files:
     if fname is None or not os.path.isfile(fname):
       if args.verbose > 0:
@@ -85,8 +357,24 @@ def run_benchmark_plotter(input_arguments):
 
   plot_config = make_config(args)
   plot_config["planner_colors"] = planner_colors
-  plot_graph_from_databases(args.database_files, plot_config)
 
+  if args.watch is not None:
+    watch_databases(args.database_files, plot_config, args.watch)
+    return 0
+
+  profiler = None
+  if args.profile or args.profile_output:
+    profiler = enable_profiler()
+  try:
+    plot_graph_from_databases(args.database_files, plot_config)
+  finally:
+    disable_profiler()
+
+  if profiler is not None:
+    if args.profile:
+      print_profile(profiler)
+    if args.profile_output:
+      write_json_atomic(args.profile_output, profiler.get_report(), indent=2)
   return 0
 
 if __name__ == '__main__':
@@ -0,0 +1,173 @@
+import argparse
+import copy
+
+from src.database_to_graph import *
+
+############################################################
+### Python API
+###
+### Extracts planner curves of database files and renders
+### them into matplotlib figures in the calling process,
+### without writing files (unless a cache_dir is given) and
+### without the pyplot figure manager:
+###
+###   from src.api import load, iter_load, render
+###   curves = load(["a.db", "b.db"], max_cost=40)
+###   fig = render(curves)
+###   for planner in iter_load("a.db"):
+###     print(planner.names[0], planner.success[0, -1])
+###
+### Options are the plot options of the command line with
+### underscores (max_cost, time_grid, include_planner, ...)
+### and planner_colors ({name: (r, g, b, a)}).
+############################################################
+
+## Options of load, iter_load and render with their defaults (the defaults of
+## the command line, but without output)
+kApiOptions = {
+    'verbose': 0,
+    'max_cost': None,
+    'min_cost': None,
+    'max_time': None,
+    'min_time': None,
+    'fontsize': None,
+    'linewidth': None,
+    'label_fontsize': None,
+    'only_success_graph': None,
+    'no_title': None,
+    'title_name': None,
+    'remove_ylabel': None,
+    'ignore_non_optimal_planner': None,
+    'ignore_planner': None,
+    'include_planner': None,
+    'legend_below_figure': None,
+    'legend_none': None,
+    'fast_render': None,
+    'raster_dpi': 100,
+    'time_grid': 'logspace',
+    'max_points': 200,
+    'ci_method': None,
+    'bootstrap_samples': None,
+    'bootstrap_confidence': None,
+    'bootstrap_workers': 1,
+    'in_memory': None,
+    'memory_budget': None,
+    'jobs': 1,
+    'cache_dir': None,
+    'cache_size': 512,
+    'planner_colors': None
+}
+
+## Command line options without meaning for the API
+kApiFixedOptions = {
+    'show': None,
+    'output_file': None,
+    'legend_separate_file': None,
+    'data_only': None,
+    'intermediate': 'none',
+    'formats': ['pdf']
+}
+
+## Options which are stored in the info of the curves, and which render
+## applies on top of the info of load
+kApiInfoOptions = ['fontsize', 'linewidth', 'label_fontsize', 'remove_ylabel', 'planner_colors']
+
+def get_api_config(options):
+  ## Plot config of API options (raises TypeError for unknown options)
+  unknown_options = sorted(set(options) - set(kApiOptions))
+  if len(unknown_options) > 0:
+    raise TypeError("Unknown options {} (one of {}).".format(unknown_options, sorted(kApiOptions)))
+  values = dict(kApiOptions, **kApiFixedOptions)
+  values.update(options)
+  planner_colors = values.pop('planner_colors')
+  plot_config = make_config(argparse.Namespace(**values))
+  plot_config["planner_colors"] = dict(planner_colors or {})
+  return plot_config
+
+def get_database_filepath_list(database_filepaths):
+  if isinstance(database_filepaths, (str, os.PathLike)):
+    return [os.fspath(database_filepaths)]
+  return [os.fspath(database_filepath) for database_filepath in database_filepaths]
+
+def select_experiment(experiments, experiment_name):
+  ## Data of the named experiment, or of the only experiment
+  if experiment_name is None:
+    if len(experiments) != 1:
+      raise ValueError("Select one of the experiments {} with experiment=.".format(sorted(experiments.keys())))
+    experiment_name = next(iter(experiments))
+  if experiment_name not in experiments:
+    raise ValueError("No experiment {} in the databases (one of {}).".format(experiment_name, sorted(experiments.keys())))
+  return experiments[experiment_name]
+
+def load(database_filepaths, experiment=None, **options):
+  ## PlannerCurves of an experiment (by name, or the only experiment) of one
+  ## or several database files
+  config = get_api_config(options)
+  experiments = get_experiments_from_databases(get_database_filepath_list(database_filepaths), config)
+  return PlannerCurves.from_data(select_experiment(experiments, experiment))
+
+def iter_load(database_filepaths, experiment=None, **options):
+  ## Generator variant of load, which yields a PlannerCurves with one planner
+  ## as soon as its curves are extracted (of all experiments, unless one is
+  ## selected). Files are read one after another. A planner which occurs in
+  ## several files is yielded once per file, and load returns the curves
+  ## of the last file.
+  config = get_api_config(options)
+  data = get_data_from_config(config)
+  result_cache = None
+  if config['cache_dir']:
+    result_cache = ResultCache(config['cache_dir'], config['cache_size'])
+
+  for database_filepath in get_database_filepath_list(database_filepaths):
+    result = {"experiments": {}}
+    for (experiment_name, planner_name) in iter_data_from_database_file(database_filepath, data["info"], config,
+        result, result_cache):
+      if experiment is not None and experiment_name != experiment:
+        continue
+      experiment_result = result["experiments"][experiment_name]
+      planner_result = {"experiments": {experiment_name: {
+          "info": experiment_result["info"],
+          "planners": {planner_name: experiment_result["planners"][planner_name]}
+      }}}
+      yield PlannerCurves.from_data(merge_experiment_results(data, [planner_result])[experiment_name])
+
+def get_render_axes(ax):
+  ## Success axis, or success and cost axes, of the ax argument of render
+  if isinstance(ax, (list, tuple, np.ndarray)):
+    axs = list(np.ravel(ax))
+  else:
+    axs = [ax]
+  if not 1 <= len(axs) <= 2:
+    raise ValueError("Expected a success axis, or a success and a cost axis, but got {} axes.".format(len(axs)))
+  return axs
+
+def render(curves, ax=None, **options):
+  ## Figure with the success and cost graphs of the curves. If ax is given,
+  ## the graphs are drawn into it (one axis: only the success graph, two
+  ## axes: success and cost graph) and its figure is returned. Otherwise,
+  ## a new figure is created which is not managed by pyplot (and which is
+  ## shown by notebooks or written with fig.savefig).
+  config = get_api_config(options)
+  ## Fonts and styles of the graphs
+  get_pyplot()
+
+  ## Axis limits are written to the info of the curves while plotting
+  info = copy.deepcopy(curves.info)
+  style_info = get_data_from_config(config)["info"]
+  for key in kApiInfoOptions:
+    if options.get(key) is not None:
+      info[key] = style_info[key]
+  curves = copy.copy(curves)
+  curves.info = info
+
+  if ax is None:
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=kGraphFigureSize)
+    axs = get_graph_axes(fig, config)
+  else:
+    axs = get_render_axes(ax)
+    fig = axs[0].figure
+    if len(axs) == 1:
+      config["only_success_graph"] = True
+  plot_graph(axs, curves, config)
+  return fig
@@ -0,0 +1,104 @@
+import glob
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.database_info import *
+
+def find_database_files(inputs):
+  ## Database files in the given directories (recursively) or glob patterns,
+  ## sorted and without duplicates
+  database_filepaths = set()
+  for path in inputs:
+    if os.path.isdir(path):
+      for (directory, _, filenames) in os.walk(path):
+        for filename in filenames:
+          if os.path.splitext(filename)[1] == '.db':
+            database_filepaths.add(os.path.join(directory, filename))
+    else:
+      for filepath in glob.glob(path, recursive=True):
+        if os.path.isfile(filepath) and os.path.splitext(filepath)[1] == '.db':
+          database_filepaths.add(filepath)
+  return sorted(database_filepaths)
+
+def get_experiment_names_from_database_file(database_filepath):
+  con = connect_database(database_filepath)
+  try:
+    return sorted(set(get_experiment_names_from_database(con.cursor())))
+  finally:
+    con.close()
+
+def group_databases_by_experiment(database_filepaths):
+  ## Map each experiment name to all database files with runs of that
+  ## experiment (a file with several experiments is in several groups).
+  ## Files which cannot be read form a group of their own, such that the
+  ## error is reported in the manifest.
+  groups = {}
+  for database_filepath in database_filepaths:
+    try:
+      experiment_names = get_experiment_names_from_database_file(database_filepath)
+    except sqlite3.Error:
+      experiment_names = [database_filepath]
+    for experiment_name in experiment_names:
+      groups.setdefault(experiment_name, []).append(database_filepath)
+  return groups
+
+def get_batch_output_filepath(experiment_name, database_filepaths, output_dir):
+  filename = re.sub(r'[^\w.-]+', '_', experiment_name) + ".pdf"
+  if output_dir is None:
+    output_dir = os.path.dirname(database_filepaths[0])
+  return os.path.abspath(os.path.join(output_dir, filename))
+
+def init_render_worker():
+  ## Import matplotlib and register fonts once per worker instead of once
+  ## per graph
+  from src.database_to_graph import get_pyplot
+  get_pyplot()
+
+def render_batch_job(experiment_name, database_filepaths, config):
+  from src.database_to_graph import plot_graph_from_databases
+  start = time.time()
+  entry = {
+      "experiment": experiment_name,
+      "databases": database_filepaths,
+      "output": []
+  }
+  try:
+    ## Files actually written (graph formats and separate legend)
+    entry["output"] = plot_graph_from_databases(database_filepaths, config)
+    entry["status"] = "ok"
+  except Exception as e:
+    entry["status"] = "error"
+    entry["error"] = str(e)
+  entry["seconds"] = time.time() - start
+  return entry
+
+def plot_batch(groups, config, output_dir, workers):
+  ## Render one graph per experiment in a pool of long-lived worker
+  ## processes. Returns the manifest, one entry per experiment.
+  if output_dir is not None:
+    os.makedirs(output_dir, exist_ok=True)
+
+  jobs = []
+  for (experiment_name, database_filepaths) in sorted(groups.items()):
+    job_config = dict(config)
+    ## Only the runs of this experiment are read from its files
+    job_config["experiment"] = experiment_name
+    job_config["output_file"] = get_batch_output_filepath(experiment_name, database_filepaths, output_dir)
+    jobs.append((experiment_name, database_filepaths, job_config))
+
+  with ProcessPoolExecutor(max_workers=max(1, workers), initializer=init_render_worker) as executor:
+    futures = [executor.submit(render_batch_job, *job) for job in jobs]
+    return [future.result() for future in futures]
+
+def print_manifest(manifest):
+  print(80*"-")
+  print("{:<30} {:>6} {:>8}  {}".format("Experiment", "Files", "Time [s]", "Output"))
+  print(80*"-")
+  for entry in manifest:
+    output = ", ".join(entry["output"]) if entry["status"] == "ok" else "ERROR: {}".format(entry["error"])
+    print("{:<30} {:>6} {:>8.2f}  {}".format(entry["experiment"], len(entry["databases"]), entry["seconds"], output))
+  print(80*"-")
@@ -0,0 +1,172 @@
+import warnings
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+############################################################
+### Bootstrap confidence intervals (--ci-method bootstrap)
+###
+### Runs are resampled with replacement as a batched (resamples
+### x runs) index matrix, which is reduced to the number of
+### draws of each run per resample. The statistic of all
+### resamples is then computed at all time samples at once:
+### success percentages are the product of the counts with
+### the (runs x times) indicator of solved runs, medians are
+### read from the cumulative counts of the runs in the order
+### of their cost at each time sample. Resamples are processed
+### in chunks of bounded memory, distributed over worker
+### processes if requested. Each chunk has its own seed, so
+### results do not depend on the number of workers.
+############################################################
+
+## Resamples per chunk, which bounds the memory of the count matrices
+## to kBootstrapChunkSize x runs entries
+kBootstrapChunkSize = 250
+
+## Width of the window of runs around the median of a column, in units of
+## sqrt(runs). The position of the median of a resample has a standard
+## deviation of about sqrt(runs) / 2, so the window covers six of them on
+## either side.
+kMedianWindowWidth = 6
+
+def get_bootstrap_config(info, config):
+  ## Parameters of the bootstrap, None for percentile bands (the default)
+  if info.get("ci_method", "percentile") != "bootstrap":
+    return None
+  return {
+      "samples": info["bootstrap_samples"],
+      "confidence": info["bootstrap_confidence"],
+      "seed": info["bootstrap_seed"],
+      "workers": config.get("bootstrap_workers", 1)
+  }
+
+def get_count_dtype(run_count):
+  ## Cumulative counts of a resample are at most run_count
+  return np.uint16 if run_count < np.iinfo(np.uint16).max else np.uint32
+
+def get_resample_counts(rng, run_count, resample_count):
+  ## (resamples x runs) number of draws of each run
+  indices = rng.integers(0, run_count, size=(resample_count, run_count))
+  indices += np.arange(resample_count)[:, np.newaxis] * run_count
+  counts = np.bincount(indices.ravel(), minlength=resample_count * run_count)
+  return counts.reshape(resample_count, run_count).astype(get_count_dtype(run_count))
+
+def get_rank_positions(cumulative, ranks):
+  ## Position of the first entry of each row of the cumulative counts
+  ## which exceeds the rank of the row
+  return np.count_nonzero(cumulative <= ranks[:, np.newaxis], axis=1)
+
+def get_median_windows(values):
+  ## Order of the valid values of each column of the (runs x columns)
+  ## values and the window of runs around the median of each column (see
+  ## get_resampled_medians). Shared by all chunks of resamples.
+  (run_count, column_count) = values.shape
+  valid = ~np.isnan(values)
+  valid_counts = np.count_nonzero(valid, axis=0)
+  ## NaN entries are sorted to the end of each column
+  order = np.argsort(values, axis=0, kind='stable')
+  ranks = np.empty_like(order)
+  ranks[order, np.arange(column_count)] = np.arange(run_count)[:, np.newaxis]
+
+  half_width = int(np.ceil(kMedianWindowWidth * np.sqrt(run_count) / 2)) + 1
+  window_start = np.maximum(valid_counts // 2 - half_width, 0)
+  window_end = np.minimum(valid_counts // 2 + half_width, valid_counts)
+  ## Indicators of the runs below the window and of the valid runs, exact
+  ## for counts below 2^24 in float32
+  dtype = np.float32 if run_count < (1 << 24) else np.float64
+  indicators = np.concatenate([ranks < window_start, valid], axis=1).astype(dtype)
+  return {"order": order, "valid_counts": valid_counts, "window_start": window_start,
+      "window_end": window_end, "indicators": indicators}
+
+def get_resampled_medians(values, counts, windows=None):
+  ## (resamples x columns) medians of the columns of the (runs x columns)
+  ## values, ignoring NaN entries, with the same definition as
+  ## get_quantiles_from_cost_matrix.
+  ##
+  ## The median of a resample is the value of the first run (in the order
+  ## of the values of a column) at which the cumulative count of the drawn
+  ## runs exceeds half of the drawn valid runs. It is almost surely close
+  ## to the median of the sample, so cumulative counts are only formed in a
+  ## window of kMedianWindowWidth * sqrt(runs) runs around it. The counts
+  ## below the window (and of all valid runs) of all columns are one matrix
+  ## product. Resamples whose median lies outside the window are evaluated
+  ## over all runs.
+  if windows is None:
+    windows = get_median_windows(values)
+  (order, valid_counts) = (windows["order"], windows["valid_counts"])
+  (window_start, window_end) = (windows["window_start"], windows["window_end"])
+  column_count = values.shape[1]
+  medians = np.full((len(counts), column_count), np.nan)
+
+  indicators = windows["indicators"]
+  sums = np.rint(counts.astype(indicators.dtype) @ indicators).astype(np.int32)
+  (drawn_below, drawn) = (sums[:, :column_count], sums[:, column_count:])
+
+  for column in range(column_count):
+    if valid_counts[column] == 0:
+      continue
+    column_order = order[:valid_counts[column], column]
+    sorted_values = values[column_order, column]
+    window = column_order[window_start[column]:window_end[column]]
+    cumulative = np.cumsum(counts[:, window], axis=1, dtype=np.int32)
+    cumulative += drawn_below[:, column, np.newaxis]
+
+    column_drawn = drawn[:, column]
+    positions = []
+    for rank in [np.maximum(column_drawn - 1, 0) // 2, column_drawn // 2]:
+      position = window_start[column] + get_rank_positions(cumulative, rank)
+      outside = np.flatnonzero((column_drawn > 0) &
+          ((drawn_below[:, column] > rank) | (cumulative[:, -1] <= rank)))
+      if len(outside) > 0:
+        full_cumulative = np.cumsum(counts[outside][:, column_order], axis=1, dtype=np.int32)
+        position[outside] = get_rank_positions(full_cumulative, rank[outside])
+      positions.append(np.minimum(position, valid_counts[column] - 1))
+    medians[:, column] = np.where(column_drawn > 0,
+        (sorted_values[positions[0]] + sorted_values[positions[1]]) / 2, np.nan)
+  return medians
+
+def get_resampled_percentages(indicators, counts):
+  ## (resamples x columns) percentage of drawn runs with indicator set
+  return (counts.astype(float) @ indicators.astype(float)) * (100.0 / indicators.shape[0])
+
+def get_bootstrap_chunk(statistic, values, windows, seed, chunk_index, resample_count):
+  rng = np.random.default_rng([seed, chunk_index])
+  counts = get_resample_counts(rng, values.shape[0], resample_count)
+  if statistic == "median":
+    return get_resampled_medians(values, counts, windows)
+  return get_resampled_percentages(values, counts)
+
+def get_bootstrap_interval(statistic, values, bootstrap):
+  ## Lower and upper bound of the percentile bootstrap confidence interval
+  ## of the statistic ("median" or "percentage") of each column of the
+  ## (runs x columns) values. Columns without any valid resample are NaN.
+  if values.shape[0] == 0:
+    empty = np.full(values.shape[1], np.nan)
+    return empty, empty.copy()
+  samples = bootstrap["samples"]
+  chunk_sizes = [min(kBootstrapChunkSize, samples - start) for start in range(0, samples, kBootstrapChunkSize)]
+  windows = get_median_windows(values) if statistic == "median" else None
+  arguments = (repeat(statistic), repeat(values), repeat(windows), repeat(bootstrap["seed"]),
+      range(len(chunk_sizes)), chunk_sizes)
+  if bootstrap["workers"] > 1 and len(chunk_sizes) > 1:
+    with ProcessPoolExecutor(max_workers=bootstrap["workers"]) as executor:
+      resampled = np.concatenate(list(executor.map(get_bootstrap_chunk, *arguments)))
+  else:
+    resampled = np.concatenate(list(map(get_bootstrap_chunk, *arguments)))
+
+  tail = (100.0 - bootstrap["confidence"]) / 2
+  with warnings.catch_warnings():
+    warnings.simplefilter("ignore", category=RuntimeWarning)
+    lower, upper = np.nanpercentile(resampled, [tail, 100.0 - tail], axis=0)
+  return lower, upper
+
+def get_bootstrap_success_interval(event_times, run_count, times, bootstrap, inclusive=True):
+  ## Confidence interval of the success percentage (as computed by
+  ## get_success_from_sorted_times) at each time sample. event_times holds
+  ## the success time of each successful run, the other runs never succeed.
+  event_times = np.append(np.asarray(event_times, dtype=float), np.full(run_count - len(event_times), np.inf))
+  if inclusive:
+    indicators = event_times[:, np.newaxis] <= times[np.newaxis, :]
+  else:
+    indicators = event_times[:, np.newaxis] < times[np.newaxis, :]
+  return get_bootstrap_interval("percentage", indicators, bootstrap)
@@ -0,0 +1,238 @@
+import json
+import os
+import shutil
+import sqlite3
+import numpy as np
+from src.database_schema import *
+from src.database_connection import *
+
+## Bump whenever the layout of the sidecar directory changes
+kColumnarVersion = 1
+
+## Number of progress rows converted per fetchmany call
+kColumnarChunkSize = 1 << 20
+
+## Status of a run which found an exact solution (ompl::base::PlannerStatus)
+kStatusExactSolution = 6
+
+def get_columnar_database_path(database_filepath):
+  return database_filepath + ".columns"
+
+def get_database_file_stat(database_filepath):
+  stat = os.stat(database_filepath)
+  return {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+def save_column(directory, name, values, dtype):
+  np.save(os.path.join(directory, name + ".npy"), np.asarray(values, dtype=dtype))
+
+def convert_database_to_columnar(database_filepath, dtype='float32', verbosity=0):
+  ############################################################
+  ### Write runs and progress of a database file as flat
+  ### NumPy arrays into a sidecar directory next to it.
+  ############################################################
+  directory = get_columnar_database_path(database_filepath)
+  tmp_directory = "{}.{}.tmp".format(directory, os.getpid())
+  shutil.rmtree(tmp_directory, ignore_errors=True)
+  os.makedirs(tmp_directory)
+
+  con = connect_database(database_filepath)
+  cursor = con.cursor()
+  schema = DatabaseSchema(cursor)
+
+  experiments = cursor.execute("SELECT id, name, timelimit FROM {}".format('experiments')).fetchall()
+  planners = cursor.execute("SELECT id, name FROM {}".format('plannerConfigs')).fetchall()
+
+  ## Runs sorted by id. Missing columns and NULL entries are stored as NaN
+  ## (float columns) or -1 (integer columns).
+  solution_length = 'solution_length' if schema.has_column('runs', 'solution_length') else 'NULL'
+  runs = cursor.execute("SELECT id, experimentid, plannerid, time, status, {} FROM {} \
+      ORDER BY id".format(solution_length, 'runs')).fetchall()
+  runs = np.array(runs, dtype=float).reshape(-1, 6)
+  integer_columns = np.where(np.isnan(runs[:, [0, 1, 2, 4]]), -1, runs[:, [0, 1, 2, 4]])
+  save_column(tmp_directory, "runs_id", integer_columns[:, 0], np.int32)
+  save_column(tmp_directory, "runs_experimentid", integer_columns[:, 1], np.int32)
+  save_column(tmp_directory, "runs_plannerid", integer_columns[:, 2], np.int32)
+  save_column(tmp_directory, "runs_status", integer_columns[:, 3], np.int32)
+  save_column(tmp_directory, "runs_time", runs[:, 3], dtype)
+  save_column(tmp_directory, "runs_solution_length", runs[:, 5], dtype)
+
+  ## Progress sorted by (runid, time), streamed into memory-mapped output
+  ## arrays such that arbitrarily large progress tables can be converted.
+  has_progress = schema.has_column('progress', 'best_cost')
+  number_progress = 0
+  if has_progress:
+    number_progress = cursor.execute("SELECT COUNT(*) FROM {}".format('progress')).fetchall()[0][0]
+  progress_columns = {}
+  for (name, column_dtype) in [("runid", np.int32), ("time", dtype), ("best_cost", dtype)]:
+    progress_columns[name] = np.lib.format.open_memmap(os.path.join(tmp_directory,
+      "progress_" + name + ".npy"), mode='w+', dtype=column_dtype, shape=(number_progress,))
+  if has_progress:
+    query = cursor.execute("SELECT runid, time, best_cost FROM {} ORDER BY runid, time".format('progress'))
+    start = 0
+    while True:
+      rows = query.fetchmany(kColumnarChunkSize)
+      if len(rows) == 0:
+        break
+      rows = np.array(rows, dtype=float).reshape(-1, 3)
+      end = start + len(rows)
+      progress_columns["runid"][start:end] = rows[:, 0]
+      progress_columns["time"][start:end] = rows[:, 1]
+      progress_columns["best_cost"][start:end] = rows[:, 2]
+      start = end
+
+  ## Progress entries of the i-th run are at [offsets[i, 0], offsets[i, 1])
+  offsets = np.stack([
+    np.searchsorted(progress_columns["runid"], integer_columns[:, 0], side='left'),
+    np.searchsorted(progress_columns["runid"], integer_columns[:, 0], side='right')], axis=1)
+  save_column(tmp_directory, "run_offsets", offsets, np.int64)
+  for column in progress_columns.values():
+    column.flush()
+  del progress_columns
+
+  meta = {
+      "version": kColumnarVersion,
+      "dtype": dtype,
+      "database": get_database_file_stat(database_filepath),
+      "columns": schema.columns,
+      "experiments": experiments,
+      "planners": planners
+  }
+  with open(os.path.join(tmp_directory, "meta.json"), 'w') as jsonfile:
+    json.dump(meta, jsonfile)
+  con.close()
+
+  shutil.rmtree(directory, ignore_errors=True)
+  os.replace(tmp_directory, directory)
+  if verbosity > 0:
+    print("Wrote columnar database {} ({} runs, {} progress entries).".format(directory, len(runs), number_progress))
+  return directory
+
+def load_columnar_database(database_filepath):
+  ## Open the sidecar of a database file if it exists and is up to date
+  directory = get_columnar_database_path(database_filepath)
+  meta_filepath = os.path.join(directory, "meta.json")
+  if not os.path.isfile(meta_filepath):
+    return None
+  with open(meta_filepath, 'r') as jsonfile:
+    meta = json.load(jsonfile)
+  if meta["version"] != kColumnarVersion:
+    return None
+  if meta["database"] != get_database_file_stat(database_filepath):
+    return None
+  return ColumnarDatabase(directory, meta)
+
+class ColumnarDatabase:
+  ## Read-only view on a sidecar directory written by
+  ## convert_database_to_columnar. All columns are memory-mapped, such that
+  ## only the slices which are accessed are read from disk.
+
+  def __init__(self, directory, meta):
+    self.directory = directory
+    self.meta = meta
+    self.dtype = meta["dtype"]
+    self.schema = DatabaseSchema.from_columns(meta["columns"])
+    self.columns = {}
+
+  def close(self):
+    self.columns = {}
+
+  def get_column(self, name):
+    if name not in self.columns:
+      self.columns[name] = np.load(os.path.join(self.directory, name + ".npy"), mmap_mode='r')
+    return self.columns[name]
+
+  def get_experiments(self):
+    return [tuple(experiment) for experiment in self.meta["experiments"]]
+
+  def get_planners(self):
+    return [tuple(planner) for planner in self.meta["planners"]]
+
+  def get_experiment_planner_groups(self):
+    ## (experimentid, plannerid, number of runs) for each combination with runs
+    pairs = np.stack([self.get_column("runs_experimentid"), self.get_column("runs_plannerid")], axis=1)
+    groups, counts = np.unique(pairs, axis=0, return_counts=True)
+    return [(int(group[0]), int(group[1]), int(count)) for (group, count) in zip(groups, counts)]
+
+  def get_planner_summaries(self, experiment_ids=None, with_progress=True):
+    ## (plannerid, name, runs, solved runs, progress entries, progress
+    ## entries with best_cost, time limit) of each planner with runs, as
+    ## queried by database_info.get_planner_summaries
+    planner_ids = self.get_column("runs_plannerid")
+    selected = np.ones(len(planner_ids), dtype=bool)
+    if experiment_ids is not None:
+      selected = np.isin(self.get_column("runs_experimentid"), experiment_ids)
+    if with_progress:
+      offsets = self.get_column("run_offsets")
+      ## Cumulative number of progress entries with a best_cost, such that
+      ## the entries of each run are a difference at its offsets
+      cost_entries = np.concatenate([[0], np.cumsum(~np.isnan(self.get_column("progress_best_cost")))])
+    names = dict(self.get_planners())
+    time_limits = dict((experiment[0], experiment[2]) for experiment in self.get_experiments())
+    summaries = []
+    for planner_id in np.unique(planner_ids[selected]):
+      indices = np.flatnonzero(selected & (planner_ids == planner_id))
+      solved_count = np.count_nonzero(self.get_column("runs_status")[indices] == kStatusExactSolution)
+      (progress_rows, cost_rows) = (None, None)
+      if with_progress:
+        progress_rows = int(np.sum(offsets[indices, 1] - offsets[indices, 0]))
+        cost_rows = int(np.sum(cost_entries[offsets[indices, 1]] - cost_entries[offsets[indices, 0]]))
+      time_limit = max((time_limits[experiment_id] for experiment_id in
+        np.unique(self.get_column("runs_experimentid")[indices]) if experiment_id in time_limits), default=None)
+      summaries.append((int(planner_id), names.get(int(planner_id)), len(indices), solved_count, progress_rows,
+        cost_rows, time_limit))
+    return summaries
+
+  def get_run_indices(self, planner_id, experiment_ids=None):
+    selected = self.get_column("runs_plannerid") == planner_id
+    if experiment_ids is not None:
+      selected &= np.isin(self.get_column("runs_experimentid"), experiment_ids)
+    return np.flatnonzero(selected)
+
+  def get_run_ids(self, planner_id, experiment_ids=None):
+    return np.asarray(self.get_column("runs_id")[self.get_run_indices(planner_id, experiment_ids)])
+
+  def get_run_times(self, planner_id, experiment_ids=None):
+    return np.sort(self.get_column("runs_time")[self.get_run_indices(planner_id, experiment_ids)].astype(float))
+
+  def get_solved_runs(self, planner_id, experiment_ids=None):
+    ## (time, solution_length) of all runs with an exact solution
+    indices = self.get_run_indices(planner_id, experiment_ids)
+    indices = indices[self.get_column("runs_status")[indices] == kStatusExactSolution]
+    return np.stack([self.get_column("runs_time")[indices].astype(float),
+      self.get_column("runs_solution_length")[indices].astype(float)], axis=1)
+
+  def get_runs(self, experiment_ids=None):
+    ## (plannerid, id, time, status, solution_length) rows of the runs in the
+    ## given experiments ordered by (plannerid, id), as queried by
+    ## database_info.get_runs_by_planner_from_database
+    selected = np.arange(len(self.get_column("runs_id")))
+    if experiment_ids is not None:
+      selected = np.flatnonzero(np.isin(self.get_column("runs_experimentid"), experiment_ids))
+    columns = [self.get_column(name)[selected].astype(float) for name in
+      ["runs_plannerid", "runs_id", "runs_time", "runs_status", "runs_solution_length"]]
+    order = np.lexsort((columns[1], columns[0]))
+    return np.stack(columns, axis=1)[order]
+
+  def get_progress(self, runs):
+    ## (runid, time, best_cost) rows of the given runs sorted by (runid, time),
+    ## equivalent to database_info.get_progress_from_database
+    run_ids = self.get_column("runs_id")
+    offsets = self.get_column("run_offsets")
+    run_indices = np.searchsorted(run_ids, np.sort(np.asarray(runs, dtype=np.int64)))
+    starts = offsets[run_indices, 0]
+    lengths = offsets[run_indices, 1] - starts
+    ## Concatenate the ranges [start, start + length) of all runs
+    positions = np.arange(np.sum(lengths)) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.stack([self.get_column("progress_runid")[positions].astype(float),
+      self.get_column("progress_time")[positions].astype(float),
+      self.get_column("progress_best_cost")[positions].astype(float)], axis=1)
+
+  def get_progress_times(self, runs):
+    ## Sorted distinct progress times of the given runs
+    return np.unique(self.get_progress(runs)[:, 1])
+
+  def get_first_solution_times(self, runs):
+    progress = self.get_progress(runs)
+    solved = progress[~np.isnan(progress[:, 2])]
+    _, first = np.unique(solved[:, 0], return_index=True)
+    return np.sort(solved[first, 1])
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+from urllib.request import pathname2url
+from src.database_schema import DatabaseConnection
+
+############################################################
+### Read-only, tuned connections to benchmark databases
+###
+### Databases are opened through a mode=ro URI, such that the
+### file is never modified, and with immutable=1 if no writer
+### can be active (no -wal or -journal file next to it and the
+### caller does not expect one, see --watch), which
+### skips all file locking and change detection. Small files
+### can be copied into an in-memory database with the backup
+### API, where additional indexes are built.
+############################################################
+
+## Memory-map up to 256 MiB of the database file and cache up to 64 MiB of
+## pages, temporary tables and indexes are kept in memory
+kMmapSize = 1 << 28
+kCacheSizeKiB = 1 << 16
+
+## Indexes built on in-memory copies (table, columns). The progress table
+## of OMPL databases already has its (runid, time) primary key index.
+kInMemoryIndexes = [("runs", ["plannerid", "time"]), ("progress", ["runid", "time"])]
+
+def get_database_uri(database_filepath, immutable=True):
+  uri = "file:{}?mode=ro".format(pathname2url(os.path.abspath(database_filepath)))
+  if immutable and not os.path.exists(database_filepath + "-wal") and not os.path.exists(database_filepath + "-journal"):
+    uri += "&immutable=1"
+  return uri
+
+def tune_connection(con):
+  con.execute("PRAGMA mmap_size={}".format(kMmapSize))
+  con.execute("PRAGMA cache_size=-{}".format(kCacheSizeKiB))
+  con.execute("PRAGMA temp_store=MEMORY")
+
+def has_index_on_columns(con, table_name, column_names):
+  ## True if an index of the table starts with the given columns
+  for index in con.execute("PRAGMA index_list(\"{}\")".format(table_name)).fetchall():
+    index_columns = [column[2] for column in con.execute("PRAGMA index_info(\"{}\")".format(index[1])).fetchall()]
+    if index_columns[:len(column_names)] == column_names:
+      return True
+  return False
+
+def create_in_memory_indexes(con):
+  for (table_name, column_names) in kInMemoryIndexes:
+    columns = [column[1] for column in con.execute("PRAGMA table_info(\"{}\")".format(table_name)).fetchall()]
+    if not all(column_name in columns for column_name in column_names):
+      continue
+    if has_index_on_columns(con, table_name, column_names):
+      continue
+    con.execute("CREATE INDEX \"{0}_{1}\" ON \"{0}\" ({2})".format(table_name, "_".join(column_names),
+      ", ".join(column_names)))
+
+def connect_database(database_filepath, in_memory_size=0, immutable=True, timeout=5.0):
+  ## Read-only connection to a database file. Files of at most
+  ## in_memory_size bytes are copied into memory. Connections to files
+  ## which are still written must not be immutable, timeout is the time to
+  ## wait for locks of the writer (in seconds).
+  con = sqlite3.connect(get_database_uri(database_filepath, immutable), uri=True, timeout=timeout,
+      factory=DatabaseConnection)
+  tune_connection(con)
+  if in_memory_size > 0 and os.path.getsize(database_filepath) <= in_memory_size:
+    memory_con = sqlite3.connect(":memory:", factory=DatabaseConnection)
+    con.backup(memory_con)
+    con.close()
+    memory_con.execute("PRAGMA temp_store=MEMORY")
+    create_in_memory_indexes(memory_con)
+    return memory_con
+  return con
@@ -1,94 +1,476 @@
 import json
 import os
+import re
 import sys
 import numpy as np
 import sqlite3
 from itertools import repeat
 from pathlib import Path
 from src.get_plot_style import *
+from src.database_schema import *
+from src.columnar_database import *
+from src.profiler import *
+from src.bootstrap import *
+from src.planner_curves import *
+
+## Estimated peak memory of one fetched progress row (Python tuple, floats
+## and the converted NumPy row), used to translate a memory budget into a
+## number of rows per fetchmany call.
+kProgressRowBytes = 256
+
+def get_progress_chunk_size(memory_budget):
+  if memory_budget is None:
+    return None
+  return max(1, int(memory_budget // kProgressRowBytes))
+
+## Estimated peak memory of one cost matrix entry while its quantiles are
+## computed (the entry, its sorted copy and the progress entry index)
+kCostEntryBytes = 24
+
+def get_cost_column_chunk_size(memory_budget, run_count):
+  ## Number of time samples per cost matrix of the given runs within a
+  ## memory budget (None: all time samples at once)
+  if memory_budget is None:
+    return None
+  return max(1, int(memory_budget // (kCostEntryBytes * max(1, run_count))))
+
+def is_columnar_database(cursor):
+  ## Functions in this file accept either a sqlite3 cursor or a
+  ## ColumnarDatabase (memory-mapped sidecar of a database file)
+  return isinstance(cursor, ColumnarDatabase)
+
+def get_experiment_filter(experiment_ids):
+  ## SQL condition restricting runs to the given experiments (None: all
+  ## runs) and its parameters
+  if experiment_ids is None:
+    return ("", ())
+  experiment_ids = tuple(int(i) for i in experiment_ids)
+  return (" AND experimentid IN ({})".format(','.join('?' * len(experiment_ids))), experiment_ids)
 
-def get_cost_results(cursor, runids, times, max_cost, ci_left, ci_right):
-    medians = np.zeros(len(times))
-    quantile5 = np.zeros(len(times))
-    quantile95 = np.zeros(len(times))
-
-    improvement = False
-    for i in range(len(times)):
-        data = np.array(cursor.execute("SELECT a.best_cost FROM (SELECT MAX(time), \
-          best_cost FROM {0} WHERE time<={1} AND runid in ({2}) GROUP BY runid) a".format('progress', times[i], runids)).fetchall()).flatten()
-        if data.size == 0:
-            medians[i] = max_cost
-            quantile5[i] = max_cost
-            quantile95[i] = max_cost
-        else:
-            data = np.where(data == None, max_cost, data)
-            medians[i] = np.median(data)
-            quantile5[i] = np.percentile(data, ci_left, interpolation='nearest')
-            quantile95[i] = np.percentile(data, ci_right, interpolation='nearest')
-            improvement = True
+############################################################
+### Run selection
+###
+### Run ids are not formatted into the SQL text. They are
+### written into a temporary table (in the temp database of
+### the connection, which is writable on read-only
+### connections) and queries select "runid IN" that table,
+### such that SQLite seeks the progress index run by run.
+### All other values are bound as parameters, so the SQL text
+### of each query is constant and sqlite3 reuses its prepared
+### statement from the statement cache.
+############################################################
+
+kSelectedRunsTable = "temp.selected_runs"
+
+def select_runs(cursor, runs):
+  ## Replace the content of the run selection table by the given run ids
+  cursor.execute("CREATE TEMP TABLE IF NOT EXISTS selected_runs (runid INTEGER PRIMARY KEY)")
+  cursor.execute("DELETE FROM {}".format(kSelectedRunsTable))
+  cursor.executemany("INSERT OR IGNORE INTO {} (runid) VALUES (?)".format(kSelectedRunsTable),
+      ((int(run),) for run in runs))
+  ## Do not keep the implicit transaction (and with it a read snapshot of
+  ## the database) open
+  cursor.connection.commit()
+
+def get_experiment_planner_groups(cursor):
+  ## (experimentid, plannerid, number of runs) for each combination with runs
+  if is_columnar_database(cursor):
+    return cursor.get_experiment_planner_groups()
+  return cursor.execute("SELECT experimentid, plannerid, COUNT(*) FROM {} \
+      GROUP BY experimentid, plannerid ORDER BY experimentid, plannerid".format('runs')).fetchall()
+
+def get_experiment_ids_by_name(cursor):
+  ## Map each experiment name to the ids of all experiments with that name,
+  ## in order of the first id
+  experiment_ids = {}
+  for experiment in get_experiments_from_database(cursor):
+    experiment_ids.setdefault(experiment[1], []).append(experiment[0])
+  return experiment_ids
+
+def get_planners_from_database(cursor, experiment_ids=None):
+  ## All planners, or only planners with runs in the given experiments
+  if is_columnar_database(cursor):
+    planners = cursor.get_planners()
+  else:
+    planners = cursor.execute("SELECT id, name FROM {}".format('plannerConfigs')).fetchall()
+  if experiment_ids is None:
+    return planners
+  planner_ids = set(group[1] for group in get_experiment_planner_groups(cursor) if group[0] in experiment_ids)
+  return [planner for planner in planners if planner[0] in planner_ids]
+
+def get_run_ids_from_database(cursor, planner_id, experiment_ids=None):
+  if is_columnar_database(cursor):
+    return cursor.get_run_ids(planner_id, experiment_ids)
+  (experiment_filter, experiment_parameters) = get_experiment_filter(experiment_ids)
+  getids = cursor.execute("SELECT id FROM {} WHERE plannerid=?{} ORDER BY id".format('runs', experiment_filter),
+    (int(planner_id),) + experiment_parameters).fetchall()
+  return np.array(getids, dtype=int).flatten()
+
+def get_solved_runs_from_database(cursor, planner_id, experiment_ids=None):
+  ## (time, solution_length) of all runs which found an exact solution
+  if is_columnar_database(cursor):
+    return cursor.get_solved_runs(planner_id, experiment_ids)
+  (experiment_filter, experiment_parameters) = get_experiment_filter(experiment_ids)
+  return np.array(cursor.execute("SELECT time, solution_length FROM {0} WHERE plannerid=? AND status=6{1}".format('runs',
+    experiment_filter), (int(planner_id),) + experiment_parameters).fetchall())
+
+class PlannerRuns:
+  ## Runs of one planner in the selected experiments, sorted by run id
+  def __init__(self, ids, times, status, solution_lengths):
+    self.ids = ids
+    self.times = times
+    self.status = status
+    self.solution_lengths = solution_lengths
+
+  def __len__(self):
+    return len(self.ids)
+
+  def get_run_times(self):
+    ## Sorted termination times, as get_run_times_from_database
+    return np.sort(self.times)
+
+  def get_solved_runs(self):
+    ## (time, solution_length) of all runs which found an exact solution, as
+    ## get_solved_runs_from_database
+    solved = self.status == kStatusExactSolution
+    return np.stack([self.times[solved], self.solution_lengths[solved]], axis=1)
+
+def get_runs_by_planner_from_database(cursor, experiment_ids=None):
+  ## PlannerRuns of each planner with runs in the given experiments (None:
+  ## all runs), fetched with one query ordered by planner and split in NumPy
+  if is_columnar_database(cursor):
+    rows = cursor.get_runs(experiment_ids)
+  else:
+    (experiment_filter, experiment_parameters) = get_experiment_filter(experiment_ids)
+    solution_length = 'solution_length' if has_solution_length(cursor) else 'NULL'
+    rows = np.array(cursor.execute("SELECT plannerid, id, time, status, {} FROM {} WHERE 1{} \
+        ORDER BY plannerid, id".format(solution_length, 'runs', experiment_filter),
+        experiment_parameters).fetchall(), dtype=float).reshape(-1, 5)
+  planner_ids = rows[:, 0].astype(np.int64)
+  starts = np.flatnonzero(np.diff(planner_ids, prepend=planner_ids[:1] - 1))
+  runs_by_planner = {}
+  for (start, end) in zip(starts, np.append(starts[1:], len(rows))):
+    group = rows[start:end]
+    runs_by_planner[int(planner_ids[start])] = PlannerRuns(group[:, 1].astype(np.int64), group[:, 2],
+        group[:, 3], group[:, 4])
+  return runs_by_planner
+
+def execute_progress_query(cursor, runs):
+  ## Progress entries of the given runs sorted by (runid, time), such that
+  ## each run forms a contiguous block
+  select_runs(cursor, runs)
+  return cursor.execute("SELECT runid, time, best_cost FROM {} WHERE runid IN {} \
+      ORDER BY runid, time".format('progress', kSelectedRunsTable))
+
+def progress_rows_to_array(rows):
+  ## Missing best_cost entries (NULL) are converted to NaN
+  return np.array(rows, dtype=float).reshape(-1, 3)
+
+def get_progress_from_database(cursor, runs):
+  ## Fetch all progress entries of the given runs in a single scan
+  if is_columnar_database(cursor):
+    return cursor.get_progress(runs)
+  return progress_rows_to_array(execute_progress_query(cursor, runs).fetchall())
+
+def get_progress_times_from_database(cursor, runs):
+  ## Sorted distinct times of the progress entries of the given runs, i.e.
+  ## the breakpoints of their best_cost step functions
+  if is_columnar_database(cursor):
+    return cursor.get_progress_times(runs)
+  select_runs(cursor, runs)
+  times = cursor.execute("SELECT DISTINCT time FROM {} WHERE runid IN {}".format('progress', kSelectedRunsTable)).fetchall()
+  return np.sort(np.array(times, dtype=float).flatten())
+
+def get_cost_matrix_from_progress(progress, times, max_cost):
+  ## Evaluate the step function best_cost(t) of each run at all times at once.
+  ## Returns a (runs x times) matrix, where entry (r, i) is the best cost of
+  ## the latest progress entry of run r with time <= times[i]. Entries without
+  ## any progress entry up to times[i] are NaN, entries with best_cost NULL
+  ## (no solution found yet) are max_cost.
+  if len(progress) == 0:
+    return np.empty((0, len(times)))
+
+  runids, run_index = np.unique(progress[:, 0], return_inverse=True)
+  row_times = progress[:, 1]
+  row_costs = np.where(np.isnan(progress[:, 2]), max_cost, progress[:, 2])
+
+  ## Index of the first time sample at which a progress entry is active
+  activation = np.searchsorted(times, row_times, side='left')
+
+  ## Only the last entry of a run activating at a given sample is visible
+  last_entry = np.ones(len(progress), dtype=bool)
+  last_entry[:-1] = (run_index[1:] != run_index[:-1]) | (activation[1:] != activation[:-1])
+  visible = last_entry & (activation < len(times))
+
+  entry_index = np.full((len(runids), len(times)), -1, dtype=np.intp)
+  entry_index[run_index[visible], activation[visible]] = np.flatnonzero(visible)
+  ## Rows are sorted by time within each run, such that a running maximum
+  ## over the entry index yields the latest entry at each time sample.
+  entry_index = np.maximum.accumulate(entry_index, axis=1)
+
+  costs = row_costs[entry_index]
+  costs[entry_index < 0] = np.nan
+  return costs
+
+def get_cost_matrix_from_database(cursor, runs, times, max_cost, chunk_size=None):
+  ## Cost matrix (see get_cost_matrix_from_progress) of the given runs. If
+  ## chunk_size is set, progress entries are streamed with fetchmany and
+  ## folded into the per-run cost vectors chunk by chunk, such that peak
+  ## memory is bounded by the size of the cost matrix plus one chunk.
+  if chunk_size is None or is_columnar_database(cursor):
+    progress = get_progress_from_database(cursor, runs)
+    return get_cost_matrix_from_progress(progress, times, max_cost)
+
+  query = execute_progress_query(cursor, runs)
+  completed_costs = []
+  open_runid = None
+  open_costs = None
+  while True:
+    rows = query.fetchmany(chunk_size)
+    if len(rows) == 0:
+      break
+    progress = progress_rows_to_array(rows)
+    costs = get_cost_matrix_from_progress(progress, times, max_cost)
+
+    ## The first run of this chunk may continue the last run of the previous
+    ## chunk. Its entries are later in time, so they take precedence wherever
+    ## they are active.
+    if open_runid is not None:
+      if progress[0, 0] == open_runid:
+        costs[0] = np.where(np.isnan(costs[0]), open_costs, costs[0])
+      else:
+        completed_costs.append(open_costs[np.newaxis, :])
+
+    ## The last run of this chunk may continue in the next chunk
+    completed_costs.append(costs[:-1])
+    open_runid = progress[-1, 0]
+    open_costs = costs[-1]
+
+  if open_runid is not None:
+    completed_costs.append(open_costs[np.newaxis, :])
+  if len(completed_costs) == 0:
+    return np.empty((0, len(times)))
+  return np.concatenate(completed_costs)
+
+def get_quantiles_from_cost_matrix(costs, quantiles):
+  ## Compute the median and nearest-rank percentiles (np.percentile with
+  ## method 'nearest') over the runs of each column of the cost matrix,
+  ## ignoring NaN entries. Returns the number of valid entries per column,
+  ## the medians and one array for each requested quantile.
+  counts = np.sum(~np.isnan(costs), axis=0)
+  if len(costs) == 0:
+    empty = np.full(costs.shape[1], np.nan)
+    return counts, empty, [empty.copy() for q in quantiles]
+
+  ## NaN entries are sorted to the end of each column
+  sorted_costs = np.sort(costs, axis=0)
+  columns = np.arange(costs.shape[1])
+  valid = counts > 0
+  n = np.maximum(counts, 1)
+
+  lower = sorted_costs[(n - 1) // 2, columns]
+  upper = sorted_costs[n // 2, columns]
+  medians = np.where(valid, (lower + upper) / 2, np.nan)
+
+  percentiles = []
+  for q in quantiles:
+    index = np.around((n - 1) * (q / 100)).astype(np.intp)
+    percentiles.append(np.where(valid, sorted_costs[index, columns], np.nan))
+  return counts, medians, percentiles
+
+def get_cost_results(cursor, runs, times, max_cost, ci_left, ci_right, chunk_size=None, planner_name=None, bootstrap=None,
+    column_chunk_size=None):
+    ## If column_chunk_size is set, the cost matrix is built for at most this
+    ## many time samples at once (reading the progress entries once per
+    ## chunk), as all statistics are computed per time sample
+    if column_chunk_size is not None and column_chunk_size < len(times):
+      chunk_results = [get_cost_results(cursor, runs, times[start:start + column_chunk_size], max_cost, ci_left,
+          ci_right, chunk_size, planner_name, bootstrap) for start in range(0, len(times), column_chunk_size)]
+      return [any(results[0] for results in chunk_results)] + [np.concatenate([results[i] for results in chunk_results])
+          for i in range(1, 4)]
+    with profile_stage("cost_matrix", planner_name):
+      costs = get_cost_matrix_from_database(cursor, runs, times, max_cost, chunk_size)
+    with profile_stage("quantiles", planner_name):
+      return get_cost_results_from_cost_matrix(costs, max_cost, ci_left, ci_right, bootstrap)
+
+def get_cost_results_from_cost_matrix(costs, max_cost, ci_left, ci_right, bootstrap=None):
+    ## The band around the median holds the ci_left and ci_right percentiles
+    ## of the costs, or the bootstrap confidence interval of the median
+    counts, medians, (quantile5, quantile95) = get_quantiles_from_cost_matrix(costs, [ci_left, ci_right])
+    if bootstrap is not None:
+      with profile_stage("bootstrap"):
+        (quantile5, quantile95) = get_bootstrap_interval("median", costs, bootstrap)
+
+    ## Time samples before the first progress entry of any run are set to max_cost
+    no_data = counts == 0
+    medians[no_data] = max_cost
+    quantile5[no_data] = max_cost
+    quantile95[no_data] = max_cost
+    improvement = bool(np.any(~no_data))
 
     return [improvement, medians, quantile5, quantile95]
 
+############################################################
+### Planner summaries
+###
+### One aggregate pass over the runs (and, only if non-optimal
+### planners are removed, over the progress entries) yields a
+### PlannerSummary of each planner. Planner selection filters
+### these summaries, such that all later queries only touch
+### the runs of the selected planner ids.
+############################################################
+
+## A planner is optimizing if its runs have more than this many progress
+## entries on average and any of them reports a best_cost
+kOptimalPlannerProgressRows = 10
+
+class PlannerSummary:
+  def __init__(self, planner_id, name, run_count, solved_count, progress_rows, cost_rows, time_limit):
+    self.planner_id = int(planner_id)
+    self.name = name
+    self.run_count = int(run_count)
+    self.solved_count = int(solved_count)
+    ## None if progress entries were not counted
+    self.progress_rows = None if progress_rows is None else int(progress_rows)
+    self.cost_rows = None if cost_rows is None else int(cost_rows)
+    self.time_limit = time_limit
+
+  def has_best_cost(self):
+    return self.cost_rows is not None and self.cost_rows > 0
+
+  def is_optimal(self):
+    return self.has_best_cost() and self.progress_rows > kOptimalPlannerProgressRows * self.run_count
+
+  def get_planner(self):
+    ## (id, name) as returned by get_planners_from_database
+    return (self.planner_id, self.name)
+
+def get_planner_summaries(cursor, experiment_ids=None, with_progress=True):
+  ## PlannerSummary of each planner with runs in the given experiments (None:
+  ## all runs), ordered by planner id. Progress entries are only counted
+  ## with_progress and if the database has a best_cost column.
+  with_progress = with_progress and has_best_cost(cursor)
+  if is_columnar_database(cursor):
+    rows = cursor.get_planner_summaries(experiment_ids, with_progress)
+  else:
+    (experiment_filter, experiment_parameters) = get_experiment_filter(experiment_ids)
+    progress_columns = "NULL, NULL"
+    progress_join = ""
+    parameters = experiment_parameters
+    if with_progress:
+      ## Only the progress entries of the runs of the experiments are
+      ## grouped, instead of the whole progress table per experiment
+      progress_filter = ""
+      if experiment_ids is not None:
+        progress_filter = " WHERE runid IN (SELECT id FROM {} WHERE 1{})".format('runs', experiment_filter)
+        parameters = experiment_parameters + experiment_parameters
+      progress_columns = "SUM(COALESCE(progress_counts.progress_rows, 0)), SUM(COALESCE(progress_counts.cost_rows, 0))"
+      progress_join = " LEFT JOIN (SELECT runid, COUNT(*) AS progress_rows, COUNT(best_cost) AS cost_rows \
+          FROM {}{} GROUP BY runid) AS progress_counts ON progress_counts.runid = runs.id".format('progress',
+            progress_filter)
+    rows = cursor.execute("SELECT runs.plannerid, plannerConfigs.name, COUNT(*), \
+        SUM(runs.status = {}), {}, MAX(experiments.timelimit) FROM {} \
+        JOIN plannerConfigs ON plannerConfigs.id = runs.plannerid \
+        LEFT JOIN experiments ON experiments.id = runs.experimentid{} \
+        WHERE 1{} GROUP BY runs.plannerid ORDER BY runs.plannerid".format(kStatusExactSolution, progress_columns,
+          'runs', progress_join, experiment_filter),
+        parameters).fetchall()
+  return [PlannerSummary(*row) for row in rows]
+
 def is_planner_optimal(cursor, planner_id):
-  getids = cursor.execute("SELECT id FROM {} WHERE plannerid={}".format('runs', planner_id)).fetchone()
-  runid = getids[0]
-  data = cursor.execute("SELECT time, best_cost FROM {} WHERE runid in ({})".format('progress', runid)).fetchall()
-  if data is None:
-    return False
-  return len(data) > 10
+  return any(summary.planner_id == planner_id and summary.is_optimal() for summary in get_planner_summaries(cursor))
 
 def remove_non_optimal_planner(cursor, planners):
   if not has_best_cost(cursor):
     return []
-  return [x for x in planners if is_planner_optimal(cursor, x[0])]
+  optimal_ids = set(summary.planner_id for summary in get_planner_summaries(cursor) if summary.is_optimal())
+  return [x for x in planners if x[0] in optimal_ids]
+
+def filter_planner_summaries(summaries, config):
+  ## Summaries of the planners which are plotted: without ignored and
+  ## (optionally) non-optimal planners, and only planners whose name
+  ## matches the include pattern
+  if config["ignore_non_optimal_planner"]:
+    summaries = [summary for summary in summaries if summary.is_optimal()]
+  include_planner = config.get("include_planner")
+  if include_planner is not None:
+    summaries = [summary for summary in summaries if re.search(include_planner, summary.name)]
+  ignore_planner = config["ignore_planner"]
+  if ignore_planner is not None:
+    summaries = [summary for summary in summaries if summary.name not in ignore_planner]
+    print("New planner set: {}".format([summary.get_planner() for summary in summaries]))
+  return summaries
+
+def get_selected_planners_from_database(cursor, config, experiment_ids=None):
+  ## (id, name) of the planners of the given experiments which are plotted
+  summaries = get_planner_summaries(cursor, experiment_ids, config["ignore_non_optimal_planner"])
+  return [summary.get_planner() for summary in filter_planner_summaries(summaries, config)]
+
+def get_schema_from_database(cursor):
+  if is_columnar_database(cursor):
+    return cursor.schema
+  return get_database_schema(cursor)
 
 def get_tables_from_database(cursor):
-  tables = cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name").fetchall()
-  for table in tables:
-      cursor.execute("SELECT * FROM {}".format(table[0])).fetchall()
-      names = list(map(lambda x: x[0], cursor.description))
-      print("\nTable \'{}\': {}".format(table[0], names))
+  schema = get_schema_from_database(cursor)
+  for table in schema.get_tables():
+      names = schema.get_columns(table)
+      print("\nTable \'{}\': {}".format(table, names))
 
 def combine_planner_data(planner_data1, planner_data2):
+  ## Pool the run time statistics of two sets of runs per planner. Means and
+  ## success rates are weighted by the number of runs, and the (population)
+  ## standard deviations 'time_std' are pooled exactly from the sums of
+  ## squared deviations of both sets and the difference of their means.
   if planner_data1 is None:
     return planner_data2
   if planner_data2 is None:
     return planner_data1
 
   planner_data = {}
+  for name in list(planner_data1) + [name for name in planner_data2 if name not in planner_data1]:
+    if name not in planner_data2:
+      planner_data[name] = dict(planner_data1[name])
+      continue
+    if name not in planner_data1:
+      planner_data[name] = dict(planner_data2[name])
+      continue
+
+    p1 = planner_data1[name]
+    p2 = planner_data2[name]
+    n1 = p1['number_runs']
+    n2 = p2['number_runs']
+    number_runs = n1 + n2
+    if number_runs > 0:
+      time_mean = (n1*p1['time_mean'] + n2*p2['time_mean']) / number_runs
+      mean_difference = p2['time_mean'] - p1['time_mean']
+      square_deviations = (n1*p1['time_std']**2 + n2*p2['time_std']**2
+          + mean_difference**2 * n1 * n2 / number_runs)
+      time_std = np.sqrt(square_deviations / number_runs)
+      success = (n1*p1['success'] + n2*p2['success']) / number_runs
+    else:
+      time_mean = 0.5*(p1['time_mean'] + p2['time_mean'])
+      time_std = 0.0
+      success = 0.0
+    planner_data[name] = { 'time_mean' : time_mean, 'time_limit':
+        max(p1['time_limit'], p2['time_limit']), 'time_std' : time_std,
+        'success' : success, 'best_planner' : False,
+        'number_runs' : number_runs }
+
+  set_best_planner(planner_data)
+  return planner_data
+
+def set_best_planner(planner_data):
+  ## Mark the planner with the lowest mean run time
   best_time = float("inf")
   best_planner = ""
-  for name1 in planner_data1: 
-    found = False
-    for name2 in planner_data2: 
-      if name1 == name2:
-        t1 = planner_data1[name1]['time_mean']
-        t2 = planner_data2[name2]['time_mean']
-        time_limit = planner_data1[name1]['time_limit']
-        s1 = planner_data1[name1]['time_variance']
-        s2 = planner_data2[name2]['time_variance']
-        time_variance = np.std([s1, s2])
-        time_mean = np.mean([t1, t2])
-        n1 = planner_data1[name1]['number_runs']
-        n2 = planner_data2[name2]['number_runs']
-        number_runs = n1 + n2
-        su1 = planner_data1[name1]['success']
-        su2 = planner_data2[name2]['success']
-        success = 0.5*(su1 + su2)
-        planner_data[name1] = { 'time_mean' : time_mean, 'time_limit':
-            time_limit, 'time_variance' : time_variance, 'success' : success,
-            'best_planner' : False,
-            'number_runs' : number_runs }
-        found = True
-        if time_mean < best_time:
-          best_time = time_mean
-          best_planner = name1
-        break
-    if not found:
-      planner_data[name1] = planner_data1[name1]
+  for name in planner_data:
+    planner_data[name]['best_planner'] = False
+    if planner_data[name]['time_mean'] < best_time:
+      best_time = planner_data[name]['time_mean']
+      best_planner = name
   if best_time < float("inf"):
     planner_data[best_planner]['best_planner'] = True
-  return planner_data
 
 def get_experiment_names_from_database(cursor):
   experiments = cursor.execute("SELECT id, name FROM {}".format('experiments')).fetchall()
@@ -98,27 +480,33 @@ def get_experiment_names_from_database(cursor):
       experiment_names.append("Experiment {} [ID {}]".format(experiment[1], experiment[0]))
   return experiment_names
 
-def get_maxtime_from_database(cursor):
-  times = cursor.execute("SELECT timelimit FROM {}".format('experiments')).fetchall()
+def get_experiments_from_database(cursor):
+  if is_columnar_database(cursor):
+    return cursor.get_experiments()
+  return cursor.execute("SELECT id, name, timelimit FROM {}".format('experiments')).fetchall()
+
+def get_maxtime_from_database(cursor, experiment_ids=None):
+  times = [experiment[2] for experiment in get_experiments_from_database(cursor)
+      if experiment_ids is None or experiment[0] in experiment_ids]
   times = np.array(times).flatten()
   return times.max()
 
-def get_maxtime_from_database_or_config(cursor, config, data):
+def get_maxtime_from_database_or_config(cursor, config, data, experiment_ids=None):
   if config['max_time'] > 0:
     time = config['max_time']
   else:
-    time = get_maxtime_from_database(cursor)
+    time = get_maxtime_from_database(cursor, experiment_ids)
 
   data["info"]['max_time']['success'] = time
   data["info"]['max_time']['optimization'] = time
   return time
 
-def get_mintime_from_database_or_config(cursor, config, data):
+def get_mintime_from_database_or_config(cursor, config, data, experiment_ids=None):
   kDefaultTimeDifferenceOrderOfMagnitude = 3
   if config['min_time'] > 0:
     time = config['min_time']
   else:
-    maxtime = float(get_maxtime_from_database_or_config(cursor, config, data))
+    maxtime = float(get_maxtime_from_database_or_config(cursor, config, data, experiment_ids))
     oom = int(np.floor(np.log10(maxtime)))
     time = 10**(oom-kDefaultTimeDifferenceOrderOfMagnitude)
 
@@ -126,61 +514,40 @@ def get_mintime_from_database_or_config(cursor, config, data):
   data["info"]['min_time']['optimization'] = time
   return time
 
-def get_start_index(medians, times, max_cost):
-    for i in range(len(times)):
-        if medians[i] < max_cost:
-            return i
-    return len(times)
-
-def get_maxcost_from_json_or_config(data, config, times):
+def get_maxcost_from_curves_or_config(curves, config):
   kPercentagePaddingAboveMax = 0.1
-  max_cost_in_data_acquisition = data["info"]["max_cost"]
+  max_cost_in_data_acquisition = curves.info["max_cost"]
   max_cost = 0
   if config['max_cost'] > 0:
     max_cost = config['max_cost']
   else:
-    planner_data = data["planners"]
-    for planner in planner_data:
-      ycost = max_cost_in_data_acquisition
-      planner_optimization_success = planner_data[planner]["optimization_success"]
-      if planner_optimization_success:
-        planner_median = planner_data[planner]["median"]
-        start = get_start_index(planner_median, times, max_cost_in_data_acquisition)
-        cost_below_max = planner_median[start:]
-        if len(cost_below_max) > 0:
-          ycost = np.array(cost_below_max).max()
-      else:
-        planner_point = planner_data[planner]["point"]
-        ycost = planner_point["cost"][0]
-      if ycost > max_cost:
-        if ycost < max_cost_in_data_acquisition:
-          max_cost = ycost
+    ## Largest cost of each planner: of its median from the first sample
+    ## below the maximum cost of the data acquisition on, or of its point
+    started = curves.get_started_mask(max_cost_in_data_acquisition)
+    ycost = np.where(started, curves.median, -np.inf).max(axis=1, initial=-np.inf)
+    ycost = np.where(started.any(axis=1), ycost, max_cost_in_data_acquisition)
+    ycost = np.where(curves.optimization_success, ycost, curves.points[:, 1, 0])
+    max_cost = float(np.max(ycost[ycost < max_cost_in_data_acquisition], initial=0))
     max_cost = max_cost + kPercentagePaddingAboveMax*max_cost
 
-  data["info"]["max_cost"] = max_cost
+  curves.info["max_cost"] = max_cost
   return max_cost
 
-def get_mincost_from_json_or_config(data, config, times, max_cost):
+def get_mincost_from_curves_or_config(curves, config, max_cost):
   kPercentagePaddingBelowMin = 0.1
   min_cost = max_cost
   if config['min_cost'] > 0:
     min_cost = config['min_cost']
   else:
-    planner_data = data["planners"]
-    for planner in planner_data:
-      planner_optimization_success = planner_data[planner]["optimization_success"]
-      if planner_optimization_success:
-        planner_median = planner_data[planner]["median"]
-        ycost = np.array(planner_median).min()
-      else:
-        planner_point = planner_data[planner]["point"]
-        ycost = planner_point["cost"][0]
-      if ycost < min_cost:
-        min_cost = ycost
+    ## Smallest median of each planner, or the cost of its point
+    valid = np.arange(curves.median.shape[1]) < curves.lengths[:, np.newaxis]
+    ycost = np.where(valid, curves.median, np.inf).min(axis=1, initial=np.inf)
+    ycost = np.where(curves.optimization_success, ycost, curves.points[:, 1, 0])
+    min_cost = min(min_cost, float(np.min(ycost, initial=min_cost)))
 
   dc = max_cost - min_cost
   min_cost = np.maximum(0.0, min_cost - kPercentagePaddingBelowMin*dc)
-  data["info"]["min_cost"] = min_cost
+  curves.info["min_cost"] = min_cost
   return min_cost
 
 def get_experiment_name_from_array(experiment_names):
@@ -201,7 +568,7 @@ def assert_equivalent_experiment_names(cursor):
   return True
 
 def get_experiment_names_from_database(cursor):
-  experiments = cursor.execute("SELECT id, name FROM {}".format('experiments')).fetchall()
+  experiments = get_experiments_from_database(cursor)
   experiment_names = []
   for experiment in experiments:
       experiment_name = experiment[1]
@@ -226,19 +593,17 @@ def get_longest_name_from_planners(names):
   return longest_name
 
 def get_time_limit_for_experiment(cursor, experiment_id):
-  return cursor.execute("SELECT timelimit FROM {} WHERE id={}".format('experiments',experiment_id)).fetchall()[0][0]
+  return cursor.execute("SELECT timelimit FROM {} WHERE id=?".format('experiments'), (int(experiment_id),)).fetchall()[0][0]
 
 def get_planner_names_from_database(cursor):
-  planners = cursor.execute("SELECT id, name FROM {}".format('plannerConfigs')).fetchall()
+  planners = get_planners_from_database(cursor)
   planner_names = []
   for planner in planners:
       planner_names.append(planner[1])
   return planner_names
 
 def has_table_column(cursor, table_name, column_name):
-  cursor.execute("SELECT * FROM {}".format(table_name)).fetchall()
-  names = list(map(lambda x: x[0], cursor.description))
-  return True if column_name in names else False
+  return get_schema_from_database(cursor).has_column(table_name, column_name)
 
 def has_solution_length(cursor):
   return has_table_column(cursor, 'runs', 'solution_length')
@@ -249,6 +614,8 @@ def has_best_cost(cursor):
 def get_filename_from_database_filepaths_and_name(filepaths, name):
   if len(filepaths) <= 0:
     return "unknown"
+  if os.path.isabs(name):
+    return name
   filepath = filepaths[0]
   directory = os.path.dirname(filepath)
   if len(directory) > 0:
@@ -256,6 +623,11 @@ def get_filename_from_database_filepaths_and_name(filepaths, name):
   filename = directory + name
   return filename
 
+def get_filename_with_suffix(filepath, suffix):
+  ## Insert a (sanitized) suffix before the file extension
+  (filepath_without_extension, extension) = os.path.splitext(filepath)
+  return filepath_without_extension + "_" + re.sub(r'[^\w.-]+', '_', suffix) + extension
+
 def get_filename_from_database_filepaths(filepaths):
   if len(filepaths) <= 0:
     return "unknown"
@@ -284,6 +656,20 @@ def get_json_filepath_from_databases(filepaths):
   filename_without_extension = get_filename_from_database_filepaths(filepaths)
   return create_filename_with_extension(filename_without_extension, ".json")
 
+def to_json_serializable(value):
+  ## json.dump fallback for the NumPy curves of extracted planner data
+  if isinstance(value, np.ndarray):
+    return value.tolist()
+  if isinstance(value, np.generic):
+    return value.item()
+  raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
+
+def write_json_atomic(filepath, data, indent=None):
+  tmp_filepath = "{}.{}.tmp".format(filepath, os.getpid())
+  with open(tmp_filepath, 'w') as jsonfile:
+    json.dump(data, jsonfile, indent=indent, default=to_json_serializable)
+  os.replace(tmp_filepath, filepath)
+
 def change_filename_extension(filepath, extension):
   filepath_without_extension = os.path.splitext(filepath)[0]
   return filepath_without_extension + extension
@@ -293,6 +679,64 @@ def create_time_space(data):
       np.log10(data["info"]["max_time"]["success"]), \
                       data["info"]["resolution"])
 
+## Maximal number of event times at which the curves of a planner are
+## evaluated, per point of --max-points
+kEventTimesPerPoint = 4
+
+def get_event_times(times, min_time, max_time, max_count=None):
+  ## Sorted distinct event times within the plotted range, including its
+  ## bounds. Of more than max_count event times, max_count of them at evenly
+  ## spaced ranks (i.e. quantiles of the event times) are returned, which
+  ## bounds the size of the cost matrix independent of the number of
+  ## progress entries.
+  times = np.asarray(times, dtype=float)
+  times = times[(times > min_time) & (times < max_time)]
+  times = np.unique(np.concatenate([[min_time], times, [max_time]]))
+  if max_count is not None and len(times) > max_count:
+    times = times[np.unique(np.rint(np.linspace(0, len(times) - 1, max_count)).astype(np.intp))]
+  return times
+
+def get_lttb_indices(x, y, point_count):
+  ## Largest-Triangle-Three-Buckets decimation: indices of point_count points
+  ## (including the first and the last one) which preserve the visual shape
+  ## of the curve y(x). Each interior bucket contributes the point spanning
+  ## the largest triangle with the previously selected point and the
+  ## average of the next bucket.
+  n = len(x)
+  if point_count >= n or point_count < 3:
+    return np.arange(n)
+  x = np.asarray(x, dtype=float)
+  y = np.asarray(y, dtype=float)
+  edges = np.floor(np.linspace(1, n - 1, point_count - 1)).astype(np.intp)
+  indices = np.empty(point_count, dtype=np.intp)
+  indices[0] = 0
+  indices[-1] = n - 1
+  for bucket in range(point_count - 2):
+    start = edges[bucket]
+    end = edges[bucket + 1]
+    if bucket + 2 < len(edges):
+      next_x = np.mean(x[end:edges[bucket + 2]])
+      next_y = np.mean(y[end:edges[bucket + 2]])
+    else:
+      next_x = x[-1]
+      next_y = y[-1]
+    a = indices[bucket]
+    areas = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+    indices[bucket + 1] = start + np.argmax(areas)
+  return indices
+
+def get_decimated_indices(times, curves, max_points):
+  ## Shared LTTB indices of several step functions (drawn as steps-post)
+  ## over the same times, selected in log time as the time axis of the
+  ## graphs is logarithmic. The index before each selected index is kept as
+  ## well, such that each kept step is drawn from its exact level before to
+  ## its exact level after it, while the steps in between are merged into
+  ## it. At most max_points indices are returned.
+  point_count = max(3, max_points // (2 * len(curves)))
+  log_times = np.log10(times)
+  indices = np.unique(np.concatenate([get_lttb_indices(log_times, curve, point_count) for curve in curves]))
+  return np.unique(np.concatenate([np.maximum(indices - 1, 0), indices]))
+
 def create_time_space_linear(data):
   return np.linspace(0, data["info"]["timelimit"], \
                       data["info"]["resolution_linear"])
@@ -312,19 +756,34 @@ def get_times_from_success_over_time(success, timespace):
   times = np.array(times)
   return times
 
-def get_count_success(cursor, run_count, runids, times):
-    success = np.zeros(len(times))
-    for i in range(len(times)):
-        ### Select from one time slice all best costs
-        data = np.array(cursor.execute("SELECT a.best_cost FROM (SELECT MAX(time), \
-              best_cost FROM {0} WHERE time<={1} AND runid in ({2}) GROUP BY runid) a".format('progress', times[i], runids)).fetchall()).flatten()
-        if data.size == 0:
-            success[i] = 0
-        else:
-            sum_not_none = sum(x is not None for x in data)
-            success[i] = (sum_not_none / run_count ) * 100.0
-
-    return success
+def get_run_times_from_database(cursor, planner_id, experiment_ids=None):
+  ## Sorted termination times of all runs of a planner
+  if is_columnar_database(cursor):
+    return cursor.get_run_times(planner_id, experiment_ids)
+  (experiment_filter, experiment_parameters) = get_experiment_filter(experiment_ids)
+  times = cursor.execute("SELECT time FROM {} WHERE plannerid=?{}".format('runs', experiment_filter),
+    (int(planner_id),) + experiment_parameters).fetchall()
+  return np.sort(np.array(times, dtype=float).flatten())
+
+def get_first_solution_times_from_database(cursor, runs):
+  ## Sorted times of the first progress entry with a solution for each run.
+  ## Runs which never found a solution are not contained.
+  if is_columnar_database(cursor):
+    return cursor.get_first_solution_times(runs)
+  select_runs(cursor, runs)
+  times = cursor.execute("SELECT MIN(time) FROM {} WHERE best_cost IS NOT NULL \
+      AND runid IN {} GROUP BY runid".format('progress', kSelectedRunsTable)).fetchall()
+  return np.sort(np.array(times, dtype=float).flatten())
+
+def get_success_from_sorted_times(sorted_times, run_count, times, inclusive=True):
+  ## Percentage of runs with a time below (or equal to, if inclusive) each time sample
+  side = 'right' if inclusive else 'left'
+  counts = np.searchsorted(sorted_times, times, side=side)
+  return (counts / run_count) * 100.0
+
+def get_count_success(cursor, run_count, runs, times):
+    solution_times = get_first_solution_times_from_database(cursor, runs)
+    return get_success_from_sorted_times(solution_times, run_count, times)
 
 def load_config():
     cwd = Path(__file__).parent.absolute()
@@ -348,10 +807,13 @@ def get_average_runtime_from_database(cursor, data):
 #   print("Run {} on environment {} with planner {}. Correct solution:{}. Time {}".format(run[0], run[1], run[2], run[3], run[4]))
 
 def print_run_results_from_database(cursor):
+  if is_columnar_database(cursor):
+    print("Run results are not available for columnar database {}.".format(cursor.directory))
+    return
   planners = cursor.execute("SELECT id, name FROM {}".format('plannerConfigs')).fetchall()
   for planner in planners:
     planner_id = planner[0]
-    getids = cursor.execute("SELECT id FROM {} WHERE plannerid={}".format('runs',planner_id)).fetchall()
+    getids = cursor.execute("SELECT id FROM {} WHERE plannerid=?".format('runs'), (int(planner_id),)).fetchall()
     runs = np.array(getids).flatten()
     runids = ','.join(str(run) for run in runs)
 
@@ -363,21 +825,24 @@ def print_run_results_from_database(cursor):
     print("Exp ids {}".format(expids))
 
     if has_best_cost(cursor):
-      data = np.array(cursor.execute("SELECT time, best_cost FROM {} WHERE runid in ({})".format('progress', runids)).fetchall()).flatten()
+      select_runs(cursor, runs)
+      data = np.array(cursor.execute("SELECT time, best_cost FROM {} WHERE runid IN {}".format('progress',
+        kSelectedRunsTable)).fetchall()).flatten()
       if len(data) > 0:
         print("Planner {} with time {} and cost {}".format(planner[1], data[0], data[1]))
     else:
-      data = np.array(cursor.execute("SELECT time FROM {} WHERE id in ({}) and \
-        experimentid in ({})".format('runs', runids, expids)).fetchall()).flatten()
+      data = np.array(cursor.execute("SELECT time FROM {} WHERE plannerid=?".format('runs'),
+        (int(planner_id),)).fetchall()).flatten()
       print("Planner {} with time {}".format(planner[1], np.around(data)))
 
   for planner in planners:
     planner_id = planner[0]
-    getids = cursor.execute("SELECT id FROM {} WHERE plannerid={}".format('runs',planner_id)).fetchall()
+    getids = cursor.execute("SELECT id FROM {} WHERE plannerid=?".format('runs'), (int(planner_id),)).fetchall()
     runs = np.array(getids).flatten()
-    runids = ','.join(str(run) for run in runs)
     if has_best_cost(cursor):
-      data = np.array(cursor.execute("SELECT time, best_cost FROM {} WHERE runid in ({})".format('progress', runids)).fetchall()).flatten()
+      select_runs(cursor, runs)
+      data = np.array(cursor.execute("SELECT time, best_cost FROM {} WHERE runid IN {}".format('progress',
+        kSelectedRunsTable)).fetchall()).flatten()
       if len(data) > 0:
         print("Planner {} with time {} and cost {}".format(planner[1], data[0], data[1]))
 
@@ -395,6 +860,14 @@ def print_metadata_from_database(cursor):
   print(80*"-")
   print(get_experiment_names_from_database(cursor))
 
+def get_fast_render_option(fast_render):
+  ## True (on), False (off) or None (automatic) of the --fast-render value
+  if fast_render in ['on', True]:
+    return True
+  if fast_render in ['off', False]:
+    return False
+  return None
+
 def make_config(args):
   max_cost = args.max_cost if args.max_cost else -1
   min_cost = args.min_cost if args.min_cost else -1
@@ -422,9 +895,26 @@ def make_config(args):
       'label_fontsize': label_fontsize,
       'ignore_non_optimal_planner': args.ignore_non_optimal_planner,
       'ignore_planner': args.ignore_planner,
+      'include_planner': args.include_planner,
       'legend_below_figure': args.legend_below_figure,
       'legend_separate_file': args.legend_separate_file,
-      'legend_none': args.legend_none
+      'legend_none': args.legend_none,
+      'data_only': args.data_only if args.data_only else False,
+      'intermediate': args.intermediate if args.intermediate else 'json',
+      'fast_render': get_fast_render_option(args.fast_render),
+      'formats': args.formats if args.formats else ['pdf'],
+      'raster_dpi': args.raster_dpi if args.raster_dpi else 100,
+      'time_grid': args.time_grid if args.time_grid else 'logspace',
+      'max_points': args.max_points if args.max_points else 200,
+      'ci_method': args.ci_method,
+      'bootstrap_samples': args.bootstrap_samples,
+      'bootstrap_confidence': args.bootstrap_confidence,
+      'bootstrap_workers': args.bootstrap_workers if args.bootstrap_workers else 1,
+      'in_memory_size': int(args.in_memory * 1024 * 1024) if args.in_memory else 0,
+      'jobs': args.jobs,
+      'memory_budget': args.memory_budget * 1024 * 1024 if args.memory_budget else None,
+      'cache_dir': args.cache_dir,
+      'cache_size': int(args.cache_size * 1024 * 1024)
   }
   if args.title_name:
     plot_config['title_name'] = args.title_name
@@ -0,0 +1,60 @@
+import sqlite3
+import weakref
+
+class DatabaseSchema:
+  ## Tables and columns of a database, read once from the SQLite catalog
+  ## (PRAGMA table_info) without touching any table data.
+
+  def __init__(self, cursor):
+    self.columns = {}
+    tables = cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name").fetchall()
+    for table in tables:
+      table_name = table[0]
+      info = cursor.execute("PRAGMA table_info(\"{}\")".format(table_name)).fetchall()
+      self.columns[table_name] = [column[1] for column in info]
+
+  @classmethod
+  def from_columns(cls, columns):
+    schema = cls.__new__(cls)
+    schema.columns = dict(columns)
+    return schema
+
+  def get_tables(self):
+    return list(self.columns.keys())
+
+  def get_columns(self, table_name):
+    return self.columns.get(table_name, [])
+
+  def has_table(self, table_name):
+    return table_name in self.columns
+
+  def has_column(self, table_name, column_name):
+    return column_name in self.get_columns(table_name)
+
+class DatabaseConnection(sqlite3.Connection):
+  ## Connection of connect_database. Unlike plain sqlite3 connections, it can
+  ## be weakly referenced and thus holds the cached schema of its database.
+  pass
+
+## Schemas are cached per connection of connect_database, and per cursor for
+## other connections (which cannot be weakly referenced)
+schema_cache = weakref.WeakKeyDictionary()
+
+def get_schema_cache_key(cursor):
+  connection = getattr(cursor, 'connection', None)
+  if isinstance(connection, DatabaseConnection):
+    return connection
+  return cursor
+
+def get_database_schema(cursor):
+  key = get_schema_cache_key(cursor)
+  schema = schema_cache.get(key)
+  if schema is None:
+    schema = DatabaseSchema(cursor)
+    schema_cache[key] = schema
+  return schema
+
+def invalidate_database_schema(cursor):
+  ## Read the schema again on the next access, e.g. after a writer has
+  ## created tables
+  schema_cache.pop(get_schema_cache_key(cursor), None)
@@ -1,131 +1,208 @@
 import sys
+import copy
 import json
 import os
 import sqlite3
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib import font_manager, rcParams
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
 
 from src.database_info import *
 from src.get_diverse_color import *
 from src.get_plot_style import *
-
-font_path = "config/cmr10.ttf"
-
-fe = font_manager.FontEntry(
-    fname=font_path,
-    name='cmr10')
-font_manager.fontManager.ttflist.insert(0, fe)
-plt.rcParams['font.family'] = fe.name
-plt.rcParams['axes.formatter.use_mathtext'] = True
-plt.rcParams['mathtext.fontset']='cm'
-matplotlib.rcParams['pdf.fonttype'] = 42
-matplotlib.rcParams['ps.fonttype'] = 42
-
-def get_json_from_database(cursor, data, config):
+from src.result_cache import *
+from src.profiler import *
+
+## matplotlib is imported and configured on the first render, such that
+## extracting statistics (and --help) does not pay for it
+plt = None
+
+def get_pyplot():
+  global plt
+  if plt is None:
+    import matplotlib
+    import matplotlib.pyplot as pyplot
+    from matplotlib import font_manager
+
+    font_path = str(Path(__file__).parent.parent / "config" / "cmr10.ttf")
+    fe = font_manager.FontEntry(
+        fname=font_path,
+        name='cmr10')
+    font_manager.fontManager.ttflist.insert(0, fe)
+    pyplot.rcParams['font.family'] = fe.name
+    pyplot.rcParams['axes.formatter.use_mathtext'] = True
+    pyplot.rcParams['mathtext.fontset']='cm'
+    matplotlib.rcParams['pdf.fonttype'] = 42
+    matplotlib.rcParams['ps.fonttype'] = 42
+    plt = pyplot
+  return plt
+
+def get_json_from_database(cursor, data, config, experiment_ids=None):
+  ## Planner curves of all runs in the given experiments (None: all runs)
+  for planner_name in iter_json_from_database(cursor, data, config, experiment_ids):
+    pass
+
+def iter_json_from_database(cursor, data, config, experiment_ids=None):
+  ## Generator variant of get_json_from_database, which yields the name of
+  ## each planner as soon as its curves in data["planners"] are complete
   verbosity = config["verbosity"]
-  ignore_non_optimal_planner = config["ignore_non_optimal_planner"]
 
-  if verbosity > 1:
-    print_metadata_from_database(cursor)
+  ## With the event time grid, curves are evaluated at the breakpoints of
+  ## their step functions (at most kEventTimesPerPoint * max_points of them
+  ## for costs) and decimated to max_points
+  event_grid = config['time_grid'] == 'events'
+  max_points = config['max_points']
+  ## Confidence intervals of medians and success curves (None: percentiles)
+  bootstrap = get_bootstrap_config(data["info"], config)
+  with_best_cost = has_best_cost(cursor)
+  if not with_best_cost and verbosity > 0:
+    print("WARNING: No best_cost entry in database file. Using solution_length instead.")
+
+  with profile_stage("planners"):
+    planners = get_selected_planners_from_database(cursor, config, experiment_ids)
+  ## Runs of all planners of the experiments in one scan
+  with profile_stage("runs"):
+    runs_by_planner = get_runs_by_planner_from_database(cursor, experiment_ids)
 
-  if verbosity > 2:
-    print_run_results_from_database(cursor)
+  for planner in planners:
+    planner_runs = runs_by_planner[planner[0]]
+    add_success_from_database(data, config, planner, planner_runs, event_grid, max_points, bootstrap)
+    add_cost_from_database(cursor, data, config, planner, planner_runs, event_grid, max_points, bootstrap,
+        with_best_cost)
+    yield planner[1]
 
+def add_success_from_database(data, config, planner, planner_runs, event_grid, max_points, bootstrap):
   ############################################################
-  ### Print Average Success per Planner over Time
+  ### Average Success of a Planner over Time
   ############################################################
+  planner_id = planner[0]
+  planner_name = planner[1]
   times = create_time_space(data)
-
-  planners = cursor.execute("SELECT id, name FROM {}".format('plannerConfigs')).fetchall()
-  if ignore_non_optimal_planner:
-    planners = remove_non_optimal_planner(planners)
-
-  ignore_planner = config["ignore_planner"]
-  if ignore_planner is not None:
-    planners = [planner for planner in planners if planner[1] not in ignore_planner]
-    print("New planner set: {}".format(planners))
-
-  for planner in planners:
-    planner_id = planner[0]
-    planner_name = planner[1]
-    number_runs = cursor.execute("SELECT COUNT(*) FROM {} WHERE plannerid={}".format('runs', planner_id)).fetchall()[0][0]
-
-    percentages = np.empty(len(times))
-    for i in range(len(times)):
-        percentage = cursor.execute(
-            "SELECT COUNT(*) FROM {0} WHERE plannerid={2} AND time < {1}".format('runs', times[i], planner_id)).fetchall()
-        percentages[i] = (percentage[0][0] / number_runs) * 100
+  min_time = data["info"]["min_time"]["success"]
+  max_time = data["info"]["max_time"]["success"]
+  run_times = planner_runs.get_run_times()
+  number_runs = len(run_times)
+
+  if event_grid:
+    ## Exact step function, evaluated at each run termination
+    success_times = get_event_times(run_times, min_time, max_time)
+    percentages = get_success_from_sorted_times(run_times, number_runs, success_times)
+    indices = get_decimated_indices(success_times, [percentages], max_points)
     data["planners"][planner_name] = {
-        "success": percentages.tolist()
+        "success": percentages[indices],
+        "success_times": success_times[indices]
         }
-    if verbosity > 1:
-      print("Planner {} (id {}) has {} runs.".format(planner_name, planner_id, number_runs))
+    if bootstrap is not None:
+      add_success_interval(data["planners"][planner_name], run_times, number_runs, success_times[indices], bootstrap, inclusive=True)
+  else:
+    percentages = get_success_from_sorted_times(run_times, number_runs, times, inclusive=False)
+    data["planners"][planner_name] = {
+        "success": percentages
+        }
+    if bootstrap is not None:
+      add_success_interval(data["planners"][planner_name], run_times, number_runs, times, bootstrap, inclusive=False)
+  if config["verbosity"] > 1:
+    print("Planner {} (id {}) has {} runs.".format(planner_name, planner_id, number_runs))
 
+def add_cost_from_database(cursor, data, config, planner, planner_runs, event_grid, max_points, bootstrap,
+    with_best_cost):
   ############################################################
-  ### Get Cost per Planner over Time
+  ### Cost of a Planner over Time (or its best cost point)
   ############################################################
+  planner_id = planner[0]
+  planner_name = planner[1]
   max_time = data["info"]["max_time"]["optimization"]
   min_time = data["info"]["min_time"]["optimization"]
   max_cost = data["info"]["max_cost"]
   ci_left = data["info"]["ci_left"]
   ci_right = data["info"]["ci_right"]
-  if has_best_cost(cursor):
-    times = np.logspace(np.log10(min_time), np.log10(max_time), data["info"]["resolution"])
-
-    for planner in planners:
-      planner_id = planner[0]
-      planner_name = planner[1]
-      getids = cursor.execute("SELECT id FROM {} WHERE plannerid={}".format('runs',planner_id)).fetchall()
-      runs = np.array(getids).flatten()
-      runids = ','.join(str(run) for run in runs)
-
-      results = get_cost_results(cursor, runids, times, max_cost, ci_left, ci_right)
-      data["planners"][planner_name]["optimization_success"] = results[0]
-      if results[0]:
-        data["planners"][planner_name]["median"] = results[1].tolist()
-        data["planners"][planner_name]["quantile5"] = results[2].tolist()
-        data["planners"][planner_name]["quantile95"] = results[3].tolist()
-        success = get_count_success(cursor, len(runs), runids, times)
-        if verbosity > 0:
-          print("Planner {} success {} (runs {})".format(planner_name, success.tolist(), len(runs)))
-          print("Planner {} median {} (runs {})".format(planner_name, results[1].tolist(), len(runs)))
-        data["planners"][planner_name]["success"] = success.tolist()
+  planner_data = data["planners"][planner_name]
+  if not with_best_cost:
+    planner_data["optimization_success"] = False
+    with profile_stage("points", planner_name):
+      point_data = get_best_cost_from_runs(cursor, planner_runs, ci_left, ci_right, bootstrap)
+    if point_data is None:
+        point_data = max_point(max_time, max_cost)
+    planner_data["point"] = point_data
+    return
+
+  chunk_size = get_progress_chunk_size(config["memory_budget"])
+  times = np.logspace(np.log10(min_time), np.log10(max_time), data["info"]["resolution"])
+  runs = planner_runs.ids
+  column_chunk_size = get_cost_column_chunk_size(config["memory_budget"], len(runs))
+  if event_grid:
+    with profile_stage("cost_runs", planner_name):
+      times = get_event_times(get_progress_times_from_database(cursor, runs), min_time, max_time,
+          kEventTimesPerPoint * max_points)
+
+  ## On the event grid, bootstrap intervals are only computed at the
+  ## decimated times
+  results = get_cost_results(cursor, runs, times, max_cost, ci_left, ci_right, chunk_size, planner_name,
+      None if event_grid else bootstrap, column_chunk_size)
+  planner_data["optimization_success"] = results[0]
+  if results[0]:
+    with profile_stage("count_success", planner_name):
+      solution_times = get_first_solution_times_from_database(cursor, runs)
+      success = get_success_from_sorted_times(solution_times, len(runs), times)
+    if config["verbosity"] > 0:
+      print("Planner {} success {} (runs {})".format(planner_name, success.tolist(), len(runs)))
+      print("Planner {} median {} (runs {})".format(planner_name, results[1].tolist(), len(runs)))
+    if event_grid:
+      indices = get_decimated_indices(times, results[1:], max_points)
+      success_indices = get_decimated_indices(times, [success], max_points)
+      planner_data["times"] = times[indices]
+      planner_data["success_times"] = times[success_indices]
+      if bootstrap is None:
+        results = [results[0]] + [result[indices] for result in results[1:]]
       else:
-        point_data = get_best_cost_from_runs(cursor, planner_id, ci_left, ci_right)
-        if point_data is None:
-            point_data = max_point(max_time, max_cost)
-        data["planners"][planner_name]["point"] = point_data
+        results = get_cost_results(cursor, runs, times[indices], max_cost, ci_left, ci_right, chunk_size, planner_name,
+            bootstrap, column_chunk_size)
+      success = success[success_indices]
+    planner_data["median"] = results[1]
+    planner_data["quantile5"] = results[2]
+    planner_data["quantile95"] = results[3]
+    planner_data["success"] = success
+    if bootstrap is not None:
+      add_success_interval(planner_data, solution_times, len(runs),
+          planner_data.get("success_times", times), bootstrap, inclusive=True)
   else:
-    if verbosity > 0:
-      print("WARNING: No best_cost entry in database file. Using solution_length instead.")
-    for planner in planners:
-      planner_id = planner[0]
-      planner_name = planner[1]
-      data["planners"][planner_name]["optimization_success"] = False
-
-      point_data = get_best_cost_from_runs(cursor, planner_id, ci_left, ci_right)
-      if point_data is None:
-          point_data = max_point(max_time, max_cost)
-      data["planners"][planner_name]["point"] = point_data
-
-def get_best_cost_from_runs(cursor, planner_id, ci_left, ci_right):
+    with profile_stage("points", planner_name):
+      point_data = get_best_cost_from_runs(cursor, planner_runs, ci_left, ci_right, bootstrap)
+    if point_data is None:
+        point_data = max_point(max_time, max_cost)
+    planner_data["point"] = point_data
+
+def add_success_interval(planner, event_times, run_count, times, bootstrap, inclusive):
+    ## Bootstrap confidence interval of the success curve of a planner
+    with profile_stage("bootstrap"):
+      (lower, upper) = get_bootstrap_success_interval(event_times, run_count, times, bootstrap, inclusive)
+    planner["success_lower"] = lower
+    planner["success_upper"] = upper
+
+def get_best_cost_from_runs(cursor, planner_runs, ci_left, ci_right, bootstrap=None):
     if not has_solution_length(cursor):
       return None
-    pair = np.array(cursor.execute("SELECT time, solution_length FROM {0} WHERE plannerid={1} AND status=6".format('runs', planner_id)).fetchall())
+    pair = planner_runs.get_solved_runs()
     if pair.size == 0:
         return None
     split = np.split(pair, 2, axis=1)
     times = split[0]
     costs = split[1]
-    return calculate_points(times, costs, ci_left, ci_right)
+    return calculate_points(times, costs, ci_left, ci_right, bootstrap)
 
-def calculate_points(times, costs, ci_left, ci_right):
-    if None in costs: 
+def calculate_points(times, costs, ci_left, ci_right, bootstrap=None):
+    if np.isnan(np.asarray(costs, dtype=float)).any():
       return None
 
+    if bootstrap is not None:
+      ## Medians with the bootstrap confidence intervals of the medians
+      time_interval = get_bootstrap_interval("median", np.asarray(times, dtype=float).reshape(-1, 1), bootstrap)
+      cost_interval = get_bootstrap_interval("median", np.asarray(costs, dtype=float).reshape(-1, 1), bootstrap)
+      return {"time": [np.median(times), time_interval[0][0], time_interval[1][0]],
+              "cost": [np.median(costs), cost_interval[0][0], cost_interval[1][0]]}
+
     data = {"time": [np.median(times), np.percentile(times, ci_left, interpolation='nearest'),
                      np.percentile(times, ci_right, interpolation='nearest')],
             "cost": [np.median(costs), np.percentile(costs, ci_left, interpolation='nearest'),
@@ -146,107 +223,297 @@ def get_errors(point):
     return time_errors, cost_errors
 
 def init_planner_colors(data):
-  planner_data = data["planners"]
-  planners = list(planner_data.keys())
-  planners.sort()
+  set_planner_colors(list(data["planners"].keys()), data["info"]["planner_colors"])
+
+def set_planner_colors(planner_names, planner_colors, verbosity=1):
+  planners = sorted(planner_names)
 
   for planner in planners:
     color = get_diverse_color(planner)
-    print(planner,":",color)
+    if verbosity > 0:
+      print(planner,":",color)
 
-  if data["info"]["planner_colors"]:
-    planner_colors = data["info"]["planner_colors"]
+  if planner_colors:
     for pcolor in planner_colors:
       global_color_map[pcolor] = rgba_to_hex(planner_colors[pcolor])
-      print(pcolor,":",global_color_map[pcolor])
-
-def plot_success(ax, data):
+      if verbosity > 0:
+        print(pcolor,":",global_color_map[pcolor])
+
+## In fast render mode, percentile bands are drawn below this zorder and
+## rasterized, while lines and markers stay vector graphics
+kBandZorder = 0.5
+kRasterizationZorder = 1
+
+def get_curve_segment(times, values, drawstyle):
+    ## Vertices of a curve as drawn by ax.plot with the given drawstyle
+    if drawstyle == 'steps-post':
+      return np.column_stack([np.repeat(times, 2)[1:], np.repeat(values, 2)[:-1]])
+    return np.column_stack([times, values])
+
+def get_drawstyle(steps):
+    ## Curves extracted on the event time grid are step functions
+    return 'steps-post' if steps else 'default'
+
+def add_line_collection(ax, segments, colors, linestyles, info, labels):
+    ## Draw all curves of an axis as one LineCollection. Empty lines are
+    ## added as legend handles, as a collection has only one label.
+    if len(segments) == 0:
+      return
+    from matplotlib.collections import LineCollection
+    linewidth = float(info["linewidth"])
+    ax.add_collection(LineCollection(segments, colors=colors, linewidths=linewidth, linestyles=linestyles))
+    for (color, linestyle, label) in zip(colors, linestyles, labels):
+      ax.plot([], [], color=color, linestyle=linestyle, linewidth=linewidth, label=label)
+
+## Number of cost curve points (summed over all planners) from which on the
+## automatic render mode is fast. Below, the fixed cost of the rasterized
+## bands makes fast pdf files larger than vector ones (see
+## benchmarks/benchmark_render.py).
+kFastRenderMinPoints = 25 * 1000
+
+def is_fast_render(config, curves):
+    ## fast_render is True (on), False (off) or None (automatic)
+    if config['fast_render'] is None:
+      return int(np.sum(curves.lengths)) >= kFastRenderMinPoints
+    return config['fast_render']
+
+def plot_success(ax, curves, fast_render=False):
+
+    info = curves.info
+    min_time = info["min_time"]["success"]
+    max_time = info["max_time"]["success"]
+    fontsize = info["fontsize"]
 
-    min_time = data["info"]["min_time"]["success"]
-    max_time = data["info"]["max_time"]["success"]
-    resolution = data["info"]["resolution"]
-    fontsize = data["info"]["fontsize"]
-
-    times = np.logspace(np.log10(min_time), np.log10(max_time), resolution)
     ax.set_xscale('log')
     ax.set_yscale('linear')
     ax.set_xlim(min_time, max_time)
     ax.set_ylim(0.0, 100.0)
 
-    init_planner_colors(data)
-
-    planner_data = data["planners"]
-    for planner in planner_data:
+    set_planner_colors(curves.names, info["planner_colors"], info.get("verbosity", 0))
+
+    if fast_render:
+      ax.set_rasterization_zorder(kRasterizationZorder)
+    segments = []
+    colors = []
+    linestyles = []
+    labels = []
+    ## The style lookups of get_plot_style take experiment data
+    style_data = {"info": info}
+    for (row, planner) in enumerate(curves.names):
       color = get_diverse_color(planner)
-      success_over_time = planner_data[planner]["success"]
-      ax.plot(times, success_over_time, color=color,
-          linestyle=get_line_style(data, planner),
-          linewidth=data["info"]["linewidth"], label=get_label(planner))
+      (planner_times, success_over_time) = curves.get_success_curve(row)
+      drawstyle = get_drawstyle(curves.success_steps[row])
+      interval = curves.get_success_interval(row)
+      if interval is not None:
+        ## Bootstrap confidence interval of the success curve
+        step = 'post' if drawstyle == 'steps-post' else None
+        ax.fill_between(planner_times, interval[0], interval[1],
+            color=color, step=step, alpha=info["alpha_percentile"], rasterized=fast_render,
+            zorder=kBandZorder if fast_render else None)
+      if fast_render:
+        segments.append(get_curve_segment(planner_times, success_over_time, drawstyle))
+        colors.append(color)
+        linestyles.append(get_line_style(style_data, planner))
+        labels.append(get_label(planner))
+      else:
+        ax.plot(planner_times, success_over_time, color=color, drawstyle=drawstyle,
+            linestyle=get_line_style(style_data, planner),
+            linewidth=info["linewidth"], label=get_label(planner))
+    add_line_collection(ax, segments, colors, linestyles, info, labels)
 
     ax.grid(True, which="both", ls='--')
-    if not data["info"]["remove_ylabel"]:
-      ylabel = data["info"]["ylabel_success"]
+    if not info["remove_ylabel"]:
+      ylabel = info["ylabel_success"]
       ax.set_ylabel(ylabel, fontsize=fontsize)
 
-def plot_optimization(ax, data, config):
+def plot_optimization(ax, curves, config):
 
-    min_time = data["info"]["min_time"]["optimization"]
-    max_time = data["info"]["max_time"]["optimization"]
-    resolution = data["info"]["resolution"]
-    times = np.logspace(np.log10(min_time), np.log10(max_time), resolution)
+    info = curves.info
+    min_time = info["min_time"]["optimization"]
+    max_time = info["max_time"]["optimization"]
 
-    max_cost = get_maxcost_from_json_or_config(data, config, times)
-    min_cost = get_mincost_from_json_or_config(data, config, times, max_cost)
+    max_cost = get_maxcost_from_curves_or_config(curves, config)
+    min_cost = get_mincost_from_curves_or_config(curves, config, max_cost)
 
-    fontsize = data["info"]["fontsize"]
+    fontsize = info["fontsize"]
 
     ax.set_xscale('log')
     ax.set_yscale('linear')
     ax.set_xlim(min_time, max_time)
     ax.set_ylim(min_cost, max_cost)
 
-    planner_data = data["planners"]
-    for planner in planner_data:
-      planner_optimization_success = planner_data[planner]["optimization_success"]
+    fast_render = config['fast_render']
+    if fast_render:
+      ax.set_rasterization_zorder(kRasterizationZorder)
+    segments = []
+    colors = []
+    linestyles = []
+    labels = []
+    style_data = {"info": info}
+    starts = curves.get_start_indices(max_cost)
+    for (row, planner) in enumerate(curves.names):
       color = get_diverse_color(planner)
-      if planner_optimization_success:
-        planner_median = planner_data[planner]["median"]
-        planner_q5 = planner_data[planner]["quantile5"]
-        planner_q95 = planner_data[planner]["quantile95"]
-
-        start = get_start_index(planner_median, times, max_cost)
-        ax.plot(times[start:], planner_median[start:], color=color, linewidth=data["info"]["linewidth"], label=get_label(planner))
-        ax.fill_between(times[start:], planner_q5[start:], planner_q95[start:], color=color, alpha=data["info"]["alpha_percentile"])
+      if curves.optimization_success[row]:
+        (planner_times, planner_median, planner_q5, planner_q95) = curves.get_cost_curve(row)
+        drawstyle = get_drawstyle(curves.steps[row])
+        step = 'post' if drawstyle == 'steps-post' else None
+
+        start = starts[row]
+        if fast_render:
+          segments.append(get_curve_segment(planner_times[start:], planner_median[start:], drawstyle))
+          colors.append(color)
+          linestyles.append(get_line_style(style_data, planner))
+          labels.append(get_label(planner))
+          ax.fill_between(planner_times[start:], planner_q5[start:], planner_q95[start:], color=color, step=step,
+              alpha=info["alpha_percentile"], rasterized=True, zorder=kBandZorder)
+        else:
+          ax.plot(planner_times[start:], planner_median[start:], color=color, drawstyle=drawstyle,
+              linestyle=get_line_style(style_data, planner), linewidth=info["linewidth"], label=get_label(planner))
+          ax.fill_between(planner_times[start:], planner_q5[start:], planner_q95[start:], color=color, step=step, alpha=info["alpha_percentile"])
       else:
-        planner_point = planner_data[planner]["point"]
+        planner_point = curves.get_point(row)
         time_errors, cost_errors = get_errors(planner_point)
-        plt.errorbar(planner_point["time"][0], planner_point["cost"][0], cost_errors, time_errors, c=color, marker=get_marker_style(data, planner), ms=10, lw=0.5)
+        ax.errorbar(planner_point["time"][0], planner_point["cost"][0], cost_errors, time_errors, c=color, marker=get_marker_style(style_data, planner), ms=10, lw=0.5)
+
+    add_line_collection(ax, segments, colors, linestyles, info, labels)
 
     ax.grid(True, which="both", ls='--')
-    ylabel = data["info"]["ylabel_optimization"]
-    xlabel = data["info"]["xlabel"]
+    ylabel = info["ylabel_optimization"]
+    xlabel = info["xlabel"]
     ax.set_xlabel(xlabel, fontsize=fontsize)
-    if not data["info"]["remove_ylabel"]:
+    if not info["remove_ylabel"]:
       ax.set_ylabel(ylabel, fontsize=fontsize)
 
-def json_to_graph(json_filepath, pdf_filepath, config):
-    with open(json_filepath, 'r') as jsonfile:
-        data = json.load(jsonfile)
+def savefig_atomic(fig, filepath, **kwargs):
+    ## Write to a temporary file first, such that readers never observe a
+    ## partially written figure
+    tmp_filepath = "{}.{}.tmp".format(filepath, os.getpid())
+    try:
+      fig.savefig(tmp_filepath, **kwargs)
+      os.replace(tmp_filepath, filepath)
+    finally:
+      if os.path.exists(tmp_filepath):
+        os.remove(tmp_filepath)
+
+## Curves of the planner data, stored as float32 arrays in .npz files
+kPlannerCurves = ["success", "median", "quantile5", "quantile95", "times", "success_times", "success_lower", "success_upper"]
+
+def save_data_as_npz(filepath, data):
+    ## Compact binary alternative to the json file: info and the remaining
+    ## planner entries are stored as json string, the curves as arrays
+    planners = {}
+    arrays = {}
+    for (index, (planner_name, planner)) in enumerate(data["planners"].items()):
+      planners[planner_name] = {key: value for (key, value) in planner.items() if key not in kPlannerCurves}
+      for key in kPlannerCurves:
+        if key in planner:
+          arrays["{}_{}".format(key, index)] = np.asarray(planner[key], dtype=np.float32)
+    tmp_filepath = "{}.{}.tmp.npz".format(filepath, os.getpid())
+    np.savez(tmp_filepath,
+        info=np.array(json.dumps(data["info"], default=to_json_serializable)),
+        planners=np.array(json.dumps(planners, default=to_json_serializable)), **arrays)
+    os.replace(tmp_filepath, filepath)
+
+def load_data_from_npz(filepath):
+    with np.load(filepath) as arrays:
+      data = {"info": json.loads(str(arrays["info"])), "planners": {}}
+      planners = json.loads(str(arrays["planners"]))
+      for (index, (planner_name, planner)) in enumerate(planners.items()):
+        for key in kPlannerCurves:
+          array_name = "{}_{}".format(key, index)
+          if array_name in arrays:
+            planner[key] = arrays[array_name]
+        data["planners"][planner_name] = planner
+    return data
 
-    if config["only_success_graph"]:
-      fig, axs = plt.subplots(1, 1, figsize=(16,10))
-      plot_success(axs, data)
-      ax_success = axs
+def load_data(filepath):
+    ## Load planner data written as .json or .npz file
+    if filepath.endswith(".npz"):
+      return load_data_from_npz(filepath)
+    with open(filepath, 'r') as jsonfile:
+      return json.load(jsonfile)
+
+def save_data(filepath, data):
+    if filepath.endswith(".npz"):
+      save_data_as_npz(filepath, data)
     else:
-      fig, axs = plt.subplots(2, 1, sharex='col', figsize=(16,10))
+      write_json_atomic(filepath, data, indent=4)
+
+def json_to_graph(json_filepath, pdf_filepath, config):
+    ## Render a graph from planner data stored as .json or .npz file
+    with profile_stage("load_data"):
+      data = load_data(json_filepath)
+    legend_filepath = change_filename_extension(json_filepath, '_legend.pdf')
+    data_to_graph(data, pdf_filepath, legend_filepath, config)
+
+def data_to_graph(data, pdf_filepath, legend_filepath, config):
+    ## Returns the paths of the written files
+    (fig, legend) = create_graph_figure(data, config, legend_filepath)
+    output_filepaths = []
+    ## Additional formats are written next to the pdf file
+    for output_format in config['formats']:
+      if output_format == 'pdf':
+        filepath = pdf_filepath
+      else:
+        filepath = change_filename_extension(pdf_filepath, '.' + output_format)
+      savefig_kwargs = get_savefig_kwargs(config, output_format, legend)
+      with profile_stage("savefig_" + output_format):
+        savefig_atomic(fig, filepath, **savefig_kwargs)
+      output_filepaths.append(filepath)
+
+      if config['verbosity'] > 0:
+        print("Wrote %s with dpi %d to file %s" %(output_format, savefig_kwargs['dpi'], filepath))
+    if config['show']:
+      os.system('xdg-open %s' % pdf_filepath)
+    get_pyplot().close(fig)
+    if config["legend_separate_file"] and not config["legend_none"] and legend_filepath is not None:
+      output_filepaths.append(legend_filepath)
+    return output_filepaths
+
+def get_savefig_kwargs(config, output_format, legend):
+    ## In vector formats, the dpi only applies to the rasterized bands of the
+    ## fast render mode (on or automatic)
+    dpi = 300
+    if config['fast_render'] is not False and output_format != 'png':
+      dpi = config['raster_dpi']
+    savefig_kwargs = {'format': output_format, 'dpi': dpi, 'bbox_inches': 'tight'}
+    if legend is not None:
+      savefig_kwargs['bbox_extra_artists'] = (legend,)
+    return savefig_kwargs
+
+## Size (in inches) of the graph figures
+kGraphFigureSize = (16, 10)
+
+def create_graph_figure(data, config, legend_filepath=None):
+    ## Figure of the experiment data and its legend (None if the legend is
+    ## omitted or written to the separate legend_filepath)
+    with profile_stage("import_matplotlib"):
+      plt = get_pyplot()
+    fig = plt.figure(figsize=kGraphFigureSize)
+    legend = plot_graph(get_graph_axes(fig, config), PlannerCurves.from_data(data), config, legend_filepath)
+    return fig, legend
+
+def get_graph_axes(fig, config):
+    ## Success axis, or success and cost axes sharing the time axis
+    if config["only_success_graph"]:
+      return [fig.subplots(1, 1)]
+    return list(fig.subplots(2, 1, sharex='col'))
+
+def plot_graph(axs, curves, config, legend_filepath=None):
+    ## Plot the curves on the success axis and (unless only_success_graph)
+    ## the cost axis of axs, and return the legend (see create_graph_figure)
+    plt = get_pyplot()
+    config = dict(config, fast_render=is_fast_render(config, curves))
+    with profile_stage("plot"):
       ax_success = axs[0]
-      ax_cost = axs[1]
-      plot_success(ax_success, data)
-      plot_optimization(ax_cost, data, config)
+      plot_success(ax_success, curves, config['fast_render'])
+      if not config["only_success_graph"]:
+        ax_cost = axs[1]
+        plot_optimization(ax_cost, curves, config)
 
-    fontsize = data["info"]["fontsize"]
-    label_fontsize = data["info"]["label_fontsize"]
-    experiment_name = get_experiment_label(data["info"]["experiment"])
+    fontsize = curves.info["fontsize"]
+    label_fontsize = curves.info["label_fontsize"]
+    experiment_name = get_experiment_label(curves.info["experiment"])
 
     if not config["no_title"]:
       if 'title_name' in config:
@@ -254,22 +521,23 @@ def json_to_graph(json_filepath, pdf_filepath, config):
       else:
         ax_success.set_title(experiment_name, fontsize=fontsize)
 
+    legend = None
     legend_title_name = 'Planner'
     if not config["legend_none"]:
       if config["legend_separate_file"]:
-        figl, axl = plt.subplots()
-        label_params = ax_success.get_legend_handles_labels() 
-        legend = axl.legend(*label_params, loc="center", frameon=True, ncol=4, fontsize=fontsize)
-        for obj in legend.legendHandles:
-          obj.set_linewidth(data["info"]["legend_linewidth"])
-        axl.axis('off')
-        legend_filepath = change_filename_extension(json_filepath, '_legend.pdf')
-        figl.savefig(legend_filepath, bbox_extra_artists=(legend,), bbox_inches='tight')
-        plt.close(figl)
+        if legend_filepath is not None:
+          figl, axl = plt.subplots()
+          label_params = ax_success.get_legend_handles_labels() 
+          separate_legend = axl.legend(*label_params, loc="center", frameon=True, ncol=4, fontsize=fontsize)
+          for obj in separate_legend.legendHandles:
+            obj.set_linewidth(curves.info["legend_linewidth"])
+          axl.axis('off')
+          savefig_atomic(figl, legend_filepath, format='pdf', bbox_extra_artists=(separate_legend,), bbox_inches='tight')
+          plt.close(figl)
       else:
         legend = ax_success.legend(loc='upper left', title=legend_title_name, fontsize=label_fontsize)
         for obj in legend.legendHandles:
-          obj.set_linewidth(data["info"]["legend_linewidth"])
+          obj.set_linewidth(curves.info["legend_linewidth"])
         plt.setp(legend.get_title(),fontsize=label_fontsize)
 
     ## Set ticks and label fontsizes
@@ -279,22 +547,101 @@ def json_to_graph(json_filepath, pdf_filepath, config):
 
     if not config["only_success_graph"]:
       ax_cost.tick_params(labelsize=label_fontsize)
+    return legend
 
-    fig = plt.gcf()
-    if config['legend_separate_file'] or config['legend_none']:
-      plt.savefig(pdf_filepath, format='pdf', dpi=300, bbox_inches='tight')
+def get_data_from_database_file(database_filepath, info, config, result_cache=None):
+    ############################################################
+    ### Extract time bounds and planner curves of each experiment
+    ### of a single database file (or load them from the cache)
+    ############################################################
+    result = {"experiments": {}}
+    for (experiment_name, planner_name) in iter_data_from_database_file(database_filepath, info, config, result, result_cache):
+      pass
+    return result
+
+def iter_data_from_database_file(database_filepath, info, config, result, result_cache=None):
+    ## Generator variant of get_data_from_database_file, which fills result
+    ## and yields (experiment name, planner name) as soon as the curves of a
+    ## planner are complete. The result is only cached once all planners
+    ## of the file have been extracted.
+    if not os.path.isfile(database_filepath):
+      raise Exception("{} is not an existing file.".format(database_filepath))
+
+    extension = os.path.splitext(database_filepath)[1]
+    if not (extension == '.db'):
+      raise Exception("{} is not a .db file.".format(database_filepath))
+
+    ## Prefer an up-to-date columnar sidecar (see the convert command)
+    columnar_database = load_columnar_database(database_filepath)
+
+    if result_cache is not None:
+      statistics_config = get_statistics_config(info, config)
+      if columnar_database is not None:
+        statistics_config['columnar_dtype'] = columnar_database.dtype
+      key = get_result_cache_key(database_filepath, statistics_config)
+      cached_result = result_cache.get(key)
+      if cached_result is not None:
+        if config['verbosity'] > 0:
+          print("Loaded cached results for {}.".format(database_filepath))
+        result.update(cached_result)
+        for (experiment_name, experiment_result) in cached_result["experiments"].items():
+          for planner_name in experiment_result["planners"]:
+            yield (experiment_name, planner_name)
+        return
+
+    if columnar_database is not None:
+      if config['verbosity'] > 0:
+        print("Reading columnar database {}.".format(columnar_database.directory))
+      con = columnar_database
+      cursor = columnar_database
     else:
-      plt.savefig(pdf_filepath, format='pdf', dpi=300, bbox_inches='tight', bbox_extra_artists=(legend,))
-
-    if config['verbosity'] > 0:
-      print("Wrote pdf with dpi %d to file %s" %(fig.dpi,pdf_filepath))
-    if config['show']:
-      os.system('xdg-open %s' % pdf_filepath)
+      con = connect_database(database_filepath, config['in_memory_size'])
+      cursor = get_profiled_cursor(con.cursor())
+
+    try:
+      with profile_stage("schema"):
+        get_schema_from_database(cursor)
+
+      if config['verbosity'] > 1:
+        print_metadata_from_database(cursor)
+
+      if config['verbosity'] > 2:
+        print_run_results_from_database(cursor)
+
+      ## Experiments with the same name are merged, experiments with different
+      ## names are processed separately
+      with profile_stage("experiments"):
+        experiments = get_experiment_ids_by_name(cursor)
+      for (experiment_name, experiment_ids) in experiments.items():
+        ## Only one experiment, if selected (as by the batch command)
+        if config.get('experiment') is not None and experiment_name != config['experiment']:
+          continue
+        data = {}
+        data["info"] = copy.deepcopy(info)
+        data["planners"] = {}
+
+        with profile_stage("time_bounds"):
+          get_maxtime_from_database_or_config(cursor, config, data, experiment_ids)
+          get_mintime_from_database_or_config(cursor, config, data, experiment_ids)
+
+        result["experiments"][experiment_name] = {
+            "info": {
+              "max_time": data["info"]["max_time"],
+              "min_time": data["info"]["min_time"]
+            },
+            "planners": data["planners"]
+        }
+        for planner_name in iter_json_from_database(cursor, data, config, experiment_ids):
+          yield (experiment_name, planner_name)
+    finally:
+      con.close()
 
+    if result_cache is not None:
+      result_cache.put(key, result)
 
-def plot_graph_from_databases(database_filepaths, config):
+def get_data_from_config(config):
     ############################################################
-    ### Create data structure from database file
+    ### Create data structure with default and configured info
     ############################################################
     data = {}
     data["info"] = load_config()
@@ -319,59 +666,100 @@ def plot_graph_from_databases(database_filepaths, config):
       data["info"]['planner_colors'] = config['planner_colors']
     else:
       data["info"]['planner_colors'] = {}
+    for key in ['ci_method', 'bootstrap_samples', 'bootstrap_confidence']:
+      if config.get(key) is not None:
+        data["info"][key] = config[key]
+    return data
 
-    experiment_names = []
-    experiment_times = []
-    for database_filepath in database_filepaths:
-      if not os.path.isfile(database_filepath):
-        raise Exception("{} is not an existing file.".format(database_filepath))
-
-      extension = os.path.splitext(database_filepath)[1]
-      if not (extension == '.db'):
-        raise Exception("{} is not a .db file.".format(database_filepath))
-
-      con = sqlite3.connect(database_filepath)
-      cursor = con.cursor()
-
-      get_maxtime_from_database_or_config(cursor, config, data)
-      get_mintime_from_database_or_config(cursor, config, data)
-
-      get_json_from_database(cursor, data, config)
-      experiment_names.append(get_experiment_names_from_database(cursor))
-
-    experiment_names = [item for sublist in experiment_names for item in sublist]
-    experiment_names = list(set(experiment_names))
-
-    data["info"]["experiment"] = get_experiment_name_from_array(experiment_names)
-
+def plot_experiments(experiments, filepaths, config):
     ############################################################
-    ### Verify that all experiment names match
+    ### Create one data (json/npz) and pdf file per experiment.
+    ### If there are several experiments, their names are
+    ### appended to the file names. The planner data is handed
+    ### to rendering in memory, the data file is optional.
     ############################################################
-
-    if len(experiment_names) < 1 :
+    ## Returns the paths of the written data and graph files
+    if len(experiments) < 1 :
       raise Exception("Could not load experiments.")
 
-    if len(experiment_names) > 1:
-      raise Exception("Mismatching experiment names in database: {}".format(experiment_names))
+    filename_without_extension = get_filename_from_database_filepaths(filepaths)
+    if config['intermediate'] != 'none':
+      data_filepath = create_filename_with_extension(filename_without_extension, '.' + config['intermediate'])
+    else:
+      data_filepath = None
+    default_pdf_filepath = filename_without_extension + '.pdf'
+    if config['output_file']:
+      name = config['output_file']
+      pdf_filepath = get_filename_from_database_filepaths_and_name(filepaths, name)
+    else:
+      pdf_filepath = default_pdf_filepath
+
+    output_filepaths = []
+    for (experiment_name, experiment_data) in experiments.items():
+      experiment_data_filepath = data_filepath
+      experiment_pdf_filepath = pdf_filepath
+      experiment_default_pdf_filepath = default_pdf_filepath
+      ## Files of a selected experiment (as by the batch command, which
+      ## renders each experiment of a file in its own job) are named like
+      ## the files of several experiments, apart from a given pdf file
+      selected = config.get('experiment') is not None
+      if len(experiments) > 1 or selected:
+        if data_filepath is not None:
+          experiment_data_filepath = get_filename_with_suffix(data_filepath, experiment_name)
+        experiment_default_pdf_filepath = get_filename_with_suffix(default_pdf_filepath, experiment_name)
+      if len(experiments) > 1 or (selected and not config['output_file']):
+        experiment_pdf_filepath = get_filename_with_suffix(pdf_filepath, experiment_name)
+      experiment_legend_filepath = change_filename_extension(experiment_default_pdf_filepath, '_legend.pdf')
+
+      if experiment_data_filepath is not None:
+        with profile_stage("write_data"):
+          save_data(experiment_data_filepath, experiment_data)
+        output_filepaths.append(experiment_data_filepath)
+      if config['data_only']:
+        if config['verbosity'] > 0 and experiment_data_filepath is not None:
+          print("Wrote data to file {}".format(experiment_data_filepath))
+      else:
+        output_filepaths.extend(data_to_graph(experiment_data, experiment_pdf_filepath, experiment_legend_filepath,
+          config))
+    return output_filepaths
 
-    if len(experiment_names) > 0 :
-      data["info"]["experiment"] = get_experiment_name_from_array(experiment_names)
+def plot_graph_from_databases(database_filepaths, config):
+    ## Returns the paths of the written files (see plot_experiments)
+    experiments = get_experiments_from_databases(database_filepaths, config)
+    return plot_experiments(experiments, database_filepaths, config)
+
+def get_experiments_from_databases(database_filepaths, config):
+    ## Experiment data of all database files, by experiment name
+    data = get_data_from_config(config)
+
+    result_cache = None
+    if config['cache_dir']:
+      result_cache = ResultCache(config['cache_dir'], config['cache_size'])
+
+    ## Extract database files in worker processes if requested. Results are
+    ## merged in input order, such that the output matches the serial mode.
+    if config['jobs'] > 1 and len(database_filepaths) > 1 and not is_profiling():
+      with ProcessPoolExecutor(max_workers=config['jobs']) as executor:
+        results = list(executor.map(get_data_from_database_file, database_filepaths,
+          repeat(data["info"]), repeat(config), repeat(result_cache)))
+    else:
+      results = [get_data_from_database_file(database_filepath, data["info"], config, result_cache)
+          for database_filepath in database_filepaths]
 
-    ############################################################
-    ### Create json file from data structure
-    ############################################################
-    json_filepath = get_json_filepath_from_databases(database_filepaths)
-    with open(json_filepath, 'w') as jsonfile:
-        json.dump(data, jsonfile, indent=4)
+    return merge_experiment_results(data, results)
 
+def merge_experiment_results(data, results):
     ############################################################
-    ### Plot json file to pdf
+    ### Merge experiments with the same name across files
     ############################################################
-
-    if config['output_file']:
-      name = config['output_file']
-      pdf_filepath = get_filename_from_database_filepaths_and_name(database_filepaths, name)
-    else:
-      pdf_filepath = change_filename_extension(json_filepath, '.pdf')
-
-    json_to_graph(json_filepath, pdf_filepath, config)
+    experiments = {}
+    for result in results:
+      for (experiment_name, experiment_result) in result["experiments"].items():
+        if experiment_name not in experiments:
+          experiments[experiment_name] = copy.deepcopy(data)
+          experiments[experiment_name]["info"]["experiment"] = experiment_name
+        experiment_data = experiments[experiment_name]
+        experiment_data["info"]["max_time"] = experiment_result["info"]["max_time"]
+        experiment_data["info"]["min_time"] = experiment_result["info"]["min_time"]
+        experiment_data["planners"].update(experiment_result["planners"])
+    return experiments
@@ -0,0 +1,152 @@
+import numpy as np
+
+############################################################
+### Planner curves of an experiment as arrays
+###
+### Extraction, the result cache and the json/npz files keep
+### one dictionary per planner (the planner data). Readers and
+### plotters convert it once into a PlannerCurves, which holds
+### one (planners x samples) array per statistic, such that
+### values across all planners are single reductions. Row i
+### belongs to the i-th planner, entries beyond the length of
+### its curve are NaN. The success and cost curves of each
+### planner have their own time samples, which are the common
+### logspace times unless the curve was extracted on the event
+### time grid (and is then drawn as a step function).
+############################################################
+
+## Statistics of the cost curves (keys of the planner data)
+kCostStatistics = ["median", "quantile5", "quantile95"]
+
+def get_logspace_times(info, key):
+  ## Common time samples of the success or optimization curves
+  return np.logspace(np.log10(info["min_time"][key]), np.log10(info["max_time"][key]), info["resolution"])
+
+def stack_curves(curves, length):
+  ## (curves x length) array of 1-D curves, None entries give NaN rows
+  array = np.full((len(curves), length), np.nan)
+  for (row, curve) in enumerate(curves):
+    if curve is not None:
+      array[row, :len(curve)] = curve
+  return array
+
+def get_optional_curve(planner, key):
+  value = planner.get(key)
+  return None if value is None else np.asarray(value, dtype=float)
+
+class PlannerCurves:
+  __slots__ = ["info", "names", "index",
+      "success_times", "success_lengths", "success_steps", "success", "success_lower", "success_upper",
+      "times", "lengths", "steps", "median", "quantile5", "quantile95",
+      "optimization_success", "points"]
+
+  def __init__(self, info, names):
+    self.info = info
+    self.names = list(names)
+    self.index = {name: row for (row, name) in enumerate(self.names)}
+
+  @classmethod
+  def from_data(cls, data):
+    ## Curves of the planners of experiment data ({"info", "planners"}),
+    ## whose curves may be arrays or lists (as loaded from json)
+    info = data["info"]
+    planners = list(data["planners"].values())
+    curves = cls(info, data["planners"].keys())
+
+    success = [np.asarray(planner["success"], dtype=float) for planner in planners]
+    curves.success_lengths = np.array([len(values) for values in success], dtype=int)
+    curves.success_steps = np.array(["success_times" in planner for planner in planners], dtype=bool)
+    width = int(curves.success_lengths.max(initial=0))
+    logspace_times = get_logspace_times(info, "success")
+    curves.success_times = stack_curves([get_optional_curve(planner, "success_times") if "success_times" in planner
+      else logspace_times[:len(values)] for (planner, values) in zip(planners, success)], width)
+    curves.success = stack_curves(success, width)
+    ## Bootstrap confidence intervals of the success curves are optional
+    curves.success_lower = None
+    curves.success_upper = None
+    if any("success_lower" in planner for planner in planners):
+      curves.success_lower = stack_curves([get_optional_curve(planner, "success_lower") for planner in planners], width)
+      curves.success_upper = stack_curves([get_optional_curve(planner, "success_upper") for planner in planners], width)
+
+    curves.optimization_success = np.array([bool(planner["optimization_success"]) for planner in planners], dtype=bool)
+    median = [get_optional_curve(planner, "median") if optimized else None
+        for (planner, optimized) in zip(planners, curves.optimization_success)]
+    curves.lengths = np.array([0 if values is None else len(values) for values in median], dtype=int)
+    curves.steps = np.array(["times" in planner for planner in planners], dtype=bool)
+    width = int(curves.lengths.max(initial=0))
+    logspace_times = get_logspace_times(info, "optimization")
+    curves.times = stack_curves([get_optional_curve(planner, "times") if "times" in planner
+      else logspace_times[:length] for (planner, length) in zip(planners, curves.lengths)], width)
+    curves.median = stack_curves(median, width)
+    curves.quantile5 = stack_curves([get_optional_curve(planner, "quantile5") if optimized else None
+      for (planner, optimized) in zip(planners, curves.optimization_success)], width)
+    curves.quantile95 = stack_curves([get_optional_curve(planner, "quantile95") if optimized else None
+      for (planner, optimized) in zip(planners, curves.optimization_success)], width)
+
+    ## (planners x [time, cost] x [median, lower, upper]) of the planners
+    ## without cost curves, NaN for the others
+    curves.points = np.full((len(planners), 2, 3), np.nan)
+    for (row, planner) in enumerate(planners):
+      if not curves.optimization_success[row]:
+        curves.points[row] = [planner["point"]["time"], planner["point"]["cost"]]
+    return curves
+
+  def to_data(self):
+    ## Experiment data ({"info", "planners"}) with the planner data of the
+    ## curves, as written to json/npz files
+    planners = {}
+    for (row, name) in enumerate(self.names):
+      length = self.success_lengths[row]
+      planner = {"success": self.success[row, :length]}
+      if self.success_steps[row]:
+        planner["success_times"] = self.success_times[row, :length]
+      if self.success_lower is not None and not np.all(np.isnan(self.success_lower[row, :length])):
+        planner["success_lower"] = self.success_lower[row, :length]
+        planner["success_upper"] = self.success_upper[row, :length]
+      planner["optimization_success"] = bool(self.optimization_success[row])
+      if self.optimization_success[row]:
+        length = self.lengths[row]
+        for key in kCostStatistics:
+          planner[key] = getattr(self, key)[row, :length]
+        if self.steps[row]:
+          planner["times"] = self.times[row, :length]
+      else:
+        planner["point"] = {"time": self.points[row, 0].tolist(), "cost": self.points[row, 1].tolist()}
+      planners[name] = planner
+    return {"info": self.info, "planners": planners}
+
+  def __len__(self):
+    return len(self.names)
+
+  def get_success_curve(self, row):
+    ## (times, success) of the success curve of a planner
+    length = self.success_lengths[row]
+    return self.success_times[row, :length], self.success[row, :length]
+
+  def get_success_interval(self, row):
+    ## (lower, upper) confidence interval of the success curve, or None
+    length = self.success_lengths[row]
+    if self.success_lower is None or np.all(np.isnan(self.success_lower[row, :length])):
+      return None
+    return self.success_lower[row, :length], self.success_upper[row, :length]
+
+  def get_cost_curve(self, row):
+    ## (times, median, quantile5, quantile95) of the cost curve of a planner
+    length = self.lengths[row]
+    return (self.times[row, :length], self.median[row, :length], self.quantile5[row, :length],
+        self.quantile95[row, :length])
+
+  def get_point(self, row):
+    ## {"time", "cost"} as [median, lower, upper] of a planner without cost curve
+    return {"time": self.points[row, 0], "cost": self.points[row, 1]}
+
+  def get_start_indices(self, max_cost):
+    ## Index of the first sample of each cost curve below max_cost (the
+    ## length of the curve if there is none)
+    below = self.median < max_cost
+    return np.where(below.any(axis=1), below.argmax(axis=1), self.lengths)
+
+  def get_started_mask(self, max_cost):
+    ## Samples of the cost curves from their start index on
+    samples = np.arange(self.median.shape[1])
+    return (samples >= self.get_start_indices(max_cost)[:, np.newaxis]) & (samples < self.lengths[:, np.newaxis])
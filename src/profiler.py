@@ -0,0 +1,158 @@
+import time
+from contextlib import contextmanager
+
+############################################################
+### Profiling of plotting runs (--profile)
+###
+### Stages are timed with profile_stage(name, planner) and
+### SQL statements and fetched rows are counted by wrapping
+### the database cursor with get_profiled_cursor. Queries are
+### attributed to the innermost open stage, and so is time:
+### the seconds of a stage exclude the time of the stages nested
+### in it (its self time), such that the seconds of all stages
+### add up to the profiled wall time. The total seconds of a
+### stage include its nested stages. Without an active profiler
+### both are no-ops.
+############################################################
+
+class Profiler:
+  def __init__(self):
+    ## (stage, planner) -> {"calls", "seconds", "total_seconds", "queries",
+    ## "rows"}, in order of the first occurrence
+    self.entries = {}
+    ## Keys of the open stages and the seconds of the stages nested in each
+    self.stack = []
+    self.nested_seconds = []
+
+  def get_entry(self, key):
+    entry = self.entries.get(key)
+    if entry is None:
+      entry = {"calls": 0, "seconds": 0.0, "total_seconds": 0.0, "queries": 0, "rows": 0}
+      self.entries[key] = entry
+    return entry
+
+  def get_current_entry(self):
+    if len(self.stack) > 0:
+      return self.get_entry(self.stack[-1])
+    return self.get_entry(("other", None))
+
+  @contextmanager
+  def stage(self, name, planner=None):
+    key = (name, planner)
+    entry = self.get_entry(key)
+    self.stack.append(key)
+    self.nested_seconds.append(0.0)
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      seconds = time.perf_counter() - start
+      entry["seconds"] += seconds - self.nested_seconds.pop()
+      entry["total_seconds"] += seconds
+      entry["calls"] += 1
+      self.stack.pop()
+      if len(self.nested_seconds) > 0:
+        self.nested_seconds[-1] += seconds
+
+  def count_query(self):
+    self.get_current_entry()["queries"] += 1
+
+  def count_rows(self, rows):
+    self.get_current_entry()["rows"] += rows
+
+  def get_stage_totals(self):
+    ## Entries summed over all planners of each stage
+    totals = {}
+    for ((name, planner), entry) in self.entries.items():
+      total = totals.setdefault(name, {"calls": 0, "seconds": 0.0, "total_seconds": 0.0, "queries": 0, "rows": 0})
+      for (field, value) in entry.items():
+        total[field] += value
+    return totals
+
+  def get_report(self):
+    return {
+        "stages": self.get_stage_totals(),
+        "planners": [dict(entry, stage=name, planner=planner)
+          for ((name, planner), entry) in self.entries.items() if planner is not None]
+    }
+
+class ProfiledCursor:
+  ## sqlite3 cursor which counts executed statements and fetched rows
+  def __init__(self, cursor, profiler):
+    self.cursor = cursor
+    self.profiler = profiler
+
+  def execute(self, *args):
+    self.profiler.count_query()
+    self.cursor.execute(*args)
+    return self
+
+  def executemany(self, *args):
+    self.profiler.count_query()
+    self.cursor.executemany(*args)
+    return self
+
+  def fetchone(self):
+    row = self.cursor.fetchone()
+    if row is not None:
+      self.profiler.count_rows(1)
+    return row
+
+  def fetchmany(self, *args):
+    rows = self.cursor.fetchmany(*args)
+    self.profiler.count_rows(len(rows))
+    return rows
+
+  def fetchall(self):
+    rows = self.cursor.fetchall()
+    self.profiler.count_rows(len(rows))
+    return rows
+
+  def __iter__(self):
+    for row in self.cursor:
+      self.profiler.count_rows(1)
+      yield row
+
+  def __getattr__(self, name):
+    return getattr(self.cursor, name)
+
+active_profiler = None
+
+def enable_profiler():
+  global active_profiler
+  active_profiler = Profiler()
+  return active_profiler
+
+def disable_profiler():
+  global active_profiler
+  active_profiler = None
+
+def is_profiling():
+  return active_profiler is not None
+
+@contextmanager
+def no_profile_stage():
+  yield
+
+def profile_stage(name, planner=None):
+  if active_profiler is None:
+    return no_profile_stage()
+  return active_profiler.stage(name, planner)
+
+def get_profiled_cursor(cursor):
+  if active_profiler is None:
+    return cursor
+  return ProfiledCursor(cursor, active_profiler)
+
+def print_profile(profiler):
+  ## seconds: self time, total: including nested stages
+  print("{:<24} {:<28} {:>6} {:>10} {:>10} {:>8} {:>10}".format("stage", "planner", "calls", "seconds", "total",
+    "queries", "rows"))
+  totals = profiler.get_stage_totals()
+  for (name, total) in totals.items():
+    print("{:<24} {:<28} {:>6} {:>10.4f} {:>10.4f} {:>8} {:>10}".format(name, "(all)", total["calls"],
+      total["seconds"], total["total_seconds"], total["queries"], total["rows"]))
+    for ((entry_name, planner), entry) in profiler.entries.items():
+      if entry_name == name and planner is not None:
+        print("{:<24} {:<28} {:>6} {:>10.4f} {:>10.4f} {:>8} {:>10}".format("", planner, entry["calls"],
+          entry["seconds"], entry["total_seconds"], entry["queries"], entry["rows"]))
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+
+from src.database_info import to_json_serializable
+
+## Bump whenever the content of cached results changes
+kResultCacheVersion = 2
+
+## Number of bytes hashed at the beginning and the end of a database file.
+## The SQLite header (including its file change counter) and the most
+## recently appended pages are covered without reading multi-GB files.
+kFingerprintChunkSize = 1 << 20
+
+def get_database_fingerprint(database_filepath):
+  stat = os.stat(database_filepath)
+  content_hash = hashlib.sha256()
+  with open(database_filepath, 'rb') as database_file:
+    content_hash.update(database_file.read(kFingerprintChunkSize))
+    if stat.st_size > kFingerprintChunkSize:
+      database_file.seek(-min(kFingerprintChunkSize, stat.st_size - kFingerprintChunkSize), os.SEEK_END)
+      content_hash.update(database_file.read())
+  return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": content_hash.hexdigest()}
+
+def get_statistics_config(info, config):
+  ## All parameters which influence the extracted per-planner curves. Styling
+  ## options (fonts, legend, title, ...) are deliberately not part of it.
+  return {
+      'resolution': info['resolution'],
+      'ci_left': info['ci_left'],
+      'ci_right': info['ci_right'],
+      'max_cost': info['max_cost'],
+      'max_time': config['max_time'],
+      'min_time': config['min_time'],
+      'ignore_planner': config['ignore_planner'],
+      'include_planner': config.get('include_planner'),
+      'experiment': config.get('experiment'),
+      'ignore_non_optimal_planner': config['ignore_non_optimal_planner'],
+      'time_grid': config['time_grid'],
+      'max_points': config['max_points'],
+      'ci_method': info['ci_method'],
+      'bootstrap_samples': info['bootstrap_samples'],
+      'bootstrap_confidence': info['bootstrap_confidence'],
+      'bootstrap_seed': info['bootstrap_seed']
+  }
+
+def get_result_cache_key(database_filepath, statistics_config):
+  key = {
+      'version': kResultCacheVersion,
+      'database': get_database_fingerprint(database_filepath),
+      'statistics': statistics_config
+  }
+  return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+class ResultCache:
+  ## Directory of JSON files, one per (database, statistics config), with
+  ## least-recently-used eviction once the total size exceeds max_size bytes.
+  ## The modification time of a file marks its last use.
+
+  def __init__(self, directory, max_size):
+    self.directory = directory
+    self.max_size = max_size
+    os.makedirs(directory, exist_ok=True)
+
+  def get_filepath(self, key):
+    return os.path.join(self.directory, key + ".json")
+
+  def get(self, key):
+    filepath = self.get_filepath(key)
+    try:
+      with open(filepath, 'r') as jsonfile:
+        result = json.load(jsonfile)
+    except (OSError, ValueError):
+      return None
+    os.utime(filepath)
+    return result
+
+  def put(self, key, result):
+    filepath = self.get_filepath(key)
+    tmp_filepath = "{}.{}.tmp".format(filepath, os.getpid())
+    with open(tmp_filepath, 'w') as jsonfile:
+      json.dump(result, jsonfile, default=to_json_serializable)
+    os.replace(tmp_filepath, filepath)
+    self.evict()
+
+  def evict(self):
+    entries = []
+    for name in os.listdir(self.directory):
+      if not name.endswith(".json"):
+        continue
+      try:
+        stat = os.stat(os.path.join(self.directory, name))
+      except OSError:
+        continue
+      entries.append((stat.st_mtime_ns, stat.st_size, name))
+    entries.sort()
+
+    total_size = sum(entry[1] for entry in entries)
+    for (mtime, size, name) in entries:
+      if total_size <= self.max_size:
+        break
+      try:
+        os.remove(os.path.join(self.directory, name))
+      except OSError:
+        pass
+      total_size -= size
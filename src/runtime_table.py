@@ -0,0 +1,259 @@
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from src.database_info import *
+
+############################################################
+### Runtime tables (table command)
+###
+### Mean and standard deviation of the run time and the
+### success rate of every (experiment, planner) pair are
+### computed from one grouped query over the runs of a
+### database, which returns the count, mean and sum of squared
+### deviations from the mean of the run times. For optimizing planners, which use up the time
+### limit, the run time is the time of the first solution
+### (from the progress entries, the time limit if there is
+### none). Database files are read in parallel, and results
+### of experiments with the same name are pooled with
+### combine_planner_data.
+############################################################
+
+def get_runtime_groups_from_database(cursor):
+  ## (experiment name, planner id, planner name, runs, mean and sum of
+  ## squared deviations from the mean of the run times, exact solutions,
+  ## time limit, progress entries, progress entries with best_cost, mean and
+  ## sum of squared deviations of the first solution times) per (experiment,
+  ## planner). Deviations are summed around the mean of each group (from a
+  ## second aggregate over the same runs), which does not cancel like the
+  ## difference of the mean square and the squared mean.
+  first_solution_time = "NULL"
+  progress_columns = "NULL AS progress_rows, NULL AS cost_rows"
+  progress_join = ""
+  if has_best_cost(cursor):
+    first_solution_time = "COALESCE(progress_runs.first_solution_time, experiments.timelimit)"
+    progress_columns = "COALESCE(progress_runs.progress_rows, 0) AS progress_rows, \
+        COALESCE(progress_runs.cost_rows, 0) AS cost_rows"
+    progress_join = " LEFT JOIN (SELECT runid, COUNT(*) AS progress_rows, COUNT(best_cost) AS cost_rows, \
+        MIN(CASE WHEN best_cost IS NOT NULL THEN time END) AS first_solution_time \
+        FROM {} GROUP BY runid) AS progress_runs ON progress_runs.runid = runs.id".format('progress')
+  return cursor.execute("WITH run_times AS (SELECT runs.experimentid, runs.plannerid, runs.time, runs.status, \
+        experiments.timelimit, {} AS first_solution_time, {} \
+        FROM {} JOIN experiments ON experiments.id = runs.experimentid{}), \
+      group_means AS (SELECT experimentid, plannerid, AVG(time) AS time_mean, \
+        AVG(first_solution_time) AS first_solution_time_mean FROM run_times GROUP BY experimentid, plannerid) \
+      SELECT experiments.name, run_times.plannerid, plannerConfigs.name, COUNT(*), AVG(run_times.time), \
+        SUM((run_times.time - group_means.time_mean) * (run_times.time - group_means.time_mean)), \
+        SUM(run_times.status = {}), MAX(run_times.timelimit), SUM(run_times.progress_rows), SUM(run_times.cost_rows), \
+        AVG(run_times.first_solution_time), \
+        SUM((run_times.first_solution_time - group_means.first_solution_time_mean) \
+          * (run_times.first_solution_time - group_means.first_solution_time_mean)) \
+      FROM run_times JOIN group_means ON group_means.experimentid = run_times.experimentid \
+        AND group_means.plannerid = run_times.plannerid \
+      JOIN plannerConfigs ON plannerConfigs.id = run_times.plannerid \
+      JOIN experiments ON experiments.id = run_times.experimentid \
+      GROUP BY run_times.experimentid, run_times.plannerid \
+      ORDER BY run_times.experimentid, run_times.plannerid".format(first_solution_time, progress_columns, 'runs',
+        progress_join, kStatusExactSolution)).fetchall()
+
+def get_runtime_statistics(group):
+  ## Planner data (as pooled by combine_planner_data) of a runtime group
+  (planner_id, planner_name, run_count, time_mean, time_square_deviations, solved_count, time_limit, progress_rows,
+      cost_rows, first_solution_time_mean, first_solution_time_square_deviations) = group[1:]
+  summary = PlannerSummary(planner_id, planner_name, run_count, solved_count, progress_rows, cost_rows, time_limit)
+  if summary.is_optimal():
+    (time_mean, time_square_deviations) = (first_solution_time_mean, first_solution_time_square_deviations)
+  ## Population standard deviation
+  time_std = np.sqrt(time_square_deviations / run_count)
+  return {'time_mean': time_mean, 'time_std': time_std, 'success': 100.0 * solved_count / run_count,
+      'time_limit': time_limit, 'best_planner': False, 'number_runs': run_count}
+
+def is_planner_in_table(planner_name, config):
+  if config['include_planner'] is not None and not re.search(config['include_planner'], planner_name):
+    return False
+  return config['ignore_planner'] is None or planner_name not in config['ignore_planner']
+
+def get_runtime_data_from_database_file(database_filepath, config):
+  ## Planner data of each experiment (by name) of a database file
+  con = connect_database(database_filepath)
+  try:
+    groups = get_runtime_groups_from_database(con.cursor())
+  finally:
+    con.close()
+
+  experiments = {}
+  for group in groups:
+    (experiment_name, planner_name) = (group[0], group[2])
+    if not is_planner_in_table(planner_name, config):
+      continue
+    if config['ignore_ending_name']:
+      experiment_name = experiment_name.rsplit('_', 1)[0]
+    planner_data = {planner_name: get_runtime_statistics(group)}
+    experiments[experiment_name] = combine_planner_data(experiments.get(experiment_name), planner_data)
+  return experiments
+
+def get_runtime_data_from_databases(database_filepaths, config):
+  ## Planner data of all experiments, pooled over files in input order
+  if config['jobs'] > 1 and len(database_filepaths) > 1:
+    with ProcessPoolExecutor(max_workers=config['jobs']) as executor:
+      results = list(executor.map(get_runtime_data_from_database_file, database_filepaths, repeat(config)))
+  else:
+    results = [get_runtime_data_from_database_file(database_filepath, config) for database_filepath in database_filepaths]
+
+  data = {"info": {"timelimit": 0, "run_count": 0}, "experiments": {}}
+  for result in results:
+    for (experiment_name, planner_data) in result.items():
+      data["experiments"][experiment_name] = combine_planner_data(data["experiments"].get(experiment_name), planner_data)
+  for planner_data in data["experiments"].values():
+    set_best_planner(planner_data)
+    for planner in planner_data.values():
+      data["info"]["timelimit"] = max(data["info"]["timelimit"], planner["time_limit"])
+      data["info"]["run_count"] = max(data["info"]["run_count"], planner["number_runs"])
+  return data
+
+def get_cell_entry(data, experiment, planner, config):
+  decimals = int(config['decimals'])
+  planner_data = data['experiments'][experiment][planner]
+  time = min(planner_data['time_mean'], planner_data['time_limit'])
+
+  cell_entry = "$"
+  if planner_data['best_planner']:
+    cell_entry += "\\textbf{%.*f}"%(decimals, time)
+  else:
+    cell_entry += "%.*f"%(decimals, time)
+  if not config['hide_variance']:
+    cell_entry += "\\color{gray}{\\pm %.*f}"%(decimals, planner_data['time_std'])
+  cell_entry += "$"
+  return cell_entry
+
+def get_runtime_table_tex(data, config):
+  ############################################################
+  ## Map planner to experiments
+  ############################################################
+  planner_map = {}
+  for experiment in data['experiments']:
+    for planner in data['experiments'][experiment]:
+      planner_map.setdefault(planner, []).append(experiment)
+
+  if config['reverse']:
+    longest_name = get_longest_name_from_planners(planner_map)
+    columns = list(planner_map)
+  else:
+    longest_name = get_longest_name_from_experiments(data['experiments'])
+    columns = list(data['experiments'])
+  n_columns = len(columns)
+
+  s = "\\documentclass{article}\n"
+  s += "\\usepackage{tabularx}\n"
+  s += "\\usepackage{rotating}\n"
+  s += "\\usepackage{makecell}\n"
+  s += "\\usepackage{xcolor}\n"
+  s += "\\usepackage[text={174mm,258mm}, papersize={210mm,297mm}, columnsep=12pt, headsep=21pt, centering]{geometry}\n"
+  s += "\\begin{document}\n\n"
+
+  s += "\\newcolumntype{V}{>{\\centering\\arraybackslash}m{.033\\linewidth}}\n"
+  s += "\\newcolumntype{Z}{>{\\raggedleft\\arraybackslash}m{.01\\linewidth}}\n"
+  s += "\\newcolumntype{+}{!{\\vrule width 1.2pt}}\n"
+
+  s += "\\begin{table*}[t]\n"
+  s += "\\centering\n"
+  s += "\\renewcommand{\\cellrotangle}{90}\n"
+  s += "\\renewcommand\\theadfont{\\bfseries}\n"
+  s += "\\settowidth{\\rotheadsize}{\\theadfont " + str(longest_name) + "}\n"
+  s += "\\footnotesize\\centering\n"
+  s += "\\renewcommand{\\arraystretch}{1.2}\n"
+  s += "\\setlength\\tabcolsep{3pt}\n"
+
+  format_str = "|ZX+" + n_columns * "X|"
+  s += "\\begin{tabularx}{\\linewidth}{"+format_str+"}"
+  s += "\\hline\n"
+  s += "& & \\multicolumn{"+str(n_columns)
+  s += "}{>{\\centering}p{.8\\textwidth}|}{List of Scenarios}\\\\"
+  s += "\\cline{3-"+str(2+n_columns)+"}\n"
+
+  ############################################################
+  ## Create X-axis
+  ############################################################
+  if config['reverse']:
+    s += "\\multicolumn{2}{|>{\\centering}p{2.5cm}+}{\\rothead{Scenario}}\n"
+    for planner in columns:
+      s += " & \\rothead{%s} \n"%(get_label(planner).replace("#","\\#"))
+  else:
+    s += "\\multicolumn{2}{|>{\\centering}p{2.5cm}+}{\\rothead{Motion Planner}}\n"
+    for experiment in columns:
+      s += " & \\rothead{%s} \n"%(get_experiment_label(experiment))
+  s += " \\\\ \\hline\n"
+
+  ############################################################
+  ## One row per experiment (reverse) or planner
+  ############################################################
+  if config['reverse']:
+    rows = [(get_experiment_label(experiment), [(experiment, planner) for planner in columns])
+        for experiment in data['experiments']]
+  else:
+    rows = [(get_label(planner).replace("#","\\#"), [(experiment, planner) for experiment in columns])
+        for planner in planner_map]
+  for (ctr, (label, cells)) in enumerate(rows):
+    entries = []
+    for (experiment, planner) in cells:
+      if experiment in planner_map[planner]:
+        entries.append(get_cell_entry(data, experiment, planner, config))
+      else:
+        entries.append("$-$")
+    s += str(ctr+1) + " & \\mbox{" + str(label) + "} & " + " & ".join(entries) + " \\\\ \n"
+
+  s += "\\hline\n"
+  s += "\\end{tabularx}\n"
+  s += "\\caption{Runtime (s) of %d runs with %s planning algorithms on %s scenarios \
+with cut-off time limit of %.2fs. \
+Entry '$-$' means that planner does not support this planning scenario.}\n" \
+      %(data['info']['run_count'], len(planner_map), len(data['experiments']), data['info']['timelimit'])
+  s += "\\end{table*}\n"
+  s += "\\end{document}\n"
+  return s
+
+def compile_tex(tex_filepath, verbosity):
+  ## Compile a tex file with pdflatex next to it and remove the auxiliary
+  ## files. Returns False if pdflatex is not installed or fails.
+  if shutil.which("pdflatex") is None:
+    if verbosity > 0:
+      print("pdflatex is not installed, only wrote {}.".format(tex_filepath))
+    return False
+  directory = os.path.dirname(os.path.abspath(tex_filepath))
+  output = None if verbosity > 1 else subprocess.DEVNULL
+  process = subprocess.run(["pdflatex", "-interaction=nonstopmode", "-output-directory", directory, tex_filepath],
+      stdout=output, stderr=output)
+  for extension in ['.aux', '.log']:
+    auxiliary_filepath = os.path.join(directory, os.path.splitext(os.path.basename(tex_filepath))[0] + extension)
+    if os.path.exists(auxiliary_filepath):
+      os.remove(auxiliary_filepath)
+  return process.returncode == 0
+
+def create_runtime_table_from_databases(database_filepaths, config):
+  data = get_runtime_data_from_databases(database_filepaths, config)
+  if len(data["experiments"]) == 0:
+    raise Exception("No runs in {}.".format(database_filepaths))
+
+  filename_without_extension = get_filename_from_database_filepaths(database_filepaths)
+  if config['output_file']:
+    tex_filepath = get_filename_from_database_filepaths_and_name(database_filepaths,
+        change_filename_extension(config['output_file'], ".tex"))
+  else:
+    tex_filepath = create_filename_with_extension(filename_without_extension, ".tex")
+  pdf_filepath = change_filename_extension(tex_filepath, ".pdf")
+
+  tmp_filepath = "{}.{}.tmp".format(tex_filepath, os.getpid())
+  with open(tmp_filepath, 'w') as texfile:
+    texfile.write(get_runtime_table_tex(data, config))
+  os.replace(tmp_filepath, tex_filepath)
+  if config['verbosity'] > 0:
+    print("Wrote tex file to {}".format(tex_filepath))
+
+  if compile_tex(tex_filepath, config['verbosity']):
+    if config['verbosity'] > 0:
+      print("Created pdf file {}".format(pdf_filepath))
+    if config['show']:
+      os.system("xdg-open %s" % pdf_filepath)
+  return data
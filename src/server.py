@@ -0,0 +1,277 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from src.database_info import *
+from src.database_to_graph import *
+
+############################################################
+### Local plotting server (serve command)
+###
+### A long-running process answers plot requests over HTTP on
+### localhost. Extracted results of database files and
+### rendered graphs are kept in one in-memory LRU cache of
+### bounded size. Results are keyed like the result cache
+### (database fingerprint and statistics config), rendered
+### graphs by the fingerprints of all requested files and
+### the full plot config, such that a repeated request is
+### answered without reading the databases or rendering.
+### matplotlib is imported and warmed up once at startup.
+###
+###   GET  /plot?database=a.db&format=png&argument=--max-cost&argument=40
+###   POST /plot {"databases": ["a.db"], "format": "png", "arguments": [...]}
+###   GET  /status
+############################################################
+
+kServerContentTypes = {
+    "pdf": "application/pdf",
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "json": "application/json"
+}
+
+## Estimated bytes of a Python object (dict entry, list item or scalar) in a
+## cached result, besides the data of NumPy arrays
+kResultObjectBytes = 64
+
+def get_result_size(value):
+  ## Estimated memory of an extracted result or a rendered graph
+  if isinstance(value, np.ndarray):
+    return value.nbytes + kResultObjectBytes
+  if isinstance(value, (bytes, str)):
+    return len(value) + kResultObjectBytes
+  if isinstance(value, dict):
+    return sum(get_result_size(key) + get_result_size(item) for (key, item) in value.items())
+  if isinstance(value, (list, tuple)):
+    return sum(get_result_size(item) for item in value) + kResultObjectBytes
+  return kResultObjectBytes
+
+class MemoryResultCache:
+  ## Thread-safe in-memory cache with the interface of ResultCache and
+  ## least-recently-used eviction once the estimated size of all entries
+  ## exceeds max_size bytes (larger entries are not kept). Entries are
+  ## shared and must not be modified.
+
+  def __init__(self, max_size):
+    self.max_size = max_size
+    self.entries = OrderedDict()
+    self.size = 0
+    self.hits = 0
+    self.misses = 0
+    self.lock = threading.Lock()
+
+  def get(self, key):
+    with self.lock:
+      entry = self.entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return None
+      self.entries.move_to_end(key)
+      self.hits += 1
+      return entry[0]
+
+  def put(self, key, result):
+    size = get_result_size(result)
+    with self.lock:
+      if key in self.entries:
+        self.size -= self.entries.pop(key)[1]
+      self.entries[key] = (result, size)
+      self.size += size
+      while self.size > self.max_size and len(self.entries) > 0:
+        (_, (_, evicted_size)) = self.entries.popitem(last=False)
+        self.size -= evicted_size
+
+  def get_status(self):
+    with self.lock:
+      return {"entries": len(self.entries), "size": self.size, "max_size": self.max_size,
+          "hits": self.hits, "misses": self.misses}
+
+class TrackedResultCache:
+  ## View of a shared cache which counts the misses of one request
+  def __init__(self, cache):
+    self.cache = cache
+    self.misses = 0
+
+  def get(self, key):
+    result = self.cache.get(key)
+    if result is None:
+      self.misses += 1
+    return result
+
+  def put(self, key, result):
+    self.cache.put(key, result)
+
+class PlotRequestError(Exception):
+  def __init__(self, status, message):
+    super().__init__(message)
+    self.status = status
+
+class PlotServer:
+  ## Answers plot requests. get_config creates the plot config of the plot
+  ## arguments of a request and raises ValueError for invalid arguments.
+
+  def __init__(self, get_config, cache_size, verbosity=0):
+    self.get_config = get_config
+    self.cache = MemoryResultCache(cache_size)
+    self.verbosity = verbosity
+    ## pyplot keeps global state and is not thread-safe
+    self.render_lock = threading.Lock()
+
+  def warm_up(self):
+    ## Import matplotlib and load its backend and fonts before the first request
+    with self.render_lock:
+      plt = get_pyplot()
+      fig = plt.figure()
+      fig.text(0.5, 0.5, "warm up")
+      fig.savefig(io.BytesIO(), format='png')
+      plt.close(fig)
+
+  def get_status(self):
+    return {"cache": self.cache.get_status()}
+
+  def get_response_key(self, database_filepaths, config, output_format, experiment_name):
+    key = {
+        'version': kResultCacheVersion,
+        'databases': [get_database_fingerprint(database_filepath) for database_filepath in database_filepaths],
+        'config': config,
+        'format': output_format,
+        'experiment': experiment_name
+    }
+    return "response_" + hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+  def get_experiments(self, database_filepaths, config, result_cache):
+    data = get_data_from_config(config)
+    results = [get_data_from_database_file(database_filepath, data["info"], config, result_cache)
+        for database_filepath in database_filepaths]
+    return merge_experiment_results(data, results)
+
+  def render(self, experiments, config, output_format, experiment_name):
+    if output_format == "json":
+      return json.dumps({"experiments": experiments}, default=to_json_serializable).encode()
+
+    if experiment_name is None:
+      if len(experiments) != 1:
+        raise PlotRequestError(400, "Select one of the experiments {} with the experiment parameter.".format(sorted(experiments.keys())))
+      experiment_name = next(iter(experiments))
+    if experiment_name not in experiments:
+      raise PlotRequestError(404, "No experiment {} in the databases.".format(experiment_name))
+
+    buffer = io.BytesIO()
+    with self.render_lock:
+      (fig, legend) = create_graph_figure(experiments[experiment_name], config)
+      try:
+        fig.savefig(buffer, **get_savefig_kwargs(config, output_format, legend))
+      finally:
+        get_pyplot().close(fig)
+    return buffer.getvalue()
+
+  def plot(self, request):
+    ## (content type, body, cache state) of a plot request with the
+    ## entries databases, format, experiment and arguments
+    database_filepaths = request.get("databases") or []
+    output_format = request.get("format") or "pdf"
+    experiment_name = request.get("experiment")
+    if len(database_filepaths) == 0:
+      raise PlotRequestError(400, "No database files requested.")
+    if output_format not in kServerContentTypes:
+      raise PlotRequestError(400, "Unknown format {} (one of {}).".format(output_format, sorted(kServerContentTypes.keys())))
+    for database_filepath in database_filepaths:
+      if not os.path.isfile(database_filepath):
+        raise PlotRequestError(404, "{} is not a file.".format(database_filepath))
+    try:
+      config = self.get_config(list(request.get("arguments") or []))
+    except ValueError as error:
+      raise PlotRequestError(400, str(error))
+
+    response_key = self.get_response_key(database_filepaths, config, output_format, experiment_name)
+    body = self.cache.get(response_key)
+    if body is not None:
+      return kServerContentTypes[output_format], body, "response"
+
+    result_cache = TrackedResultCache(self.cache)
+    experiments = self.get_experiments(database_filepaths, config, result_cache)
+    body = self.render(experiments, config, output_format, experiment_name)
+    self.cache.put(response_key, body)
+    return kServerContentTypes[output_format], body, "statistics" if result_cache.misses == 0 else "miss"
+
+class PlotRequestHandler(BaseHTTPRequestHandler):
+  server_version = "ompl_benchmark_plotter"
+
+  def do_GET(self):
+    url = urlparse(self.path)
+    if url.path == "/status":
+      self.send_body(200, kServerContentTypes["json"], json.dumps(self.server.plot_server.get_status()).encode())
+      return
+    query = parse_qs(url.query)
+    self.handle_plot(url.path, {
+        "databases": query.get("database"),
+        "format": query.get("format", [None])[0],
+        "experiment": query.get("experiment", [None])[0],
+        "arguments": query.get("argument")
+    })
+
+  def do_POST(self):
+    url = urlparse(self.path)
+    try:
+      request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+    except ValueError as error:
+      self.send_error_body(400, "Invalid JSON request ({}).".format(error))
+      return
+    if not isinstance(request, dict):
+      self.send_error_body(400, "The request must be a JSON object.")
+      return
+    self.handle_plot(url.path, request)
+
+  def handle_plot(self, path, request):
+    if path != "/plot":
+      self.send_error_body(404, "Unknown path {}.".format(path))
+      return
+    try:
+      (content_type, body, cache_state) = self.server.plot_server.plot(request)
+    except PlotRequestError as error:
+      self.send_error_body(error.status, str(error))
+      return
+    except Exception as error:
+      self.send_error_body(500, "Could not plot {} ({}).".format(request.get("databases"), error))
+      return
+    self.send_body(200, content_type, body, {"X-Cache": cache_state})
+
+  def send_body(self, status, content_type, body, headers=None):
+    self.send_response(status)
+    self.send_header("Content-Type", content_type)
+    self.send_header("Content-Length", str(len(body)))
+    for (name, value) in (headers or {}).items():
+      self.send_header(name, value)
+    self.end_headers()
+    self.wfile.write(body)
+
+  def send_error_body(self, status, message):
+    self.send_body(status, kServerContentTypes["json"], json.dumps({"error": message}).encode())
+
+  def log_message(self, format, *args):
+    if self.server.plot_server.verbosity > 1:
+      super().log_message(format, *args)
+
+def create_plot_http_server(plot_server, host, port):
+  ## HTTP server of the plot server (port 0 picks a free port)
+  httpd = ThreadingHTTPServer((host, port), PlotRequestHandler)
+  httpd.daemon_threads = True
+  httpd.plot_server = plot_server
+  return httpd
+
+def serve_plots(plot_server, host, port):
+  plot_server.warm_up()
+  httpd = create_plot_http_server(plot_server, host, port)
+  if plot_server.verbosity > 0:
+    print("Serving plots on http://{}:{}/plot (stop with Ctrl-C).".format(*httpd.server_address[:2]))
+  try:
+    httpd.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    httpd.server_close()
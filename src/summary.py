@@ -0,0 +1,239 @@
+import copy
+import json
+import os
+import sqlite3
+import numpy as np
+
+from src.database_info import *
+from src.database_to_graph import *
+
+## Bump whenever the layout of summary files changes
+kSummaryVersion = 1
+
+############################################################
+### Mergeable per-shard summaries
+###
+### A summary holds, for every experiment and planner, integer
+### counts on a fixed time grid: the number of runs, the number
+### of runs terminated (runs.time) and solved (first progress
+### entry with a best_cost) before each time sample, and a
+### histogram of the best cost of all runs at each time sample.
+### The (time, solution_length) pairs of solved runs are kept
+### as they are bounded by the number of runs. Summaries of
+### shards with the same grid are merged by adding counts, so
+### success curves are exact and cost quantiles are accurate
+### up to the histogram bin width (max_cost / bins).
+############################################################
+
+def get_summary_grid(data, bins):
+  return {
+      "min_time": data["info"]["min_time"]["optimization"],
+      "max_time": data["info"]["max_time"]["optimization"],
+      "resolution": data["info"]["resolution"],
+      "max_cost": data["info"]["max_cost"],
+      "bins": bins
+  }
+
+def get_summary_times(grid):
+  return np.logspace(np.log10(grid["min_time"]), np.log10(grid["max_time"]), grid["resolution"])
+
+def get_cost_histogram(costs, max_cost, bins):
+  ## (times x bins+1) counts of the cost matrix columns. Bin i < bins covers
+  ## [i, i+1) * max_cost / bins, the last bin holds all costs >= max_cost
+  ## (including runs without a solution). NaN entries are not counted.
+  histogram = np.zeros((costs.shape[1], bins + 1), dtype=np.int64)
+  valid = ~np.isnan(costs)
+  bin_index = np.clip(np.floor(costs[valid] / max_cost * bins), 0, bins).astype(np.int64)
+  time_index = np.nonzero(valid)[1]
+  np.add.at(histogram, (time_index, bin_index), 1)
+  return histogram
+
+def get_quantiles_from_cost_histogram(histogram, max_cost, quantiles):
+  ## Same definitions as get_quantiles_from_cost_matrix, with each cost
+  ## replaced by the center of its bin (or max_cost for the last bin)
+  bins = histogram.shape[1] - 1
+  values = np.append((np.arange(bins) + 0.5) * max_cost / bins, max_cost)
+  counts = np.sum(histogram, axis=1)
+  cumulative = np.cumsum(histogram, axis=1)
+  n = np.maximum(counts, 1)
+
+  def get_value_at_rank(rank):
+    ## Value of the rank-th (0-based) smallest cost of each time sample
+    return values[np.argmax(cumulative > rank[:, np.newaxis], axis=1)]
+
+  medians = (get_value_at_rank((n - 1) // 2) + get_value_at_rank(n // 2)) / 2
+  percentiles = [get_value_at_rank(np.around((n - 1) * (q / 100)).astype(np.int64)) for q in quantiles]
+  return counts, medians, percentiles
+
+def get_planner_summary(cursor, planner_runs, times, grid, chunk_size):
+  run_times = planner_runs.get_run_times()
+  summary = {
+      "run_count": len(run_times),
+      "has_progress": False,
+      "run_success_counts": np.searchsorted(run_times, times, side='left'),
+      "solution_counts": np.zeros(len(times), dtype=np.int64),
+      "cost_histogram": np.zeros((len(times), grid["bins"] + 1), dtype=np.int64),
+      "solved_runs": np.empty((0, 2))
+  }
+  if has_solution_length(cursor):
+    solved_runs = planner_runs.get_solved_runs()
+    summary["solved_runs"] = np.array(solved_runs, dtype=float).reshape(-1, 2)
+  if has_best_cost(cursor):
+    runs = planner_runs.ids
+    costs = get_cost_matrix_from_database(cursor, runs, times, grid["max_cost"], chunk_size)
+    solution_times = get_first_solution_times_from_database(cursor, runs)
+    summary["has_progress"] = True
+    summary["solution_counts"] = np.searchsorted(solution_times, times, side='right')
+    summary["cost_histogram"] = get_cost_histogram(costs, grid["max_cost"], grid["bins"])
+  return summary
+
+def get_summary_from_database_file(database_filepath, info, config, bins):
+  if not os.path.isfile(database_filepath):
+    raise Exception("{} is not an existing file.".format(database_filepath))
+
+  columnar_database = load_columnar_database(database_filepath)
+  if columnar_database is not None:
+    con = columnar_database
+    cursor = columnar_database
+  else:
+    con = connect_database(database_filepath, config['in_memory_size'])
+    cursor = con.cursor()
+
+  try:
+    chunk_size = get_progress_chunk_size(config["memory_budget"])
+    summary = {"grid": None, "experiments": {}}
+    for (experiment_name, experiment_ids) in get_experiment_ids_by_name(cursor).items():
+      data = {"info": copy.deepcopy(info), "planners": {}}
+      get_maxtime_from_database_or_config(cursor, config, data, experiment_ids)
+      get_mintime_from_database_or_config(cursor, config, data, experiment_ids)
+      grid = get_summary_grid(data, bins)
+      if summary["grid"] is None:
+        summary["grid"] = grid
+      elif summary["grid"] != grid:
+        raise Exception("Experiments in {} have different time limits. Use --min-time and --max-time to summarize them on a common grid.".format(database_filepath))
+
+      times = get_summary_times(grid)
+      planners = {}
+      runs_by_planner = get_runs_by_planner_from_database(cursor, experiment_ids)
+      for planner in get_selected_planners_from_database(cursor, config, experiment_ids):
+        planners[planner[1]] = get_planner_summary(cursor, runs_by_planner[planner[0]], times, grid, chunk_size)
+        if config['verbosity'] > 1:
+          print("Summarized planner {} ({} runs) of experiment {}.".format(planner[1], planners[planner[1]]["run_count"], experiment_name))
+      summary["experiments"][experiment_name] = planners
+  finally:
+    con.close()
+  return summary
+
+def merge_summaries(summaries):
+  merged = {"grid": None, "experiments": {}}
+  for summary in summaries:
+    if merged["grid"] is None:
+      merged["grid"] = summary["grid"]
+    elif summary["grid"] is not None and summary["grid"] != merged["grid"]:
+      raise Exception("Cannot merge summaries with different grids: {} and {}.".format(merged["grid"], summary["grid"]))
+    for (experiment_name, planners) in summary["experiments"].items():
+      merged_planners = merged["experiments"].setdefault(experiment_name, {})
+      for (planner_name, planner) in planners.items():
+        if planner_name not in merged_planners:
+          merged_planners[planner_name] = copy.deepcopy(planner)
+          continue
+        merged_planner = merged_planners[planner_name]
+        merged_planner["run_count"] += planner["run_count"]
+        merged_planner["has_progress"] = merged_planner["has_progress"] or planner["has_progress"]
+        for key in ["run_success_counts", "solution_counts", "cost_histogram"]:
+          merged_planner[key] = merged_planner[key] + planner[key]
+        merged_planner["solved_runs"] = np.concatenate([merged_planner["solved_runs"], planner["solved_runs"]])
+  return merged
+
+def save_summary(filepath, summary):
+  meta = {"version": kSummaryVersion, "grid": summary["grid"], "entries": []}
+  arrays = {}
+  for (experiment_name, planners) in summary["experiments"].items():
+    for (planner_name, planner) in planners.items():
+      index = len(meta["entries"])
+      meta["entries"].append({"experiment": experiment_name, "planner": planner_name,
+        "run_count": int(planner["run_count"]), "has_progress": bool(planner["has_progress"])})
+      for key in ["run_success_counts", "solution_counts", "cost_histogram", "solved_runs"]:
+        arrays["{}_{}".format(key, index)] = planner[key]
+  tmp_filepath = "{}.{}.tmp.npz".format(filepath, os.getpid())
+  np.savez_compressed(tmp_filepath, meta=np.array(json.dumps(meta)), **arrays)
+  os.replace(tmp_filepath, filepath)
+
+def load_summary(filepath):
+  with np.load(filepath) as arrays:
+    meta = json.loads(str(arrays["meta"]))
+    if meta["version"] != kSummaryVersion:
+      raise Exception("{} has unsupported summary version {}.".format(filepath, meta["version"]))
+    summary = {"grid": meta["grid"], "experiments": {}}
+    for (index, entry) in enumerate(meta["entries"]):
+      planner = {"run_count": entry["run_count"], "has_progress": entry["has_progress"]}
+      for key in ["run_success_counts", "solution_counts", "cost_histogram", "solved_runs"]:
+        planner[key] = arrays["{}_{}".format(key, index)]
+      summary["experiments"].setdefault(entry["experiment"], {})[entry["planner"]] = planner
+  return summary
+
+def get_planner_data_from_summary(planner, grid, ci_left, ci_right):
+  ## Planner curves as computed by get_json_from_database
+  run_count = planner["run_count"]
+  max_time = grid["max_time"]
+  max_cost = grid["max_cost"]
+  planner_data = {"success": planner["run_success_counts"] / run_count * 100}
+  if planner["has_progress"]:
+    counts, medians, (quantile5, quantile95) = get_quantiles_from_cost_histogram(
+        planner["cost_histogram"], max_cost, [ci_left, ci_right])
+    improvement = bool(np.any(counts > 0))
+    planner_data["optimization_success"] = improvement
+    if improvement:
+      no_data = counts == 0
+      medians[no_data] = max_cost
+      quantile5[no_data] = max_cost
+      quantile95[no_data] = max_cost
+      planner_data["median"] = medians
+      planner_data["quantile5"] = quantile5
+      planner_data["quantile95"] = quantile95
+      planner_data["success"] = (planner["solution_counts"] / run_count) * 100.0
+      return planner_data
+  else:
+    planner_data["optimization_success"] = False
+
+  point_data = None
+  solved_runs = planner["solved_runs"]
+  if len(solved_runs) > 0:
+    point_data = calculate_points(solved_runs[:, :1], solved_runs[:, 1:], ci_left, ci_right)
+  if point_data is None:
+    point_data = max_point(max_time, max_cost)
+  planner_data["point"] = point_data
+  return planner_data
+
+def get_experiments_from_summary(summary, data):
+  ## Experiment data (as created by plot_graph_from_databases) of a summary
+  grid = summary["grid"]
+  experiments = {}
+  for (experiment_name, planners) in summary["experiments"].items():
+    experiment_data = copy.deepcopy(data)
+    experiment_data["info"]["experiment"] = experiment_name
+    experiment_data["info"]["resolution"] = grid["resolution"]
+    experiment_data["info"]["max_cost"] = grid["max_cost"]
+    experiment_data["info"]["max_time"] = {"success": grid["max_time"], "optimization": grid["max_time"]}
+    experiment_data["info"]["min_time"] = {"success": grid["min_time"], "optimization": grid["min_time"]}
+    for (planner_name, planner) in planners.items():
+      if planner["run_count"] > 0:
+        experiment_data["planners"][planner_name] = get_planner_data_from_summary(planner, grid,
+            data["info"]["ci_left"], data["info"]["ci_right"])
+    experiments[experiment_name] = experiment_data
+  return experiments
+
+def summarize_databases(database_filepaths, summary_filepath, config, bins):
+  data = get_data_from_config(config)
+  summaries = [get_summary_from_database_file(database_filepath, data["info"], config, bins)
+      for database_filepath in database_filepaths]
+  save_summary(summary_filepath, merge_summaries(summaries))
+  if config['verbosity'] > 0:
+    print("Wrote summary of {} files to {}.".format(len(database_filepaths), summary_filepath))
+
+def plot_graph_from_summaries(summary_filepaths, config):
+  data = get_data_from_config(config)
+  summary = merge_summaries([load_summary(summary_filepath) for summary_filepath in summary_filepaths])
+  if config['verbosity'] > 0:
+    print("Merged {} summaries.".format(len(summary_filepaths)))
+  plot_experiments(get_experiments_from_summary(summary, data), summary_filepaths, config)
@@ -0,0 +1,318 @@
+import copy
+import os
+import sqlite3
+import time
+import numpy as np
+
+from src.database_info import *
+from src.database_to_graph import *
+
+############################################################
+### Incremental plotting of growing databases (--watch)
+###
+### A running benchmark appends runs and progress entries to
+### its database. Each poll reads, inside one read transaction
+### (a consistent snapshot, also next to a writer in WAL mode),
+### only the runs with an id and the progress entries with a
+### rowid above the high-water marks of the previous poll. New
+### runs add rows to the aggregates of their planner, new
+### progress entries are evaluated on the time grid and folded
+### into the cost vectors of their runs, where later entries
+### take precedence wherever they are active (as when progress
+### is streamed in chunks). Graphs are only re-rendered after a
+### poll which changed an aggregate.
+############################################################
+
+## Seconds to wait for a lock of the writing process before a poll is
+## given up and retried at the next interval
+kWatchLockTimeout = 1.0
+
+## Rows of the runs query
+kRunColumns = ["id", "experimentid", "plannerid", "time", "status", "solution_length"]
+kExactSolutionStatus = 6
+
+class PlannerAggregate:
+  ## Statistics of the runs of one planner in one experiment, with one
+  ## row per run in the order in which the runs were read
+  def __init__(self, time_count):
+    self.run_times = np.empty(0)
+    self.solved_runs = np.empty((0, 2))
+    self.costs = np.empty((0, time_count))
+    self.first_solution_times = np.empty(0)
+
+  def get_run_count(self):
+    return len(self.run_times)
+
+  def add_runs(self, runs):
+    ## runs: rows with the columns kRunColumns
+    time_count = self.costs.shape[1]
+    self.run_times = np.append(self.run_times, runs[:, 3])
+    solved = runs[:, 4] == kExactSolutionStatus
+    self.solved_runs = np.concatenate([self.solved_runs, runs[solved][:, [3, 5]]])
+    self.costs = np.concatenate([self.costs, np.full((len(runs), time_count), np.nan)])
+    self.first_solution_times = np.append(self.first_solution_times, np.full(len(runs), np.inf))
+
+  def add_progress(self, progress, run_rows, times, max_cost):
+    ## progress: (runid, time, best_cost) rows sorted by (runid, time),
+    ## run_rows: row of the run of each progress entry
+    costs = get_cost_matrix_from_progress(progress, times, max_cost)
+    rows = run_rows[np.unique(progress[:, 0], return_index=True)[1]]
+    self.costs[rows] = np.where(np.isnan(costs), self.costs[rows], costs)
+
+    solutions = ~np.isnan(progress[:, 2])
+    np.minimum.at(self.first_solution_times, run_rows[solutions], progress[solutions, 1])
+
+  def get_planner_data(self, info, times, best_cost, solution_length, bootstrap=None):
+    ## Same curves as get_json_from_database with the logspace time grid
+    number_runs = self.get_run_count()
+    planner_data = {
+        "success": get_success_from_sorted_times(np.sort(self.run_times), number_runs, times, inclusive=False),
+        "optimization_success": False
+        }
+    if bootstrap is not None:
+      add_success_interval(planner_data, self.run_times, number_runs, times, bootstrap, inclusive=False)
+    if best_cost:
+      results = get_cost_results_from_cost_matrix(self.costs, info["max_cost"], info["ci_left"], info["ci_right"], bootstrap)
+      planner_data["optimization_success"] = results[0]
+      if results[0]:
+        solution_times = np.sort(self.first_solution_times[np.isfinite(self.first_solution_times)])
+        planner_data["median"] = results[1]
+        planner_data["quantile5"] = results[2]
+        planner_data["quantile95"] = results[3]
+        planner_data["success"] = get_success_from_sorted_times(solution_times, number_runs, times)
+        if bootstrap is not None:
+          add_success_interval(planner_data, solution_times, number_runs, times, bootstrap, inclusive=True)
+        return planner_data
+
+    point_data = None
+    if solution_length and len(self.solved_runs) > 0:
+      point_data = calculate_points(self.solved_runs[:, 0], self.solved_runs[:, 1], info["ci_left"], info["ci_right"], bootstrap)
+    if point_data is None:
+      point_data = max_point(info["max_time"]["optimization"], info["max_cost"])
+    planner_data["point"] = point_data
+    return planner_data
+
+class WatchedDatabase:
+  ## Aggregates of a database file which is still written, updated by poll
+  def __init__(self, database_filepath, info, config):
+    self.filepath = database_filepath
+    self.info = info
+    self.config = config
+    self.connection = None
+    self.result = {"experiments": {}}
+    self.reset()
+
+  def reset(self):
+    self.last_run_id = 0
+    self.last_progress_rowid = 0
+    ## Progress entries of runs which are not read yet
+    self.pending_progress = np.empty((0, 3))
+    ## Sorted ids of all read runs, with their aggregate and row
+    self.run_ids = np.empty(0, dtype=np.int64)
+    self.run_aggregates = np.empty(0, dtype=np.intp)
+    self.run_rows = np.empty(0, dtype=np.intp)
+    self.aggregates = []
+    self.aggregate_experiments = []
+    self.aggregate_index = {}
+    ## Experiment name -> {"experiment_ids", "data", "times"}
+    self.experiments = {}
+    self.changed = True
+
+  def close(self):
+    if self.connection is not None:
+      self.connection.close()
+      self.connection = None
+
+  def poll(self):
+    ## Read all new rows. Returns True if the result has changed.
+    if self.connection is None:
+      self.connection = connect_database(self.filepath, immutable=False, timeout=kWatchLockTimeout)
+    cursor = self.connection.cursor()
+    cursor.execute("BEGIN")
+    ## The writer may have created tables or columns since the last poll
+    invalidate_database_schema(cursor)
+    try:
+      self.read_new_rows(cursor)
+      if not self.changed:
+        return False
+      self.result = self.get_result(cursor)
+      self.changed = False
+      return True
+    finally:
+      self.connection.rollback()
+
+  def read_new_rows(self, cursor):
+    schema = get_schema_from_database(cursor)
+    if not (schema.has_table('experiments') and schema.has_table('runs')):
+      return
+    if self.update_experiments(cursor):
+      ## The time grid has changed, aggregate all runs again
+      self.reset()
+      self.update_experiments(cursor)
+    self.read_new_runs(cursor)
+    if schema.has_column('progress', 'best_cost'):
+      self.read_new_progress(cursor)
+
+  def update_experiments(self, cursor):
+    ## Returns True if the time grid of a known experiment has changed
+    for (experiment_name, experiment_ids) in get_experiment_ids_by_name(cursor).items():
+      data = {"info": copy.deepcopy(self.info), "planners": {}}
+      get_maxtime_from_database_or_config(cursor, self.config, data, experiment_ids)
+      get_mintime_from_database_or_config(cursor, self.config, data, experiment_ids)
+      experiment = self.experiments.get(experiment_name)
+      if experiment is None:
+        times = create_time_space(data)
+        self.experiments[experiment_name] = {"experiment_ids": experiment_ids, "data": data, "times": times}
+        self.changed = True
+      elif experiment["data"]["info"]["min_time"] != data["info"]["min_time"] or \
+          experiment["data"]["info"]["max_time"] != data["info"]["max_time"]:
+        return True
+      else:
+        experiment["experiment_ids"] = experiment_ids
+    return False
+
+  def get_aggregate_index(self, experiment_name, planner_id):
+    key = (experiment_name, planner_id)
+    index = self.aggregate_index.get(key)
+    if index is None:
+      index = len(self.aggregates)
+      self.aggregates.append(PlannerAggregate(len(self.experiments[experiment_name]["times"])))
+      self.aggregate_experiments.append(experiment_name)
+      self.aggregate_index[key] = index
+    return index
+
+  def read_new_runs(self, cursor):
+    columns = kRunColumns if has_solution_length(cursor) else kRunColumns[:-1] + ["NULL"]
+    runs = np.array(cursor.execute("SELECT {} FROM {} WHERE id > ? ORDER BY id".format(', '.join(columns), 'runs'),
+      (self.last_run_id,)).fetchall(), dtype=float).reshape(-1, len(columns))
+
+    ## Runs of experiments which are not committed yet are read again later
+    experiment_names = {}
+    for (experiment_name, experiment) in self.experiments.items():
+      for experiment_id in experiment["experiment_ids"]:
+        experiment_names[experiment_id] = experiment_name
+    unknown = np.flatnonzero(~np.isin(runs[:, 1], list(experiment_names.keys())))
+    if len(unknown) > 0:
+      runs = runs[:unknown[0]]
+    if len(runs) == 0:
+      return
+
+    aggregates = np.empty(len(runs), dtype=np.intp)
+    rows = np.empty(len(runs), dtype=np.intp)
+    for (experiment_id, planner_id) in np.unique(runs[:, 1:3], axis=0):
+      mask = (runs[:, 1] == experiment_id) & (runs[:, 2] == planner_id)
+      index = self.get_aggregate_index(experiment_names[experiment_id], int(planner_id))
+      aggregate = self.aggregates[index]
+      aggregates[mask] = index
+      rows[mask] = aggregate.get_run_count() + np.arange(np.count_nonzero(mask))
+      aggregate.add_runs(runs[mask])
+
+    self.run_ids = np.append(self.run_ids, runs[:, 0].astype(np.int64))
+    self.run_aggregates = np.append(self.run_aggregates, aggregates)
+    self.run_rows = np.append(self.run_rows, rows)
+    self.last_run_id = int(runs[-1, 0])
+    self.changed = True
+
+  def read_new_progress(self, cursor):
+    query = cursor.execute("SELECT rowid, runid, time, best_cost FROM {} WHERE rowid > ? ORDER BY rowid".format('progress'),
+      (self.last_progress_rowid,))
+    chunk_size = get_progress_chunk_size(self.config['memory_budget'])
+    while True:
+      rows = query.fetchall() if chunk_size is None else query.fetchmany(chunk_size)
+      if len(rows) == 0 and len(self.pending_progress) == 0:
+        break
+      progress = np.array(rows, dtype=float).reshape(-1, 4)
+      if len(progress) > 0:
+        self.last_progress_rowid = int(progress[-1, 0])
+      progress = np.concatenate([self.pending_progress, progress[:, 1:]])
+      self.pending_progress = self.add_progress(progress)
+      if len(rows) == 0 or chunk_size is None:
+        break
+
+  def add_progress(self, progress):
+    ## Fold progress entries into the aggregates of their runs, returns
+    ## the entries of runs which are not read yet
+    position = np.minimum(np.searchsorted(self.run_ids, progress[:, 0]), max(len(self.run_ids) - 1, 0))
+    known = np.zeros(len(progress), dtype=bool)
+    if len(self.run_ids) > 0:
+      known = self.run_ids[position] == progress[:, 0]
+    if np.any(known):
+      ## Entries of later polls are later in time than the ones already
+      ## folded, within a poll they are sorted by (runid, time)
+      order = np.flatnonzero(known)
+      order = order[np.lexsort((progress[order, 1], progress[order, 0]))]
+      aggregates = self.run_aggregates[position[order]]
+      for index in np.unique(aggregates):
+        entries = order[aggregates == index]
+        aggregate = self.aggregates[index]
+        experiment = self.experiments[self.aggregate_experiments[index]]
+        aggregate.add_progress(progress[entries], self.run_rows[position[entries]], experiment["times"],
+          experiment["data"]["info"]["max_cost"])
+      self.changed = True
+    return progress[~known]
+
+  def get_result(self, cursor):
+    ## Time bounds and planner curves of each experiment, as returned by
+    ## get_data_from_database_file
+    result = {"experiments": {}}
+    best_cost = has_best_cost(cursor)
+    solution_length = has_solution_length(cursor)
+    for (experiment_name, experiment) in self.experiments.items():
+      info = experiment["data"]["info"]
+      bootstrap = get_bootstrap_config(info, self.config)
+      planners = {}
+      for planner in get_selected_planners_from_database(cursor, self.config, experiment["experiment_ids"]):
+        index = self.aggregate_index.get((experiment_name, planner[0]))
+        if index is None:
+          continue
+        planners[planner[1]] = self.aggregates[index].get_planner_data(info, experiment["times"],
+            best_cost, solution_length, bootstrap)
+      if len(planners) == 0:
+        continue
+      result["experiments"][experiment_name] = {
+          "info": {
+            "max_time": info["max_time"],
+            "min_time": info["min_time"]
+          },
+          "planners": planners
+      }
+    return result
+
+def watch_databases(database_filepaths, config, interval, polls=None):
+  ############################################################
+  ### Poll the database files every interval seconds (polls
+  ### times, or until interrupted) and render the graphs
+  ### whenever new runs or progress entries have been written.
+  ############################################################
+  data = get_data_from_config(config)
+  databases = [WatchedDatabase(database_filepath, data["info"], config) for database_filepath in database_filepaths]
+  poll = 0
+  try:
+    while polls is None or poll < polls:
+      if poll > 0:
+        time.sleep(interval)
+      poll += 1
+
+      changed = False
+      for database in databases:
+        try:
+          changed = database.poll() or changed
+        except sqlite3.OperationalError as error:
+          ## The writer held a lock for longer than the timeout
+          if config['verbosity'] > 0:
+            print("Could not read {} ({}), retrying in {}s.".format(database.filepath, error, interval))
+
+      if not changed:
+        continue
+      experiments = merge_experiment_results(data, [database.result for database in databases])
+      if len(experiments) == 0:
+        continue
+      if config['verbosity'] > 0:
+        run_count = sum(aggregate.get_run_count() for database in databases for aggregate in database.aggregates)
+        print("[{}] Plot {} runs.".format(time.strftime("%H:%M:%S"), run_count))
+      plot_experiments(experiments, database_filepaths, config)
+  except KeyboardInterrupt:
+    pass
+  finally:
+    for database in databases:
+      database.close()
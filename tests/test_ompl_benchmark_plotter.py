@@ -1,10 +1,19 @@
 import pytest
+import shutil
 from src.database_info import *
 from src.database_to_graph import *
 from src.get_diverse_color import *
 from ompl_benchmark_plotter import *
 import os.path
 
+@pytest.fixture
+def simple_database(tmp_path):
+  ## Copy of tests/data/simple.db, such that files written next to the
+  ## database end up in the temporary directory
+  database_filepath = str(tmp_path / "simple.db")
+  shutil.copyfile("tests/data/simple.db", database_filepath)
+  return database_filepath
+
 def test_load_simple_database():
   database_filepath = "tests/data/simple.db"
   assert os.path.isfile(database_filepath)
@@ -96,6 +105,47 @@ def test_remove_nonoptimal_planners_simple():
   planners_optimal = remove_non_optimal_planner(cursor, planners)
   assert len(planners_optimal) == 2
 
+def test_planner_summaries_from_one_query(simple_database):
+  from src.profiler import enable_profiler, disable_profiler
+  connection = sqlite3.connect("tests/data/simple.db")
+  profiler = enable_profiler()
+  try:
+    cursor = get_profiled_cursor(connection.cursor())
+    ## The schema is read once per cursor, before the summary query
+    assert has_best_cost(cursor)
+    schema_queries = profiler.get_stage_totals()["other"]["queries"]
+    summaries = get_planner_summaries(cursor)
+  finally:
+    disable_profiler()
+  assert profiler.get_stage_totals()["other"]["queries"] == schema_queries + 1
+  assert [(s.name, s.run_count, s.solved_count, s.has_best_cost(), s.time_limit) for s in summaries] == [
+      ("geometric_RRTConnect", 100, 100, False, 10.0), ("geometric_PRM", 100, 100, True, 10.0),
+      ("geometric_EST", 100, 100, False, 10.0), ("geometric_RRTstar", 100, 100, True, 10.0),
+      ("geometric_kBITstar", 100, 80, True, 10.0)]
+  progress_rows = connection.execute("SELECT COUNT(*) FROM progress").fetchone()[0]
+  assert sum(summary.progress_rows for summary in summaries) == progress_rows
+  ## Without the non-optimal filter, progress entries are not counted
+  assert all(summary.progress_rows is None for summary in get_planner_summaries(connection.cursor(), with_progress=False))
+
+  database_filepath = simple_database
+  assert run_benchmark_plotter(["convert", database_filepath, "-q"]) == 0
+  columnar_summaries = get_planner_summaries(load_columnar_database(database_filepath))
+  assert [vars(summary) for summary in columnar_summaries] == [vars(summary) for summary in summaries]
+
+def test_planner_filters(tmp_path, simple_database):
+  database_filepath = simple_database
+  json_filepath = str(tmp_path / "simple.json")
+
+  assert run_benchmark_plotter([database_filepath, "-q", "--ignore-non-optimal-planner"]) == 0
+  with open(json_filepath, 'r') as jsonfile:
+    assert sorted(json.load(jsonfile)["planners"].keys()) == ["geometric_RRTstar", "geometric_kBITstar"]
+
+  assert run_benchmark_plotter([database_filepath, "-q", "--include-planner", "RRT", "--ignore-planner", "geometric_RRTConnect"]) == 0
+  with open(json_filepath, 'r') as jsonfile:
+    assert sorted(json.load(jsonfile)["planners"].keys()) == ["geometric_RRTstar"]
+
+  assert run_benchmark_plotter([database_filepath, "-q", "--include-planner", "("]) == 1
+
 def test_raise_exception_on_non_existing_file():
   with pytest.raises(Exception):
     run_benchmark_plotter(["tests/data/UnKnOwN.db", "-q"])
@@ -136,3 +186,858 @@ def test_verify_graph_plotting_from_example_database():
   os.remove(pdffile)
   assert not os.path.isfile(pdffile)
 
+
+def test_cost_results_match_per_time_queries():
+  database_filepath = "tests/data/simple.db"
+  connection = sqlite3.connect(database_filepath)
+  cursor = connection.cursor()
+
+  max_cost = 100
+  times = np.logspace(-2, 1, 50)
+  for planner_id in [2, 4, 5]:
+    runs = np.array(cursor.execute("SELECT id FROM runs WHERE plannerid={}".format(planner_id)).fetchall()).flatten()
+    runids = ','.join(str(run) for run in runs)
+    improvement, medians, quantile5, quantile95 = get_cost_results(cursor, runs, times, max_cost, 25, 75)
+    assert improvement
+
+    ## Compare against one query per time sample
+    for i in range(len(times)):
+      data = np.array(cursor.execute("SELECT a.best_cost FROM (SELECT MAX(time), \
+        best_cost FROM progress WHERE time<={0} AND runid in ({1}) GROUP BY runid) a".format(times[i], runids)).fetchall()).flatten()
+      if data.size == 0:
+        assert medians[i] == max_cost
+        continue
+      data = np.where(data == None, max_cost, data).astype(float)
+      assert medians[i] == np.median(data)
+      assert quantile5[i] == np.percentile(data, 25, method='nearest')
+      assert quantile95[i] == np.percentile(data, 75, method='nearest')
+
+def test_success_over_time_matches_per_time_queries():
+  database_filepath = "tests/data/simple.db"
+  connection = sqlite3.connect(database_filepath)
+  cursor = connection.cursor()
+
+  times = np.logspace(-2, 1, 50)
+  for planner_id in range(1, 6):
+    run_times = get_run_times_from_database(cursor, planner_id)
+    success = get_success_from_sorted_times(run_times, len(run_times), times, inclusive=False)
+    for i in range(len(times)):
+      count = cursor.execute("SELECT COUNT(*) FROM runs WHERE plannerid={} AND time < {}".format(planner_id, times[i])).fetchall()[0][0]
+      assert success[i] == (count / len(run_times)) * 100
+
+  runs = np.array(cursor.execute("SELECT id FROM runs WHERE plannerid=5").fetchall()).flatten()
+  runids = ','.join(str(run) for run in runs)
+  success = get_count_success(cursor, len(runs), runs, times)
+  for i in range(len(times)):
+    data = np.array(cursor.execute("SELECT a.best_cost FROM (SELECT MAX(time), \
+      best_cost FROM progress WHERE time<={0} AND runid in ({1}) GROUP BY runid) a".format(times[i], runids)).fetchall()).flatten()
+    assert success[i] == (sum(x is not None for x in data) / len(runs)) * 100.0
+
+def test_schema_checks_do_not_read_table_data():
+  database_filepath = "tests/data/simple.db"
+  connection = sqlite3.connect(database_filepath)
+  statements = []
+  connection.set_trace_callback(statements.append)
+  cursor = connection.cursor()
+
+  schema = get_database_schema(cursor)
+  assert schema.has_table("progress")
+  assert schema.has_column("runs", "solution_length")
+  assert not schema.has_column("runs", "UnKnOwN")
+  assert get_database_schema(cursor) is schema
+
+  for i in range(3):
+    assert has_best_cost(cursor)
+    assert has_solution_length(cursor)
+  assert all("PRAGMA" in statement or "sqlite_master" in statement for statement in statements)
+  assert len(statements) == len(schema.get_tables()) + 1
+
+  ## Connections of connect_database read the schema once for all cursors
+  connection = connect_database(database_filepath)
+  schema = get_database_schema(connection.cursor())
+  assert get_database_schema(connection.cursor()) is schema
+  invalidate_database_schema(connection.cursor())
+  assert get_database_schema(connection.cursor()) is not schema
+  connection.close()
+
+def test_result_cache_skips_database_on_styling_rerun(tmp_path, monkeypatch, simple_database):
+  database_filepath = simple_database
+  cache_dir = str(tmp_path / "cache")
+  json_filepath = str(tmp_path / "simple.json")
+  assert run_benchmark_plotter([database_filepath, "-q", "--cache-dir", cache_dir]) == 0
+  assert len(os.listdir(cache_dir)) == 1
+  with open(json_filepath, 'r') as jsonfile:
+    planners = json.load(jsonfile)["planners"]
+
+  def connect_not_allowed(*args, **kwargs):
+    raise Exception("Database should have been loaded from cache.")
+  monkeypatch.setattr(sqlite3, "connect", connect_not_allowed)
+  assert run_benchmark_plotter([database_filepath, "-q", "--cache-dir", cache_dir, "--fontsize", "12"]) == 0
+  with open(json_filepath, 'r') as jsonfile:
+    assert json.load(jsonfile)["planners"] == planners
+
+  ## Changing a statistics parameter invalidates the cache entry
+  with pytest.raises(Exception, match="loaded from cache"):
+    run_benchmark_plotter([database_filepath, "-q", "--cache-dir", cache_dir, "--max-time", "5"])
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+  cache = ResultCache(str(tmp_path), 150)
+  cache.put("a", {"planners": "x" * 40})
+  cache.put("b", {"planners": "y" * 40})
+  os.utime(cache.get_filepath("a"), ns=(0, 0))
+  os.utime(cache.get_filepath("b"), ns=(1, 1))
+  ## Reading "a" marks it as recently used, such that "b" is evicted first
+  assert cache.get("a") is not None
+  cache.put("c", {"planners": "z" * 40})
+  assert cache.get("a") is not None
+  assert cache.get("b") is None
+  assert cache.get("c") is not None
+
+def test_parallel_ingestion_matches_serial(tmp_path):
+  database_filepaths = []
+  for shard in ["shard1.db", "shard2.db", "shard3.db"]:
+    database_filepath = str(tmp_path / shard)
+    shutil.copyfile("tests/data/simple.db", database_filepath)
+    database_filepaths.append(database_filepath)
+  json_filepath = str(tmp_path / "shard1.json")
+
+  assert run_benchmark_plotter(database_filepaths + ["-q"]) == 0
+  with open(json_filepath, 'rb') as jsonfile:
+    serial = jsonfile.read()
+  assert run_benchmark_plotter(database_filepaths + ["-q", "--jobs", "3"]) == 0
+  with open(json_filepath, 'rb') as jsonfile:
+    parallel = jsonfile.read()
+  assert serial == parallel
+
+def test_runs_by_planner_match_per_planner_queries(simple_database):
+  assert run_benchmark_plotter(["convert", simple_database, "-q", "--dtype", "float64"]) == 0
+  connection = sqlite3.connect(simple_database)
+  cursor = connection.cursor()
+  for database in [cursor, load_columnar_database(simple_database)]:
+    runs_by_planner = get_runs_by_planner_from_database(database, experiment_ids=[1])
+    assert sorted(runs_by_planner.keys()) == [1, 2, 3, 4, 5]
+    for (planner_id, planner_runs) in runs_by_planner.items():
+      assert np.array_equal(planner_runs.ids, get_run_ids_from_database(cursor, planner_id))
+      assert np.array_equal(planner_runs.get_run_times(), get_run_times_from_database(cursor, planner_id))
+      assert np.array_equal(planner_runs.get_solved_runs(), get_solved_runs_from_database(cursor, planner_id))
+  assert get_runs_by_planner_from_database(cursor, experiment_ids=[2]) == {}
+  connection.close()
+
+def test_streamed_cost_matrix_matches_full_fetch():
+  database_filepath = "tests/data/simple.db"
+  connection = sqlite3.connect(database_filepath)
+  cursor = connection.cursor()
+
+  times = np.logspace(-2, 1, 50)
+  runs = np.array(cursor.execute("SELECT id FROM runs WHERE plannerid=5").fetchall()).flatten()
+  costs = get_cost_matrix_from_database(cursor, runs, times, 100)
+  ## Chunks split runs at arbitrary entries, down to a single entry per chunk
+  for chunk_size in [1, 7, 100, 100000]:
+    streamed_costs = get_cost_matrix_from_database(cursor, runs, times, 100, chunk_size)
+    assert np.array_equal(costs, streamed_costs, equal_nan=True)
+  assert get_progress_chunk_size(None) is None
+  assert get_progress_chunk_size(1024 * 1024) > 0
+
+def test_columnar_sidecar_matches_database(tmp_path, simple_database):
+  database_filepath = simple_database
+  json_filepath = str(tmp_path / "simple.json")
+
+  assert run_benchmark_plotter([database_filepath, "-q"]) == 0
+  with open(json_filepath, 'r') as jsonfile:
+    planners = json.load(jsonfile)["planners"]
+
+  assert run_benchmark_plotter(["convert", database_filepath, "-q", "--dtype", "float64"]) == 0
+  columnar_database = load_columnar_database(database_filepath)
+  assert columnar_database is not None
+  assert has_best_cost(columnar_database)
+  assert get_planner_names_from_database(columnar_database) == get_planner_names_from_database(sqlite3.connect(database_filepath).cursor())
+
+  assert run_benchmark_plotter([database_filepath, "-q"]) == 0
+  with open(json_filepath, 'r') as jsonfile:
+    assert json.load(jsonfile)["planners"] == planners
+
+  ## A modified database invalidates its sidecar
+  os.utime(database_filepath, ns=(0, 0))
+  assert load_columnar_database(database_filepath) is None
+
+def test_batch_plots_one_graph_per_experiment(tmp_path):
+  for (subdirectory, experiment_name) in [("a", None), ("b", None), ("c", "maze")]:
+    os.makedirs(str(tmp_path / "input" / subdirectory))
+    database_filepath = str(tmp_path / "input" / subdirectory / "benchmark.db")
+    shutil.copyfile("tests/data/simple.db", database_filepath)
+    if experiment_name is not None:
+      connection = sqlite3.connect(database_filepath)
+      connection.execute("UPDATE experiments SET name=?", (experiment_name,))
+      connection.commit()
+      connection.close()
+
+  output_dir = str(tmp_path / "output")
+  manifest_filepath = str(tmp_path / "manifest.json")
+  assert run_benchmark_plotter(["batch", str(tmp_path / "input"), "-q", "--workers", "2",
+    "--output-dir", output_dir, "--manifest", manifest_filepath]) == 0
+
+  with open(manifest_filepath, 'r') as jsonfile:
+    manifest = json.load(jsonfile)
+  assert [entry["experiment"] for entry in manifest] == ["chain", "maze"]
+  assert [len(entry["databases"]) for entry in manifest] == [2, 1]
+  assert all(entry["status"] == "ok" for entry in manifest)
+  assert sorted(os.listdir(output_dir)) == ["chain.pdf", "maze.pdf"]
+
+def test_batch_groups_files_with_several_experiments(tmp_path):
+  from benchmarks.generate_database import generate_database
+  os.makedirs(str(tmp_path / "input"))
+  generate_database(str(tmp_path / "input" / "x.db"), planners=2, runs=10, progress_rows=20, experiments=2)
+  generate_database(str(tmp_path / "input" / "y.db"), planners=2, runs=10, progress_rows=20)
+  connection = sqlite3.connect(str(tmp_path / "input" / "y.db"))
+  connection.execute("UPDATE experiments SET name='synthetic0'")
+  connection.commit()
+  connection.close()
+
+  output_dir = str(tmp_path / "output")
+  manifest_filepath = str(tmp_path / "manifest.json")
+  assert run_benchmark_plotter(["batch", str(tmp_path / "input"), "-q", "--workers", "2",
+    "--output-dir", output_dir, "--manifest", manifest_filepath]) == 0
+
+  with open(manifest_filepath, 'r') as jsonfile:
+    manifest = json.load(jsonfile)
+  assert [entry["experiment"] for entry in manifest] == ["synthetic0", "synthetic1"]
+  assert [len(entry["databases"]) for entry in manifest] == [2, 1]
+  ## Data files of each experiment are written next to the first file
+  input_dir = str(tmp_path / "input")
+  assert [entry["output"] for entry in manifest] == [
+      [os.path.join(input_dir, "x_synthetic0.json"), os.path.join(output_dir, "synthetic0.pdf")],
+      [os.path.join(input_dir, "x_synthetic1.json"), os.path.join(output_dir, "synthetic1.pdf")]]
+  assert all(os.path.isfile(output) for entry in manifest for output in entry["output"])
+  assert sorted(os.listdir(output_dir)) == ["synthetic0.pdf", "synthetic1.pdf"]
+
+def test_plot_one_graph_per_experiment_in_database(tmp_path):
+  database_filepath = str(tmp_path / "suite.db")
+  shutil.copyfile("tests/data/simple.db", database_filepath)
+  connection = sqlite3.connect(database_filepath)
+  connection.execute("INSERT INTO experiments (id, name, timelimit) VALUES (2, 'maze', 5.0)")
+  connection.execute("UPDATE runs SET experimentid=2 WHERE plannerid IN (4, 5)")
+  connection.commit()
+  connection.close()
+
+  assert run_benchmark_plotter([database_filepath, "-q"]) == 0
+  assert os.path.isfile(str(tmp_path / "suite_chain.pdf"))
+  assert os.path.isfile(str(tmp_path / "suite_maze.pdf"))
+
+  with open(str(tmp_path / "suite_chain.json"), 'r') as jsonfile:
+    chain = json.load(jsonfile)
+  with open(str(tmp_path / "suite_maze.json"), 'r') as jsonfile:
+    maze = json.load(jsonfile)
+  assert sorted(chain["planners"].keys()) == ["geometric_EST", "geometric_PRM", "geometric_RRTConnect"]
+  assert sorted(maze["planners"].keys()) == ["geometric_RRTstar", "geometric_kBITstar"]
+  assert chain["info"]["max_time"]["success"] == pytest.approx(10.0)
+  assert maze["info"]["max_time"]["success"] == pytest.approx(5.0)
+
+  ## The written files are returned (and reported by the batch command)
+  parser = argparse.ArgumentParser()
+  add_plot_arguments(parser)
+  args = parser.parse_args(["-v", "0", "--formats", "pdf", "png"])
+  args.show = None
+  args.output_file = None
+  args.jobs = 1
+  config = make_config(args)
+  config["planner_colors"] = {}
+  output_filepaths = plot_graph_from_databases([database_filepath], config)
+  assert [os.path.basename(filepath) for filepath in output_filepaths] == ["suite_chain.json", "suite_chain.pdf",
+      "suite_chain.png", "suite_maze.json", "suite_maze.pdf", "suite_maze.png"]
+  assert all(os.path.isfile(filepath) for filepath in output_filepaths)
+
+  ## A selected experiment is named as one of several experiments
+  config["experiment"] = "maze"
+  assert [os.path.basename(filepath) for filepath in plot_graph_from_databases([database_filepath], config)] == [
+      "suite_maze.json", "suite_maze.pdf", "suite_maze.png"]
+
+def test_reduced_summaries_match_direct_plot(tmp_path):
+  from src.summary import load_summary
+  for name in ["shard1", "shard2"]:
+    shutil.copyfile("tests/data/simple.db", str(tmp_path / "{}.db".format(name)))
+    assert run_benchmark_plotter(["summarize", str(tmp_path / "{}.db".format(name)),
+      "-o", str(tmp_path / "{}.npz".format(name)), "-q"]) == 0
+  assert load_summary(str(tmp_path / "shard1.npz"))["grid"]["bins"] == 1000
+
+  assert run_benchmark_plotter(["reduce", str(tmp_path / "shard1.npz"), str(tmp_path / "shard2.npz"), "-q"]) == 0
+  assert os.path.isfile(str(tmp_path / "shard1.pdf"))
+  with open(str(tmp_path / "shard1.json"), 'r') as jsonfile:
+    reduced = json.load(jsonfile)
+
+  assert run_benchmark_plotter([str(tmp_path / "shard2.db"), "-q"]) == 0
+  with open(str(tmp_path / "shard2.json"), 'r') as jsonfile:
+    direct = json.load(jsonfile)
+
+  ## Doubling all runs leaves success rates and quantiles unchanged
+  bin_width = direct["info"]["max_cost"] / 1000
+  assert reduced["planners"].keys() == direct["planners"].keys()
+  for (planner_name, planner) in direct["planners"].items():
+    assert np.array_equal(reduced["planners"][planner_name]["success"], planner["success"])
+    for key in ["median", "quantile5", "quantile95"]:
+      if key in planner:
+        assert np.allclose(reduced["planners"][planner_name][key], planner[key], atol=bin_width)
+
+def test_combine_planner_data_pools_statistics():
+  rng = np.random.default_rng(0)
+  samples1 = rng.uniform(0, 10, 30)
+  samples2 = rng.uniform(5, 20, 70)
+  def get_planner_data(samples):
+    return {"A": {"time_mean": np.mean(samples), "time_std": np.std(samples), "time_limit": 20.0,
+      "success": 100.0, "best_planner": True, "number_runs": len(samples)}}
+
+  combined = combine_planner_data(get_planner_data(samples1), get_planner_data(samples2))
+  samples = np.concatenate([samples1, samples2])
+  assert combined["A"]["time_mean"] == pytest.approx(np.mean(samples))
+  assert combined["A"]["time_std"] == pytest.approx(np.std(samples))
+  assert combined["A"]["number_runs"] == 100
+
+def test_runtime_table_from_one_grouped_query(tmp_path):
+  from src.profiler import enable_profiler, disable_profiler
+  from src.runtime_table import get_runtime_groups_from_database, get_runtime_data_from_databases
+  database_filepath = "tests/data/simple.db"
+  cursor = sqlite3.connect(database_filepath).cursor()
+  profiler = enable_profiler()
+  try:
+    profiled_cursor = get_profiled_cursor(cursor)
+    assert has_best_cost(profiled_cursor)
+    schema_queries = profiler.get_stage_totals()["other"]["queries"]
+    groups = get_runtime_groups_from_database(profiled_cursor)
+  finally:
+    disable_profiler()
+  assert profiler.get_stage_totals()["other"]["queries"] == schema_queries + 1
+  assert len(groups) == 5
+
+  config = {"jobs": 1, "include_planner": None, "ignore_planner": None, "ignore_ending_name": None}
+  data = get_runtime_data_from_databases([database_filepath], config)
+  planner_data = data["experiments"]["chain"]
+  assert len(planner_data) == 5
+  for (planner_id, planner_name) in get_planners_from_database(cursor):
+    runs = get_run_ids_from_database(cursor, planner_id)
+    if is_planner_optimal(cursor, planner_id):
+      times = get_first_solution_times_from_database(cursor, runs)
+      times = np.concatenate([times, np.full(len(runs) - len(times), 10.0)])
+    else:
+      times = get_run_times_from_database(cursor, planner_id)
+    assert planner_data[planner_name]["time_mean"] == pytest.approx(np.mean(times))
+    assert planner_data[planner_name]["time_std"] == pytest.approx(np.std(times))
+    assert planner_data[planner_name]["number_runs"] == len(runs)
+  assert sum(planner["best_planner"] for planner in planner_data.values()) == 1
+
+  ## Two files with the same experiment are pooled (in parallel)
+  database_filepaths = [str(tmp_path / "a.db"), str(tmp_path / "b.db")]
+  for filepath in database_filepaths:
+    shutil.copyfile(database_filepath, filepath)
+  config["jobs"] = 2
+  pooled = get_runtime_data_from_databases(database_filepaths, config)["experiments"]["chain"]
+  for (planner_name, planner) in planner_data.items():
+    assert pooled[planner_name]["time_mean"] == pytest.approx(planner["time_mean"])
+    assert pooled[planner_name]["time_std"] == pytest.approx(planner["time_std"])
+    assert pooled[planner_name]["number_runs"] == 2 * planner["number_runs"]
+
+  ## Deviations of similar run times far from zero do not cancel
+  connection = sqlite3.connect(database_filepaths[1])
+  connection.execute("UPDATE runs SET time = 100000.0 + 0.00001 * id WHERE plannerid = 1")
+  connection.commit()
+  times = get_run_times_from_database(connection.cursor(), 1)
+  connection.close()
+  config["jobs"] = 1
+  planner = get_runtime_data_from_databases(database_filepaths[1:], config)["experiments"]["chain"]["geometric_RRTConnect"]
+  assert planner["time_std"] == pytest.approx(np.std(times), rel=1e-6)
+
+  assert run_benchmark_plotter(["table", database_filepaths[0], "-q", "--include-planner", "RRT"]) == 0
+  with open(str(tmp_path / "a.tex")) as texfile:
+    tex = texfile.read()
+  assert "RRTConnect" in tex and "PRM" not in tex
+
+def test_cold_start_does_not_import_matplotlib(tmp_path, simple_database):
+  import subprocess
+  database_filepath = simple_database
+
+  ## Fresh interpreters, such that no module is imported yet
+  script = "\n".join(["import sys", "from ompl_benchmark_plotter import *",
+      "try:", "  run_benchmark_plotter(['--help'])", "except SystemExit:", "  pass",
+      "assert 'matplotlib' not in sys.modules"])
+  subprocess.run([sys.executable, "-c", script], check=True, stdout=subprocess.DEVNULL)
+
+  script = "import sys; from ompl_benchmark_plotter import *; \
+      assert run_benchmark_plotter([sys.argv[1], '--data-only', '-q']) == 0; \
+      assert 'matplotlib' not in sys.modules"
+  subprocess.run([sys.executable, "-c", script, database_filepath], check=True)
+  assert os.path.isfile(str(tmp_path / "simple.json"))
+  assert not os.path.isfile(str(tmp_path / "simple.pdf"))
+
+def test_npz_intermediate_matches_json(tmp_path, simple_database):
+  database_filepath = simple_database
+
+  assert run_benchmark_plotter([database_filepath, "-q", "--intermediate", "npz"]) == 0
+  assert os.path.isfile(str(tmp_path / "simple.pdf"))
+  os.remove(str(tmp_path / "simple.pdf"))
+  assert run_benchmark_plotter([database_filepath, "-q", "--intermediate", "none"]) == 0
+  assert os.path.isfile(str(tmp_path / "simple.pdf"))
+  assert not os.path.isfile(str(tmp_path / "simple.json"))
+  assert run_benchmark_plotter([database_filepath, "-q", "--data-only"]) == 0
+
+  npz_data = load_data(str(tmp_path / "simple.npz"))
+  json_data = load_data(str(tmp_path / "simple.json"))
+  assert npz_data["info"] == json_data["info"]
+  for (planner_name, planner) in json_data["planners"].items():
+    for (key, value) in planner.items():
+      if key in kPlannerCurves:
+        assert np.allclose(npz_data["planners"][planner_name][key], value, rtol=1e-6)
+      else:
+        assert npz_data["planners"][planner_name][key] == value
+
+  parser = argparse.ArgumentParser()
+  add_plot_arguments(parser)
+  args = parser.parse_args(["-v", "0"])
+  args.show = None
+  args.output_file = None
+  args.jobs = 1
+  json_to_graph(str(tmp_path / "simple.npz"), str(tmp_path / "from_npz.pdf"), make_config(args))
+  assert os.path.isfile(str(tmp_path / "from_npz.pdf"))
+
+def test_planner_curves_hold_one_array_per_statistic(tmp_path, simple_database):
+  database_filepath = simple_database
+  assert run_benchmark_plotter([database_filepath, "-q", "--data-only", "--time-grid", "events"]) == 0
+  data = load_data(str(tmp_path / "simple.json"))
+
+  curves = PlannerCurves.from_data(data)
+  assert curves.names == list(data["planners"].keys())
+  assert curves.median.shape == (len(curves), curves.lengths.max())
+  for (name, planner) in data["planners"].items():
+    row = curves.index[name]
+    assert np.allclose(curves.get_success_curve(row)[1], planner["success"])
+    assert curves.optimization_success[row] == planner["optimization_success"]
+    if planner["optimization_success"]:
+      assert np.allclose(curves.get_cost_curve(row)[0], planner["times"])
+      assert np.allclose(curves.get_cost_curve(row)[1], planner["median"])
+    else:
+      assert np.allclose(curves.get_point(row)["cost"], planner["point"]["cost"])
+  ## Padding beyond the length of a curve is NaN
+  assert np.all(np.isnan(curves.median[~curves.optimization_success]))
+
+  ## Conversion back to planner data is lossless
+  converted = curves.to_data()["planners"]
+  assert list(converted.keys()) == list(data["planners"].keys())
+  for (name, planner) in data["planners"].items():
+    assert sorted(converted[name].keys()) == sorted(planner.keys())
+    for key in kPlannerCurves:
+      if key in planner:
+        assert np.allclose(converted[name][key], planner[key])
+
+  ## Largest median below the acquisition maximum (or point cost) of all planners
+  config = {"max_cost": -1, "min_cost": -1}
+  max_cost = get_maxcost_from_curves_or_config(curves, config)
+  acquisition_max_cost = data["info"]["max_cost"]
+  largest = 0
+  for planner in data["planners"].values():
+    if planner["optimization_success"]:
+      below = [index for (index, value) in enumerate(planner["median"]) if value < acquisition_max_cost]
+      cost = max(planner["median"][below[0]:]) if len(below) > 0 else acquisition_max_cost
+    else:
+      cost = planner["point"]["cost"][0]
+    if cost < acquisition_max_cost:
+      largest = max(largest, cost)
+  assert max_cost == pytest.approx(1.1 * largest)
+  smallest = min(min(planner["median"]) if planner["optimization_success"] else planner["point"]["cost"][0]
+      for planner in data["planners"].values())
+  assert get_mincost_from_curves_or_config(curves, config, max_cost) == pytest.approx(max(0.0, smallest - 0.1 * (max_cost - smallest)))
+
+def test_fast_render_rasterizes_bands(tmp_path, simple_database):
+  database_filepath = simple_database
+
+  assert run_benchmark_plotter([database_filepath, "-q", "--fast-render", "--formats", "pdf", "png", "svg"]) == 0
+  for extension in [".pdf", ".png", ".svg"]:
+    assert os.path.isfile(str(tmp_path / ("simple" + extension)))
+  with open(str(tmp_path / "simple.pdf"), 'rb') as pdffile:
+    assert b"/Subtype /Image" in pdffile.read()
+
+  ## The automatic mode draws small graphs as vector graphics
+  for arguments in [[], ["--fast-render", "off"]]:
+    assert run_benchmark_plotter([database_filepath, "-q"] + arguments) == 0
+    with open(str(tmp_path / "simple.pdf"), 'rb') as pdffile:
+      assert b"/Subtype /Image" not in pdffile.read()
+
+  config = {'fast_render': get_fast_render_option('auto')}
+  assert config['fast_render'] is None
+  assert is_fast_render(config, argparse.Namespace(lengths=np.full(25, 1000)))
+  assert not is_fast_render(config, argparse.Namespace(lengths=np.full(25, 999)))
+  assert get_fast_render_option('on') is True and get_fast_render_option('off') is False
+
+def test_event_time_grid_is_exact_and_bounded(tmp_path, simple_database):
+  database_filepath = simple_database
+  assert run_benchmark_plotter([database_filepath, "-q", "--time-grid", "events", "--max-points", "60"]) == 0
+  with open(str(tmp_path / "simple.json"), 'r') as jsonfile:
+    data = json.load(jsonfile)
+
+  connection = sqlite3.connect(database_filepath)
+  cursor = connection.cursor()
+  for (planner_id, planner_name) in get_planners_from_database(cursor):
+    planner = data["planners"][planner_name]
+    assert len(planner["success"]) <= 60
+    assert planner["success_times"][0] == pytest.approx(data["info"]["min_time"]["success"])
+    assert planner["success_times"][-1] == pytest.approx(data["info"]["max_time"]["success"])
+    runs = get_run_ids_from_database(cursor, planner_id)
+    if planner["optimization_success"]:
+      assert len(planner["median"]) <= 60
+      assert len(planner["times"]) == len(planner["median"])
+      ## Success at each kept event equals the fraction of runs solved until then
+      for (time, success) in zip(planner["success_times"], planner["success"]):
+        solved = cursor.execute("SELECT COUNT(DISTINCT runid) FROM progress WHERE best_cost IS NOT NULL \
+            AND time <= ? AND runid IN ({})".format(','.join(str(run) for run in runs)), (time,)).fetchone()[0]
+        assert success == pytest.approx(100.0 * solved / len(runs))
+    else:
+      for (time, success) in zip(planner["success_times"], planner["success"]):
+        finished = cursor.execute("SELECT COUNT(*) FROM runs WHERE plannerid=? AND time <= ?",
+            (planner_id, time)).fetchone()[0]
+        assert success == pytest.approx(100.0 * finished / len(runs))
+  connection.close()
+
+def test_lttb_keeps_end_points_and_peaks():
+  x = np.arange(1000, dtype=float)
+  y = np.zeros(1000)
+  y[537] = 10.0
+  indices = get_lttb_indices(x, y, 20)
+  assert len(indices) == 20
+  assert indices[0] == 0 and indices[-1] == 999
+  assert 537 in indices
+  assert np.all(np.diff(indices) > 0)
+
+def test_event_grid_is_bounded_and_keeps_step_levels(tmp_path):
+  from benchmarks.generate_database import generate_database
+  database_filepath = str(tmp_path / "synthetic.db")
+  generate_database(database_filepath, planners=1, runs=40, progress_rows=50, anytime_fraction=1.0)
+  connection = sqlite3.connect(database_filepath)
+  cursor = connection.cursor()
+  runs = get_run_ids_from_database(cursor, 1)
+  ## Progress times differ between runs, so there are more event times than
+  ## candidates
+  progress_times = get_progress_times_from_database(cursor, runs)
+  assert len(progress_times) > 40 * 49
+  times = get_event_times(progress_times, 0.1, 10.0, 300)
+  assert len(times) == 300 and times[0] == 0.1 and times[-1] == 10.0
+  assert np.all(np.isin(times[1:-1], progress_times))
+
+  ## Time samples in chunks of a memory budget give the same results
+  results = get_cost_results(cursor, runs, times, 100.0, 5, 95)
+  chunked_results = get_cost_results(cursor, runs, times, 100.0, 5, 95, column_chunk_size=get_cost_column_chunk_size(
+      24 * 40 * 7, len(runs)))
+  assert results[0] == chunked_results[0]
+  for (values, chunked_values) in zip(results[1:], chunked_results[1:]):
+    assert np.array_equal(values, chunked_values)
+  connection.close()
+
+  ## Each step selected by LTTB is kept with the level before it
+  median = results[1]
+  indices = get_decimated_indices(times, [median], 40)
+  assert len(indices) <= 40
+  for index in get_lttb_indices(np.log10(times), median, 20)[1:]:
+    assert index in indices and index - 1 in indices
+
+def test_generated_database_has_requested_size(tmp_path):
+  from benchmarks.generate_database import generate_database
+  database_filepath = str(tmp_path / "synthetic.db")
+  generate_database(database_filepath, planners=4, runs=30, progress_rows=20, experiments=2)
+
+  connection = sqlite3.connect(database_filepath)
+  cursor = connection.cursor()
+  assert cursor.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 2 * 4 * 30
+  ## Half of the planners are anytime planners with progress entries
+  assert cursor.execute("SELECT COUNT(*) FROM progress").fetchone()[0] == 2 * 2 * 30 * 20
+  assert has_best_cost(cursor) and has_solution_length(cursor)
+  ## Summaries of an experiment only count the progress entries of its runs
+  for experiment_id in [1, 2]:
+    summaries = get_planner_summaries(cursor, [experiment_id])
+    assert [summary.run_count for summary in summaries] == [30] * 4
+    assert sum(summary.progress_rows for summary in summaries) == 2 * 30 * 20
+  connection.close()
+
+  assert run_benchmark_plotter([database_filepath, "-q", "--data-only"]) == 0
+  for experiment_name in ["synthetic0", "synthetic1"]:
+    with open(str(tmp_path / "synthetic_{}.json".format(experiment_name)), 'r') as jsonfile:
+      data = json.load(jsonfile)
+    assert len(data["planners"]) == 4
+
+def test_profile_counts_queries_and_rows_per_stage(tmp_path, simple_database):
+  database_filepath = simple_database
+  profile_filepath = str(tmp_path / "profile.json")
+  assert run_benchmark_plotter([database_filepath, "-q", "--profile-output", profile_filepath]) == 0
+  assert not is_profiling()
+
+  with open(profile_filepath, 'r') as jsonfile:
+    profile = json.load(jsonfile)
+  stages = profile["stages"]
+  for stage in ["schema", "planners", "runs", "cost_matrix", "quantiles", "count_success", "write_data", "plot", "savefig_pdf"]:
+    assert stages[stage]["calls"] > 0
+  ## All progress entries are fetched once, by one query per optimizing
+  ## planner after its runs are selected (create, clear and fill the table)
+  connection = sqlite3.connect(database_filepath)
+  progress_rows = connection.execute("SELECT COUNT(*) FROM progress").fetchone()[0]
+  connection.close()
+  assert stages["cost_matrix"]["rows"] == progress_rows
+  assert stages["cost_matrix"]["queries"] == 5 * 4
+  assert stages["quantiles"]["queries"] == 0
+  ## The runs of all planners are fetched with one query
+  assert stages["runs"]["queries"] == 1
+  assert stages["runs"]["rows"] == 5 * 100
+
+def test_profile_stage_seconds_exclude_nested_stages():
+  import time
+  from src.profiler import enable_profiler, disable_profiler
+  profiler = enable_profiler()
+  try:
+    start = time.perf_counter()
+    with profile_stage("outer"):
+      with profile_stage("inner", "A"):
+        time.sleep(0.05)
+      with profile_stage("inner", "B"):
+        time.sleep(0.05)
+    wall_time = time.perf_counter() - start
+  finally:
+    disable_profiler()
+  stages = profiler.get_stage_totals()
+  assert stages["inner"]["seconds"] >= 0.1
+  assert stages["outer"]["seconds"] < 0.05
+  assert stages["outer"]["total_seconds"] >= stages["inner"]["total_seconds"]
+  assert stages["outer"]["seconds"] + stages["inner"]["seconds"] == pytest.approx(wall_time, abs=0.01)
+
+def test_database_connection_is_read_only_and_tuned(simple_database):
+  database_filepath = simple_database
+  assert "immutable=1" in get_database_uri(database_filepath)
+  open(database_filepath + "-wal", "w").close()
+  assert "immutable=1" not in get_database_uri(database_filepath)
+  os.remove(database_filepath + "-wal")
+
+  connection = connect_database(database_filepath)
+  with pytest.raises(sqlite3.OperationalError):
+    connection.execute("DELETE FROM runs")
+  assert connection.execute("PRAGMA mmap_size").fetchone()[0] == kMmapSize
+  assert connection.execute("PRAGMA temp_store").fetchone()[0] == 2
+  file_runs = get_run_ids_from_database(connection.cursor(), 4)
+  connection.close()
+
+  ## Small files are copied into memory, where runs are indexed by planner
+  memory_connection = connect_database(database_filepath, in_memory_size=os.path.getsize(database_filepath))
+  assert memory_connection.execute("PRAGMA database_list").fetchone()[2] == ""
+  assert has_index_on_columns(memory_connection, "runs", ["plannerid", "time"])
+  assert has_index_on_columns(memory_connection, "progress", ["runid", "time"])
+  assert np.array_equal(get_run_ids_from_database(memory_connection.cursor(), 4), file_runs)
+  memory_connection.close()
+
+def test_run_selection_uses_bound_parameters(tmp_path):
+  from benchmarks.generate_database import generate_database
+  database_filepath = str(tmp_path / "synthetic.db")
+  generate_database(database_filepath, planners=2, runs=3000, progress_rows=4, anytime_fraction=1.0)
+
+  connection = connect_database(database_filepath)
+  statements = []
+  connection.set_trace_callback(statements.append)
+  cursor = connection.cursor()
+  runs = get_run_ids_from_database(cursor, 1, experiment_ids=[1])
+  assert len(runs) == 3000
+  progress = get_progress_from_database(cursor, runs)
+  first_solution_times = get_first_solution_times_from_database(cursor, runs)
+  progress_times = get_progress_times_from_database(cursor, runs)
+  ## The SQL text does not grow with the number of runs
+  assert max(len(statement) for statement in statements) < 200
+  assert not connection.in_transaction
+  connection.close()
+
+  reference = sqlite3.connect(database_filepath)
+  expected = np.array(reference.execute("SELECT runid, progress.time, progress.best_cost FROM progress JOIN runs ON runs.id = runid \
+      WHERE plannerid = 1 ORDER BY runid, progress.time").fetchall(), dtype=float)
+  reference.close()
+  assert np.array_equal(progress, expected, equal_nan=True)
+  assert np.array_equal(progress_times, np.unique(expected[:, 1]))
+  solved = expected[~np.isnan(expected[:, 2])]
+  assert len(first_solution_times) == len(np.unique(solved[:, 0]))
+
+def test_watch_folds_new_rows_into_same_curves(tmp_path):
+  from benchmarks.generate_database import generate_database, kSchema
+  from src.watch import WatchedDatabase
+  full_filepath = str(tmp_path / "full.db")
+  live_filepath = str(tmp_path / "live.db")
+  generate_database(full_filepath, planners=4, runs=40, progress_rows=25)
+
+  ## A benchmark which writes runs and their progress in batches, such that
+  ## the progress of some runs is split across polls
+  full = sqlite3.connect(full_filepath)
+  live = sqlite3.connect(live_filepath)
+  live.executescript(kSchema)
+  for table in ["experiments", "plannerConfigs", "enums"]:
+    rows = full.execute("SELECT * FROM {}".format(table)).fetchall()
+    live.executemany("INSERT INTO {} VALUES ({})".format(table, ','.join('?' * len(rows[0]))), rows)
+  live.commit()
+  runs = full.execute("SELECT * FROM runs ORDER BY id").fetchall()
+  progress = full.execute("SELECT * FROM progress ORDER BY rowid").fetchall()
+  full.close()
+
+  parser = argparse.ArgumentParser()
+  add_plot_arguments(parser)
+  args = parser.parse_args(["-v", "0"])
+  args.show = None
+  args.output_file = None
+  args.jobs = 1
+  config = make_config(args)
+  config["planner_colors"] = {}
+  info = get_data_from_config(config)["info"]
+  database = WatchedDatabase(live_filepath, info, config)
+  database.poll()
+  assert database.result["experiments"] == {}
+  assert not database.poll()
+
+  batches = 4
+  for batch in range(batches):
+    live.executemany("INSERT INTO runs VALUES ({})".format(','.join('?' * len(runs[0]))),
+        runs[batch * len(runs) // batches:(batch + 1) * len(runs) // batches])
+    live.executemany("INSERT INTO progress VALUES (?, ?, ?, ?)",
+        progress[batch * len(progress) // batches:(batch + 1) * len(progress) // batches])
+    live.commit()
+    assert database.poll()
+    assert not database.poll()
+
+    expected = get_data_from_database_file(live_filepath, info, config)
+    for (planner_name, planner) in expected["experiments"]["synthetic"]["planners"].items():
+      watched = database.result["experiments"]["synthetic"]["planners"][planner_name]
+      assert set(watched.keys()) == set(planner.keys())
+      for key in ["success", "median", "quantile5", "quantile95"]:
+        if key in planner:
+          assert np.allclose(watched[key], planner[key])
+  database.close()
+  live.close()
+
+def test_bootstrap_medians_match_resampled_runs():
+  from src.bootstrap import get_resample_counts, get_resampled_medians, get_bootstrap_interval
+  rng = np.random.default_rng(0)
+  costs = rng.uniform(10, 50, (300, 6))
+  costs[rng.random(costs.shape) < 0.3] = np.nan
+  costs[:, 0] = np.nan
+  counts = get_resample_counts(np.random.default_rng(1), len(costs), 40)
+  assert np.all(counts.sum(axis=1) == len(costs))
+  medians = get_resampled_medians(costs, counts)
+  for (resample, resample_counts) in enumerate(counts):
+    expected = get_quantiles_from_cost_matrix(np.repeat(costs, resample_counts, axis=0), [])[1]
+    assert np.allclose(medians[resample], expected, equal_nan=True)
+
+  ## Intervals contain the median and do not depend on the number of workers
+  bootstrap = {"samples": 600, "confidence": 95, "seed": 0, "workers": 1}
+  (lower, upper) = get_bootstrap_interval("median", costs, bootstrap)
+  sample_medians = get_quantiles_from_cost_matrix(costs, [])[1]
+  assert np.all(np.isnan(lower[:1])) and np.all(lower[1:] <= sample_medians[1:])
+  assert np.all(upper[1:] >= sample_medians[1:])
+  bootstrap["workers"] = 2
+  (parallel_lower, parallel_upper) = get_bootstrap_interval("median", costs, bootstrap)
+  assert np.array_equal(parallel_lower, lower, equal_nan=True) and np.array_equal(parallel_upper, upper, equal_nan=True)
+
+def test_bootstrap_intervals_of_plotted_curves(tmp_path, simple_database):
+  database_filepath = simple_database
+  assert run_benchmark_plotter([database_filepath, "-q", "--data-only", "--ci-method", "bootstrap",
+    "--bootstrap-samples", "200"]) == 0
+  with open(str(tmp_path / "simple.json"), 'r') as jsonfile:
+    data = json.load(jsonfile)
+  assert data["info"]["ci_method"] == "bootstrap"
+  for planner in data["planners"].values():
+    success = np.array(planner["success"])
+    assert np.all(np.array(planner["success_lower"]) <= success + 1e-9)
+    assert np.all(success <= np.array(planner["success_upper"]) + 1e-9)
+    if planner["optimization_success"]:
+      median = np.array(planner["median"])
+      assert np.all(np.array(planner["quantile5"]) <= median + 1e-9)
+      assert np.all(median <= np.array(planner["quantile95"]) + 1e-9)
+    else:
+      assert planner["point"]["cost"][1] <= planner["point"]["cost"][0] <= planner["point"]["cost"][2]
+
+def test_serve_answers_repeated_requests_from_memory(tmp_path, simple_database):
+  import threading
+  import urllib.error
+  import urllib.request
+  database_filepath = simple_database
+
+  parser = argparse.ArgumentParser()
+  add_plot_arguments(parser)
+  default_args = parser.parse_args(["-q"])
+  plot_server = PlotServer(lambda arguments: get_serve_request_config(default_args, arguments), 64 * 1024 * 1024)
+  httpd = create_plot_http_server(plot_server, "127.0.0.1", 0)
+  thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+  thread.start()
+  url = "http://127.0.0.1:{}".format(httpd.server_address[1])
+  try:
+    def request(query):
+      with urllib.request.urlopen(url + "/plot?" + query) as response:
+        return response.headers["Content-Type"], response.headers["X-Cache"], response.read()
+
+    query = "database={}&format=json".format(database_filepath)
+    (content_type, cache_state, body) = request(query)
+    assert (content_type, cache_state) == ("application/json", "miss")
+    planners = json.loads(body)["experiments"]["chain"]["planners"]
+    assert sorted(planners.keys()) == ["geometric_EST", "geometric_PRM", "geometric_RRTConnect", "geometric_RRTstar", "geometric_kBITstar"]
+    assert request(query) == (content_type, "response", body)
+
+    ## Only styling differs: statistics come from the cache, the graph is rendered
+    (content_type, cache_state, body) = request("database={}&format=png&argument=--no-title".format(database_filepath))
+    assert (content_type, cache_state) == ("image/png", "statistics")
+    assert body.startswith(b"\x89PNG")
+    (content_type, cache_state, body) = request("database={}&format=json&argument=--include-planner&argument=star".format(database_filepath))
+    assert sorted(json.loads(body)["experiments"]["chain"]["planners"].keys()) == ["geometric_RRTstar", "geometric_kBITstar"]
+
+    ## No file is written next to the database
+    assert sorted(os.listdir(str(tmp_path))) == ["simple.db"]
+
+    for (query, status) in [("database={}".format(tmp_path / "unknown.db"), 404),
+        ("database={}&format=gif".format(database_filepath), 400),
+        ("database={}&argument=--unknown-option".format(database_filepath), 400)]:
+      with pytest.raises(urllib.error.HTTPError) as error:
+        request(query)
+      assert error.value.code == status
+
+    with urllib.request.urlopen(url + "/status") as response:
+      status = json.loads(response.read())
+    assert 0 < status["cache"]["size"] <= 64 * 1024 * 1024
+  finally:
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_memory_result_cache_evicts_least_recently_used():
+  cache = MemoryResultCache(3 * (1000 * 8 + kResultObjectBytes))
+  for key in ["a", "b", "c"]:
+    cache.put(key, np.zeros(1000))
+  assert cache.get("a") is not None
+  cache.put("d", np.zeros(1000))
+  assert cache.get("b") is None
+  assert all(cache.get(key) is not None for key in ["a", "c", "d"])
+  cache.put("e", np.zeros(4000))
+  assert cache.get_status()["entries"] == 0
+
+def test_api_loads_and_renders_without_files(tmp_path, simple_database):
+  from src.api import load, iter_load, render
+  database_filepath = simple_database
+
+  curves = load(database_filepath, max_cost=40)
+  assert curves.names == ["geometric_RRTConnect", "geometric_PRM", "geometric_EST", "geometric_RRTstar", "geometric_kBITstar"]
+  assert curves.info["experiment"] == "chain"
+
+  ## Planners are yielded one at a time with the curves of load
+  planners = list(iter_load(database_filepath, max_cost=40))
+  assert [planner.names for planner in planners] == [[name] for name in curves.names]
+  for (row, planner) in enumerate(planners):
+    assert np.array_equal(planner.get_success_curve(0)[1], curves.get_success_curve(row)[1])
+    assert planner.optimization_success[0] == curves.optimization_success[row]
+  assert len(list(iter_load(database_filepath, experiment="unknown"))) == 0
+  with pytest.raises(ValueError):
+    load(database_filepath, experiment="unknown")
+  with pytest.raises(TypeError):
+    load(database_filepath, output_file="simple.pdf")
+
+  ## Figures are not managed by pyplot, and the curves are not modified
+  plt = get_pyplot()
+  figures = plt.get_fignums()
+  fig = render(curves)
+  assert len(fig.axes) == 2
+  assert plt.get_fignums() == figures
+  assert curves.info["max_cost"] == 40
+  (ax_fig, ax) = plt.subplots()
+  assert render(curves, ax=ax, no_title=True) is ax_fig
+  assert len(ax_fig.axes) == 1
+  plt.close(ax_fig)
+
+  assert sorted(os.listdir(str(tmp_path))) == ["simple.db"]